@@ -0,0 +1,104 @@
+import json
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from models import GenerationJob
+from auth import token_required, get_current_user
+from utils.validation import role_required, validate_required_fields
+import ai_service
+import generation_jobs
+
+ai_bp = Blueprint('ai_bp', __name__, url_prefix='/api/ai')
+
+MAX_TOPICS_PER_REQUEST = 50
+
+def sse_event(data, event=None):
+    message = f"event: {event}\n" if event else ''
+    return message + f"data: {json.dumps(data)}\n\n"
+
+def sse_response(tokens):
+    def generate():
+        try:
+            for token in tokens:
+                yield sse_event({'token': token})
+        except Exception as e:
+            yield sse_event({'error': str(e)}, event='error')
+            return
+        yield sse_event({}, event='done')
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # keep nginx from buffering the stream
+    })
+
+@ai_bp.route('/tutor', methods=['POST'])
+@token_required
+@role_required('student', 'teacher')
+@validate_required_fields(['query'])
+def ask_tutor():
+    data = request.get_json()
+    return jsonify({'response': ai_service.get_ai_tutor_response(data['query'])})
+
+@ai_bp.route('/tutor/stream', methods=['POST'])
+@token_required
+@role_required('student', 'teacher')
+@validate_required_fields(['query'])
+def stream_tutor():
+    data = request.get_json()
+    return sse_response(ai_service.stream_ai_tutor_response(data['query']))
+
+@ai_bp.route('/generate-content', methods=['POST'])
+@token_required
+@role_required('teacher')
+@validate_required_fields(['topic'])
+def generate_content():
+    data = request.get_json()
+    return jsonify({'content': ai_service.generate_content(data['topic'])})
+
+@ai_bp.route('/generate-content/stream', methods=['POST'])
+@token_required
+@role_required('teacher')
+@validate_required_fields(['topic'])
+def stream_generate_content():
+    data = request.get_json()
+    return sse_response(ai_service.stream_generated_content(data['topic']))
+
+@ai_bp.route('/generate-content/jobs', methods=['POST'])
+@token_required
+@role_required('teacher')
+def submit_generation_jobs():
+    user = get_current_user()
+    data = request.get_json(silent=True) or {}
+    topics = data.get('topics') or ([data['topic']] if data.get('topic') else [])
+    if not topics:
+        return jsonify({'error': 'Missing required field: topic or topics'}), 400
+    if len(topics) > MAX_TOPICS_PER_REQUEST:
+        return jsonify({'error': f'At most {MAX_TOPICS_PER_REQUEST} topics per request'}), 400
+    if not all(isinstance(topic, str) and topic.strip() for topic in topics):
+        return jsonify({'error': 'Topics must be non-empty strings'}), 400
+    jobs = generation_jobs.submit_jobs(current_app._get_current_object(), user.id, topics)
+    return jsonify({'jobs': [job.to_dict() for job in jobs]}), 202
+
+@ai_bp.route('/generate-content/jobs', methods=['GET'])
+@token_required
+@role_required('teacher')
+def list_generation_jobs():
+    user = get_current_user()
+    jobs = GenerationJob.query.filter_by(teacher_id=user.id) \
+        .order_by(GenerationJob.created_date.desc()).limit(100).all()
+    return jsonify({'jobs': [job.to_dict() for job in jobs]})
+
+@ai_bp.route('/generate-content/jobs/<int:job_id>', methods=['GET'])
+@token_required
+@role_required('teacher')
+def get_generation_job(job_id):
+    user = get_current_user()
+    job = GenerationJob.query.filter_by(id=job_id, teacher_id=user.id).first_or_404()
+    return jsonify(job.to_dict())
+
+@ai_bp.route('/generate-content/jobs/<int:job_id>/result', methods=['GET'])
+@token_required
+@role_required('teacher')
+def get_generation_job_result(job_id):
+    user = get_current_user()
+    job = GenerationJob.query.filter_by(id=job_id, teacher_id=user.id).first_or_404()
+    if job.status != 'succeeded':
+        return jsonify({'error': f'Job is {job.status}', 'status': job.status, 'details': job.error}), 409
+    return jsonify({'id': job.id, 'topic': job.topic, 'content': job.result})
@@ -1,5 +1,12 @@
 import os
+import json
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
 from dotenv import load_dotenv
+from utils.cache import TTLCache
+from utils.filelock import try_lock, lock_shared
 
 load_dotenv()
 
@@ -11,38 +18,205 @@ if api_key:
 else:
     client = None
 
+TUTOR_MODEL = "gpt-3.5-turbo"
+TUTOR_SYSTEM_PROMPT = "You are an AI tutor for educational purposes. Provide helpful, accurate, and engaging responses to student queries."
+TUTOR_PARAMS = {'max_tokens': 500, 'temperature': 0.7}
+
+# Tutor answers are cached on the normalized question so repeated homework questions skip the
+# upstream call; AI_CACHE_PATH optionally persists the cache as an append-only JSON lines file.
+# Each line records when the answer was created, so AI_CACHE_TTL holds across restarts.
+AI_CACHE_SIZE = int(os.getenv('AI_CACHE_SIZE', 2048))
+AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', 7 * 24 * 3600))  # seconds
+AI_CACHE_PATH = os.getenv('AI_CACHE_PATH')
+
+response_cache = TTLCache(maxsize=AI_CACHE_SIZE, ttl=AI_CACHE_TTL)
+_inflight = {}
+_inflight_lock = threading.Lock()
+_persist_lock = threading.Lock()
+
+def normalize_query(query: str) -> str:
+    return ' '.join(query.lower().split()).rstrip('?!. ')
+
+def cache_key(query: str, model: str = TUTOR_MODEL, params: dict = TUTOR_PARAMS) -> str:
+    raw = json.dumps([model, TUTOR_SYSTEM_PROMPT, params, normalize_query(query)], sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def _persist(key: str, value: str):
+    if not AI_CACHE_PATH:
+        return
+    # Appends share the lock that compaction takes exclusively, so none lands while it rewrites
+    with _persist_lock, open(AI_CACHE_PATH + '.lock', 'a+b') as lock_file:
+        lock_shared(lock_file)
+        with open(AI_CACHE_PATH, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'key': key, 'value': value, 'created_at': time.time()}) + '\n')
+
+def load_persisted_cache(path: str = None):
+    """Warm the cache from the persistence file and compact it to the unexpired entries that fit."""
+    path = path or AI_CACHE_PATH
+    if not path or not os.path.exists(path):
+        return 0
+    now = time.time()
+    # Workers starting together all load the file; only the one holding the lock exclusively
+    # compacts it, and appends wait for it, so nothing is written between the read and the swap
+    with _persist_lock, open(path + '.lock', 'a+b') as lock_file:
+        compacting = try_lock(lock_file)
+        entries = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn write at the end of the file
+                entries.pop(entry['key'], None)
+                # Entries written before timestamps were recorded have an unknown age
+                created_at = entry.get('created_at')
+                if created_at is not None and created_at + AI_CACHE_TTL > now:
+                    entries[entry['key']] = entry
+        kept = list(entries.values())[-response_cache.maxsize:]
+        if compacting:
+            _compact(path, kept)
+    for entry in kept:
+        response_cache.set(entry['key'], entry['value'], ttl=entry['created_at'] + AI_CACHE_TTL - now)
+    return len(kept)
+
+def _compact(path: str, entries: list):
+    # Swapped in whole so a concurrent reader never sees a partial file
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+    os.replace(tmp_path, path)
+
+def _single_flight(key: str, compute):
+    # Concurrent callers asking the same question wait on one upstream call
+    with _inflight_lock:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if not leader:
+        return future.result()
+    try:
+        value = compute()
+    except BaseException as e:
+        with _inflight_lock:
+            del _inflight[key]
+        future.set_exception(e)
+        raise
+    with _inflight_lock:
+        response_cache.set(key, value)
+        del _inflight[key]
+    future.set_result(value)
+    _persist(key, value)
+    return value
+
+def _complete_tutor(query: str) -> str:
+    response = client.chat.completions.create(
+        model=TUTOR_MODEL,
+        messages=[
+            {"role": "system", "content": TUTOR_SYSTEM_PROMPT},
+            {"role": "user", "content": query}
+        ],
+        **TUTOR_PARAMS
+    )
+    return response.choices[0].message.content.strip()
+
 def get_ai_tutor_response(query: str) -> str:
     if client is None:
         return "AI tutor service is currently unavailable. Please ensure the OpenAI API key is configured."
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an AI tutor for educational purposes. Provide helpful, accurate, and engaging responses to student queries."},
-                {"role": "user", "content": query}
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
-        return response.choices[0].message.content.strip()
+        return _single_flight(cache_key(query), lambda: _complete_tutor(query))
     except Exception as e:
         return f"Error: {str(e)}"
 
+CONTENT_MODEL = "gpt-3.5-turbo"
+CONTENT_SYSTEM_PROMPT = "You are an AI content generator for educational materials. Create engaging and informative content on the given topic."
+CONTENT_PARAMS = {'max_tokens': 1000, 'temperature': 0.7}
+
+def _content_messages(topic: str) -> list:
+    return [
+        {"role": "system", "content": CONTENT_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Generate educational content about: {topic}"}
+    ]
+
+def complete_content(topic: str) -> str:
+    """Generate content for a topic, raising on upstream errors (used by generation_jobs)."""
+    if client is None:
+        raise RuntimeError("OpenAI API key is not configured")
+    response = client.chat.completions.create(
+        model=CONTENT_MODEL,
+        messages=_content_messages(topic),
+        **CONTENT_PARAMS
+    )
+    return response.choices[0].message.content.strip()
+
 def generate_content(topic: str) -> str:
     if client is None:
         return "AI content generation service is currently unavailable. Please ensure the OpenAI API key is configured."
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an AI content generator for educational materials. Create engaging and informative content on the given topic."},
-                {"role": "user", "content": f"Generate educational content about: {topic}"}
-            ],
-            max_tokens=1000,
-            temperature=0.7
-        )
-        return response.choices[0].message.content.strip()
+        return complete_content(topic)
     except Exception as e:
         return f"Error: {str(e)}"
+
+# Streaming backends yield completion text piece by piece. The OpenAI backend relays the chat
+# completion stream; FakeStreamingBackend replays canned text so tests and benchmarks can
+# measure time to first byte without a network call.
+
+class OpenAIStreamingBackend:
+    def stream(self, model: str, messages: list, **params):
+        if client is None:
+            raise RuntimeError("OpenAI API key is not configured")
+        for chunk in client.chat.completions.create(model=model, messages=messages, stream=True, **params):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+class FakeStreamingBackend:
+    def __init__(self, text: str = "This is a streamed answer.", first_token_delay: float = 0.0, token_delay: float = 0.0):
+        self.text = text
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.calls = 0
+
+    def stream(self, model: str, messages: list, **params):
+        self.calls += 1
+        time.sleep(self.first_token_delay)
+        for index, token in enumerate(self.text.split(' ')):
+            if index:
+                time.sleep(self.token_delay)
+                token = ' ' + token
+            yield token
+
+streaming_backend = OpenAIStreamingBackend()
+
+def set_streaming_backend(backend):
+    global streaming_backend
+    streaming_backend = backend
+
+def stream_ai_tutor_response(query: str):
+    """Yield the tutor answer as it is generated; cached answers are sent in one piece."""
+    key = cache_key(query)
+    cached = response_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    messages = [
+        {"role": "system", "content": TUTOR_SYSTEM_PROMPT},
+        {"role": "user", "content": query}
+    ]
+    parts = []
+    for token in streaming_backend.stream(TUTOR_MODEL, messages, **TUTOR_PARAMS):
+        parts.append(token)
+        yield token
+    answer = ''.join(parts).strip()
+    response_cache.set(key, answer)
+    _persist(key, answer)
+
+def stream_generated_content(topic: str):
+    yield from streaming_backend.stream(CONTENT_MODEL, _content_messages(topic), **CONTENT_PARAMS)
+
+load_persisted_cache()
@@ -0,0 +1,386 @@
+from sqlalchemy import event, inspect, select, case, or_
+from models import (db, User, Lesson, Quiz, QuizAttempt, QuizResult, LessonProgress, TeacherRollup, GradeRollup,
+                    StudentStats)
+from utils.upsert import upsert
+
+# Rollup rows are maintained from mapper events so every write path (API, scripts, shell)
+# keeps them current. Bulk Query.update()/delete() bypass these events; run
+# `flask rebuild-rollups` after such maintenance to resynchronise. Counter rows are written
+# with INSERT ... ON CONFLICT DO UPDATE, so concurrent first writes to a key cannot collide.
+
+teacher_rollup = TeacherRollup.__table__
+grade_rollup = GradeRollup.__table__
+student_stats = StudentStats.__table__
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    pass
+
+
+# active_history makes assignments to expired attributes load the replaced value, so
+# after_update listeners can always see what a row contributed before the change
+for _tracked in (Lesson.teacher_id, Lesson.grade, Lesson.subject, Lesson.status,
+                 Quiz.teacher_id, Quiz.grade, Quiz.subject, Quiz.status,
+                 QuizResult.student_id, QuizResult.submitted_date,
+                 QuizAttempt.quiz_id, QuizAttempt.score, QuizAttempt.completed,
+                 LessonProgress.lesson_id, LessonProgress.progress_percentage, LessonProgress.completed,
+                 User.role, User.grade):
+    event.listen(_tracked, 'set', _load_previous_value, active_history=True)
+
+
+def _previous(target, attr):
+    history = inspect(target).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, attr)
+
+
+def _negate(values):
+    return {name: -value for name, value in values.items()}
+
+
+def _add_deltas(deltas):
+    return lambda current, excluded: {name: current[name] + excluded[name] for name in deltas}
+
+
+def _bump_teacher(connection, key, **deltas):
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas or None in key:
+        return
+    teacher_id, grade, subject = key
+    upsert(connection, teacher_rollup, {'teacher_id': teacher_id, 'grade': grade, 'subject': subject, **deltas},
+           _add_deltas(deltas))
+
+
+def _bump_grade(connection, grade, **deltas):
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not grade or not deltas:
+        return
+    upsert(connection, grade_rollup, {'grade': grade, **deltas}, _add_deltas(deltas))
+
+
+def _move_grade(connection, old_grade, old_values, new_grade, new_values):
+    if old_grade == new_grade:
+        _bump_grade(connection, new_grade, **{name: new_values[name] - old_values[name] for name in new_values})
+    else:
+        _bump_grade(connection, old_grade, **_negate(old_values))
+        _bump_grade(connection, new_grade, **new_values)
+
+
+def _bump_student(connection, student_id, count, result_id, submitted_date):
+    def updates(current, excluded):
+        # The newest submission becomes the latest result; ties go to the later write
+        newer = or_(current.latest_submitted_date.is_(None),
+                    current.latest_submitted_date <= excluded.latest_submitted_date)
+        return {'quizzes_taken': current.quizzes_taken + excluded.quizzes_taken,
+                'latest_result_id': case((newer, excluded.latest_result_id), else_=current.latest_result_id),
+                'latest_submitted_date': case((newer, excluded.latest_submitted_date),
+                                              else_=current.latest_submitted_date)}
+
+    upsert(connection, student_stats, {'user_id': student_id, 'quizzes_taken': count,
+                                       'latest_result_id': result_id, 'latest_submitted_date': submitted_date},
+           updates)
+
+
+def _refresh_student(connection, student_id):
+    # Deletes and reassignments are rare, so recount from the (student_id, submitted_date) index
+    quizzes_taken = connection.execute(
+        select(db.func.count(QuizResult.id)).where(QuizResult.student_id == student_id)).scalar()
+    latest = connection.execute(
+        select(QuizResult.id, QuizResult.submitted_date)
+        .where(QuizResult.student_id == student_id)
+        .order_by(QuizResult.submitted_date.desc(), QuizResult.id.desc())
+        .limit(1)
+    ).first()
+    values = {'quizzes_taken': quizzes_taken,
+              'latest_result_id': latest.id if latest else None,
+              'latest_submitted_date': latest.submitted_date if latest else None}
+    upsert(connection, student_stats, {'user_id': student_id, **values},
+           lambda current, excluded: {name: excluded[name] for name in values})
+
+
+def _move(connection, old_key, old_values, new_key, new_values):
+    if old_key == new_key:
+        names = set(old_values) | set(new_values)
+        _bump_teacher(connection, new_key, **{name: new_values.get(name, 0) - old_values.get(name, 0) for name in names})
+    else:
+        _bump_teacher(connection, old_key, **_negate(old_values))
+        _bump_teacher(connection, new_key, **new_values)
+
+
+def _lesson_values(status):
+    return {'lesson_count': 1, 'approved_lesson_count': int(status == 'approved')}
+
+
+def _quiz_values(status):
+    return {'quiz_count': 1, 'approved_quiz_count': int(status == 'approved')}
+
+
+def _attempt_values(score, completed):
+    return {'attempt_count': 1, 'completed_attempt_count': int(bool(completed)), 'score_sum': score or 0.0}
+
+
+def _progress_values(progress_percentage, completed):
+    return {'progress_count': 1, 'completed_progress_count': int(bool(completed)), 'progress_sum': progress_percentage or 0.0}
+
+
+def _content_key(target, previous=False):
+    get = _previous if previous else getattr
+    return (get(target, 'teacher_id'), get(target, 'grade'), get(target, 'subject'))
+
+
+def _quiz_key(connection, quiz_id):
+    row = connection.execute(select(Quiz.teacher_id, Quiz.grade, Quiz.subject).where(Quiz.id == quiz_id)).first()
+    return tuple(row) if row else (None, None, None)
+
+
+def _lesson_key(connection, lesson_id):
+    row = connection.execute(select(Lesson.teacher_id, Lesson.grade, Lesson.subject).where(Lesson.id == lesson_id)).first()
+    return tuple(row) if row else (None, None, None)
+
+
+def _attempt_totals(connection, quiz_id):
+    count, completed, score_sum = connection.execute(
+        select(db.func.count(QuizAttempt.id),
+               db.func.sum(db.case((QuizAttempt.completed == True, 1), else_=0)),
+               db.func.sum(QuizAttempt.score))
+        .where(QuizAttempt.quiz_id == quiz_id)
+    ).one()
+    return {'attempt_count': count, 'completed_attempt_count': completed or 0, 'score_sum': score_sum or 0.0}
+
+
+def _progress_totals(connection, lesson_id):
+    count, completed, progress_sum = connection.execute(
+        select(db.func.count(LessonProgress.id),
+               db.func.sum(db.case((LessonProgress.completed == True, 1), else_=0)),
+               db.func.sum(LessonProgress.progress_percentage))
+        .where(LessonProgress.lesson_id == lesson_id)
+    ).one()
+    return {'progress_count': count, 'completed_progress_count': completed or 0, 'progress_sum': progress_sum or 0.0}
+
+
+@event.listens_for(Lesson, 'after_insert')
+def _lesson_inserted(mapper, connection, target):
+    _bump_teacher(connection, _content_key(target), **_lesson_values(target.status))
+    _bump_grade(connection, target.grade, **_lesson_values(target.status))
+
+
+@event.listens_for(Lesson, 'after_update')
+def _lesson_updated(mapper, connection, target):
+    old_key, new_key = _content_key(target, previous=True), _content_key(target)
+    # Progress rows follow the lesson when it moves to another grade/subject
+    moved = _progress_totals(connection, target.id) if old_key != new_key else {}
+    _move(connection,
+          old_key, {**_lesson_values(_previous(target, 'status')), **moved},
+          new_key, {**_lesson_values(target.status), **moved})
+    _move_grade(connection, _previous(target, 'grade'), _lesson_values(_previous(target, 'status')),
+                target.grade, _lesson_values(target.status))
+
+
+@event.listens_for(Lesson, 'after_delete')
+def _lesson_deleted(mapper, connection, target):
+    values = {**_lesson_values(target.status), **_progress_totals(connection, target.id)}
+    _bump_teacher(connection, _content_key(target), **_negate(values))
+    _bump_grade(connection, target.grade, **_negate(_lesson_values(target.status)))
+
+
+@event.listens_for(Quiz, 'after_insert')
+def _quiz_inserted(mapper, connection, target):
+    _bump_grade(connection, target.grade, **_quiz_values(target.status))
+
+
+@event.listens_for(Quiz, 'after_update')
+def _quiz_updated(mapper, connection, target):
+    old_key, new_key = _content_key(target, previous=True), _content_key(target)
+    if old_key != new_key:
+        moved = _attempt_totals(connection, target.id)
+        _move(connection, old_key, moved, new_key, moved)
+    _move_grade(connection, _previous(target, 'grade'), _quiz_values(_previous(target, 'status')),
+                target.grade, _quiz_values(target.status))
+
+
+@event.listens_for(Quiz, 'after_delete')
+def _quiz_deleted(mapper, connection, target):
+    _bump_teacher(connection, _content_key(target), **_negate(_attempt_totals(connection, target.id)))
+    _bump_grade(connection, target.grade, **_negate(_quiz_values(target.status)))
+
+
+@event.listens_for(QuizAttempt, 'after_insert')
+def _attempt_inserted(mapper, connection, target):
+    _bump_teacher(connection, _quiz_key(connection, target.quiz_id), **_attempt_values(target.score, target.completed))
+
+
+@event.listens_for(QuizAttempt, 'after_update')
+def _attempt_updated(mapper, connection, target):
+    _move(connection,
+          _quiz_key(connection, _previous(target, 'quiz_id')),
+          _attempt_values(_previous(target, 'score'), _previous(target, 'completed')),
+          _quiz_key(connection, target.quiz_id),
+          _attempt_values(target.score, target.completed))
+
+
+@event.listens_for(QuizAttempt, 'after_delete')
+def _attempt_deleted(mapper, connection, target):
+    values = _attempt_values(target.score, target.completed)
+    _bump_teacher(connection, _quiz_key(connection, target.quiz_id), **_negate(values))
+
+
+@event.listens_for(LessonProgress, 'after_insert')
+def _progress_inserted(mapper, connection, target):
+    values = _progress_values(target.progress_percentage, target.completed)
+    _bump_teacher(connection, _lesson_key(connection, target.lesson_id), **values)
+
+
+@event.listens_for(LessonProgress, 'after_update')
+def _progress_updated(mapper, connection, target):
+    _move(connection,
+          _lesson_key(connection, _previous(target, 'lesson_id')),
+          _progress_values(_previous(target, 'progress_percentage'), _previous(target, 'completed')),
+          _lesson_key(connection, target.lesson_id),
+          _progress_values(target.progress_percentage, target.completed))
+
+
+@event.listens_for(LessonProgress, 'after_delete')
+def _progress_deleted(mapper, connection, target):
+    values = _progress_values(target.progress_percentage, target.completed)
+    _bump_teacher(connection, _lesson_key(connection, target.lesson_id), **_negate(values))
+
+
+@event.listens_for(QuizResult, 'after_insert')
+def _result_inserted(mapper, connection, target):
+    _bump_student(connection, target.student_id, 1, target.id, target.submitted_date)
+
+
+@event.listens_for(QuizResult, 'after_update')
+def _result_updated(mapper, connection, target):
+    old_student = _previous(target, 'student_id')
+    if (old_student, _previous(target, 'submitted_date')) == (target.student_id, target.submitted_date):
+        return
+    _refresh_student(connection, target.student_id)
+    if old_student != target.student_id:
+        _refresh_student(connection, old_student)
+
+
+@event.listens_for(QuizResult, 'after_delete')
+def _result_deleted(mapper, connection, target):
+    _refresh_student(connection, target.student_id)
+
+
+@event.listens_for(User, 'after_insert')
+def _user_inserted(mapper, connection, target):
+    if target.role == 'student':
+        _bump_grade(connection, target.grade, student_count=1)
+
+
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, target):
+    old_role, old_grade = _previous(target, 'role'), _previous(target, 'grade')
+    if (old_role, old_grade) == (target.role, target.grade):
+        return
+    if old_role == 'student':
+        _bump_grade(connection, old_grade, student_count=-1)
+    if target.role == 'student':
+        _bump_grade(connection, target.grade, student_count=1)
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    if target.role == 'student':
+        _bump_grade(connection, target.grade, student_count=-1)
+
+
+def adjust_quiz_attempts(connection, quiz_id, **deltas):
+    """Apply rollup changes for attempts written with bulk statements, which skip the listeners."""
+    _bump_teacher(connection, _quiz_key(connection, quiz_id), **deltas)
+
+
+def adjust_student_results(connection, results):
+    """Apply student counters for results written with bulk statements, given (student_id, id, submitted_date)."""
+    per_student = {}
+    for student_id, result_id, submitted_date in results:
+        count, latest = per_student.get(student_id, (0, None))
+        if latest is None or (submitted_date, result_id) >= latest:
+            latest = (submitted_date, result_id)
+        per_student[student_id] = (count + 1, latest)
+    for student_id, (count, (submitted_date, result_id)) in per_student.items():
+        _bump_student(connection, student_id, count, result_id, submitted_date)
+
+
+def rebuild_rollups():
+    """Recompute every rollup and student counter row from the raw tables. Used for backfill and repair."""
+    rollups = {}
+
+    def add(key, **values):
+        row = rollups.setdefault(key, {})
+        for name, value in values.items():
+            row[name] = row.get(name, 0) + (value or 0)
+
+    lesson_rows = db.session.query(
+        Lesson.teacher_id, Lesson.grade, Lesson.subject,
+        db.func.count(Lesson.id),
+        db.func.sum(db.case((Lesson.status == 'approved', 1), else_=0))
+    ).group_by(Lesson.teacher_id, Lesson.grade, Lesson.subject).all()
+    for teacher_id, grade, subject, lesson_count, approved in lesson_rows:
+        add((teacher_id, grade, subject), lesson_count=lesson_count, approved_lesson_count=approved)
+
+    attempt_rows = db.session.query(
+        Quiz.teacher_id, Quiz.grade, Quiz.subject,
+        db.func.count(QuizAttempt.id),
+        db.func.sum(db.case((QuizAttempt.completed == True, 1), else_=0)),
+        db.func.sum(QuizAttempt.score)
+    ).join(Quiz, Quiz.id == QuizAttempt.quiz_id).group_by(Quiz.teacher_id, Quiz.grade, Quiz.subject).all()
+    for teacher_id, grade, subject, count, completed, score_sum in attempt_rows:
+        add((teacher_id, grade, subject), attempt_count=count, completed_attempt_count=completed, score_sum=score_sum)
+
+    progress_rows = db.session.query(
+        Lesson.teacher_id, Lesson.grade, Lesson.subject,
+        db.func.count(LessonProgress.id),
+        db.func.sum(db.case((LessonProgress.completed == True, 1), else_=0)),
+        db.func.sum(LessonProgress.progress_percentage)
+    ).join(Lesson, Lesson.id == LessonProgress.lesson_id).group_by(Lesson.teacher_id, Lesson.grade, Lesson.subject).all()
+    for teacher_id, grade, subject, count, completed, progress_sum in progress_rows:
+        add((teacher_id, grade, subject), progress_count=count, completed_progress_count=completed, progress_sum=progress_sum)
+
+    grades = {}
+
+    def add_grade(grade, **values):
+        row = grades.setdefault(grade, {})
+        for name, value in values.items():
+            row[name] = row.get(name, 0) + (value or 0)
+
+    student_rows = db.session.query(User.grade, db.func.count(User.id)) \
+        .filter(User.role == 'student', User.grade.isnot(None)) \
+        .group_by(User.grade).all()
+    for grade, count in student_rows:
+        add_grade(grade, student_count=count)
+    for model, count_name, approved_name in ((Lesson, 'lesson_count', 'approved_lesson_count'),
+                                             (Quiz, 'quiz_count', 'approved_quiz_count')):
+        content_rows = db.session.query(
+            model.grade, db.func.count(model.id), db.func.sum(db.case((model.status == 'approved', 1), else_=0))
+        ).group_by(model.grade).all()
+        for grade, count, approved in content_rows:
+            add_grade(grade, **{count_name: count, approved_name: approved})
+
+    latest = db.session.query(
+        QuizResult.student_id, QuizResult.id, QuizResult.submitted_date,
+        db.func.count(QuizResult.id).over(partition_by=QuizResult.student_id).label('quizzes_taken'),
+        db.func.row_number().over(partition_by=QuizResult.student_id,
+                                  order_by=(QuizResult.submitted_date.desc(), QuizResult.id.desc())).label('position')
+    ).subquery()
+    student_stats_rows = db.session.query(latest).filter(latest.c.position == 1).all()
+
+    db.session.query(TeacherRollup).delete()
+    db.session.query(GradeRollup).delete()
+    db.session.query(StudentStats).delete()
+    db.session.add_all([
+        TeacherRollup(teacher_id=teacher_id, grade=grade, subject=subject, **values)
+        for (teacher_id, grade, subject), values in rollups.items()
+    ])
+    db.session.add_all([GradeRollup(grade=grade, **values) for grade, values in grades.items()])
+    db.session.add_all([
+        StudentStats(user_id=row.student_id, quizzes_taken=row.quizzes_taken,
+                     latest_result_id=row.id, latest_submitted_date=row.submitted_date)
+        for row in student_stats_rows
+    ])
+    db.session.commit()
+    return len(rollups), len(grades)
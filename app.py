@@ -1,10 +1,15 @@
-from flask import Flask, jsonify, send_from_directory
+import click
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 from models import db
 from dotenv import load_dotenv
 from config import get_config
 import os
 from utils.logging_setup import setup_logging
+from utils.media import send_media
+import static_assets
+import db_engine
+import replicas
 from flask_talisman import Talisman
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
@@ -62,7 +67,8 @@ UPLOAD_FOLDER = app.config.get('UPLOAD_FOLDER', 'uploads')
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
-db.init_app(app)
+db_engine.init_app(app, db)
+replicas.init_app(app, db)
 
 # Initialize Flask-Migrate
 migrate = Migrate(app, db)
@@ -74,6 +80,10 @@ from quizzes import quizzes_bp
 from teacher import teacher_bp
 from student import students_bp
 from progress import progress_bp
+from ai import ai_bp
+from uploads import uploads_bp
+from search import search_bp
+import analytics  # registers the rollup maintenance listeners
 
 app.register_blueprint(auth_bp, url_prefix='/api')
 app.register_blueprint(lessons_bp)
@@ -81,73 +91,117 @@ app.register_blueprint(quizzes_bp)
 app.register_blueprint(teacher_bp)
 app.register_blueprint(students_bp)
 app.register_blueprint(progress_bp)
+app.register_blueprint(ai_bp)
+app.register_blueprint(uploads_bp)
+app.register_blueprint(search_bp)
+# A multi-GB video is hundreds of chunk requests, far beyond the default per-hour limit
+limiter.exempt(uploads_bp)
+
+# Serve static files and pages from the precompressed asset store
+static_assets.init_app(app, ('pages', 'css', 'public'))
 
-# Serve static files and pages
 @app.route('/pages/<path:filename>')
+@app.route('/css/<path:filename>', endpoint='serve_css')
+@app.route('/public/<path:filename>', endpoint='serve_public')
+@limiter.exempt
 def serve_pages(filename):
-    return send_from_directory('pages', filename)
-
-@app.route('/css/<path:filename>')
-def serve_css(filename):
-    return send_from_directory('css', filename)
-
-@app.route('/public/<path:filename>')
-def serve_public(filename):
-    return send_from_directory('public', filename)
+    return static_assets.serve(request.path)
 
 @app.route('/uploads/<path:filename>')
+@limiter.exempt
 def serve_uploads(filename):
-    return send_from_directory('uploads', filename)
+    # Seeking in a video is a burst of Range requests, so these are not rate limited
+    return send_media(os.path.join(app.root_path, app.config['UPLOAD_FOLDER']), filename)
 
 @app.route('/')
+@limiter.exempt
 def index():
-    return send_from_directory('pages', 'landing_page.html')
-
-@app.route('/user_registration.html')
-def serve_user_registration():
-    return send_from_directory('pages', 'user_registration.html')
-
-@app.route('/user_login.html')
-def serve_user_login():
-    return send_from_directory('pages', 'user_login.html')
-
-@app.route('/landing_page.html')
-def serve_landing_page():
-    return send_from_directory('pages', 'landing_page.html')
-
-@app.route('/student_dashboard.html')
-def serve_student_dashboard():
-    return send_from_directory('pages', 'student_dashboard.html')
-
-@app.route('/student_lessons.html')
-def serve_student_lessons():
-    return send_from_directory('pages', 'student_lessons.html')
-
-@app.route('/student_quizzes.html')
-def serve_student_quizzes():
-    return send_from_directory('pages', 'student_quizzes.html')
-
-@app.route('/student_ai_tutor.html')
-def serve_student_ai_tutor():
-    return send_from_directory('pages', 'student_ai_tutor.html')
-
-@app.route('/student_profile.html')
-def serve_student_profile():
-    return send_from_directory('pages', 'student_profile.html')
-
-@app.route('/teacher_dashboard.html')
-def serve_teacher_dashboard():
-    return send_from_directory('pages', 'teacher_dashboard.html')
-
-@app.route('/admin_dashboard.html')
-def serve_admin_dashboard():
-    return send_from_directory('pages', 'admin_dashboard.html')
-
-@app.route('/admin_control_panel.html')
-def serve_admin_control_panel():
-    return send_from_directory('pages', 'admin_control_panel.html')
+    return static_assets.serve('/pages/landing_page.html')
+
+@app.route('/<page>.html')
+@limiter.exempt
+def serve_page(page):
+    return static_assets.serve(f'/pages/{page}.html')
+
+# Maintenance commands
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the teacher analytics rollups from the raw tables."""
+    teacher_rows, grade_rows = analytics.rebuild_rollups()
+    print(f"Rebuilt {teacher_rows} teacher rollup(s) and {grade_rows} grade rollup(s).")
+
+@app.cli.command('regrade-quiz')
+@click.argument('quiz_id', type=int)
+def regrade_quiz_command(quiz_id):
+    """Re-score every stored result for a quiz against its current answer key."""
+    import grading
+    print(f"Regraded {grading.regrade_quiz(quiz_id)} result(s).")
+
+@app.cli.command('flush-submissions')
+def flush_submissions_command():
+    """Move every quiz submission waiting in the write-behind logs into the database."""
+    import submission_log
+    flushed = 0
+    # Drain every slot a stopped worker left behind; slots held by a live process are its own
+    for path in submission_log.log_paths(app.config['SUBMISSION_LOG_PATH']):
+        try:
+            log = submission_log.SubmissionLog(path, fsync=app.config['SUBMISSION_LOG_FSYNC'])
+        except submission_log.LogInUse:
+            print(f"Skipped {path}: in use by a running server.")
+            continue
+        try:
+            while True:
+                batch = submission_log.flush_pending(log=log)
+                if not batch:
+                    break
+                flushed += batch
+        finally:
+            log.close()
+    print(f"Flushed {flushed} submission(s).")
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Repopulate the full-text search tables from the lesson and quiz tables."""
+    import search
+    counts = search.rebuild_index()
+    print(f"Indexed {counts['lessons']} lesson(s) and {counts['quizzes']} quiz(zes).")
+
+@app.cli.command('prune-uploads')
+def prune_uploads_command():
+    """Delete unfinished uploads that have been idle longer than UPLOAD_SESSION_TTL."""
+    import uploads
+    print(f"Removed {uploads.prune_stale_uploads()} stale upload(s).")
+
+@app.cli.command('outbox-worker')
+@click.option('--once', is_flag=True, help='Deliver a single batch and exit.')
+def outbox_worker_command(once):
+    """Deliver queued emails from the outbox."""
+    import mail_outbox
+    if once:
+        print(f"Sent {mail_outbox.deliver_pending()} email(s).")
+    else:
+        mail_outbox.run_worker(app)
+
+@app.cli.command('resume-generation-jobs')
+def resume_generation_jobs_command():
+    """Run the AI generation jobs a stopped server left queued, waiting until they finish."""
+    import generation_jobs
+    futures = generation_jobs.resume_unfinished(app)
+    for future in futures:
+        future.result()
+    print(f"Resumed {len(futures)} generation job(s).")
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+    # The reloader runs this module twice; only start the worker in the serving process
+    if not app.config['DEBUG'] or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        import mail_outbox
+        mail_outbox.start_worker(app)
+        import generation_jobs
+        generation_jobs.resume_unfinished(app)
+        if app.config['SUBMISSION_WRITE_BEHIND']:
+            # Flush anything a previous run logged but did not store
+            import submission_log
+            submission_log.ensure_worker(app)
     app.run(debug=app.config['DEBUG'])
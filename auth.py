@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify, g, current_app
-from models import db, User
+from models import db, User, GradeRollup
 from functools import wraps
 import jwt
 from datetime import datetime, timedelta, timezone
@@ -9,6 +9,13 @@ import os
 from flask_mail import Mail, Message
 from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
 from config import get_config
+from sqlalchemy import event
+from utils.cache import TTLCache
+from utils.validation import role_required
+from utils.hashing import hash_password, HashingOverloaded
+from mail_outbox import enqueue_email, outbox_stats
+import db_engine
+from replicas import read_only
 
 auth_bp = Blueprint('auth_bp', __name__)
 
@@ -22,13 +29,49 @@ import logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Authorization-relevant user fields cached per user id so protected requests skip the user lookup
+AUTH_USER_FIELDS = ('id', 'role', 'status', 'is_confirmed', 'grade', 'subjects')
+user_cache = TTLCache(maxsize=config.USER_CACHE_SIZE, ttl=config.USER_CACHE_TTL)
+
+class CachedUser:
+    """Cached auth fields of a user; any other attribute loads the full User row on first access."""
+
+    def __init__(self, fields):
+        self.__dict__.update(fields)
+
+    def __getattr__(self, name):
+        user = self.__dict__.get('_user')
+        if user is None:
+            user = db.session.get(User, self.__dict__['id'])
+            self.__dict__['_user'] = user
+        return getattr(user, name)
+
+def load_auth_user(user_id):
+    fields = user_cache.get(user_id)
+    if fields is not None:
+        return CachedUser(fields)
+    user = db.session.get(User, user_id)
+    if user:
+        user_cache.set(user_id, {field: getattr(user, field) for field in AUTH_USER_FIELDS})
+    return user
+
+def invalidate_cached_user(user_id):
+    user_cache.invalidate(user_id)
+
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, target):
+    invalidate_cached_user(target.id)
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    invalidate_cached_user(target.id)
+
 def token_required(f: Callable) -> Callable:
     @wraps(f)
     def decorated_function(*args, **kwargs):
         # Bypass authentication for OPTIONS method to allow CORS preflight
         if request.method == 'OPTIONS':
             return f(*args, **kwargs)
-        logger.debug(f"JWT_SECRET_KEY used: {JWT_SECRET_KEY}")
         token = request.headers.get('Authorization')
         if not token:
             logger.debug("Token is missing in request headers")
@@ -37,7 +80,7 @@ def token_required(f: Callable) -> Callable:
             if token.startswith('Bearer '):
                 token = token[7:]
             data = jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
-            current_user = db.session.get(User, data['user_id'])
+            current_user = load_auth_user(data['user_id'])
             if not current_user:
                 logger.debug("Current user not found for token user_id")
                 return jsonify({'error': 'User not found'}), 401
@@ -56,6 +99,7 @@ def token_required(f: Callable) -> Callable:
 
 @auth_bp.route('/users', methods=['GET'])
 @token_required
+@read_only
 def get_users():
     try:
         # Pagination parameters with defaults
@@ -122,20 +166,19 @@ def db_operation_with_error_handling(operation_func: Callable[[], Any], success_
         db.session.rollback()
         return jsonify({'error': 'Internal server error'}), 500
 
+def server_busy_response():
+    response = jsonify({'error': 'Server is busy, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 def send_confirmation_email(user: User, token: str):
-    try:
-        FRONTEND_BASE_URL = current_app.config.get('FRONTEND_BASE_URL', 'http://localhost:5000')
-        EMAIL_SENDER = current_app.config.get('MAIL_DEFAULT_SENDER', current_app.config.get('MAIL_USERNAME'))
-        confirm_url = f"{FRONTEND_BASE_URL}/confirm_email?token={token}"
-        subject = "Please confirm your email"
-        body = f"Hi {user.username},\n\nPlease confirm your email by clicking the link below:\n{confirm_url}\n\nIf you did not register, please ignore this email.\n"
-        msg = Message(subject, sender=EMAIL_SENDER, recipients=[user.email])
-        msg.body = body
-        current_app.mail.send(msg)
-        logger.debug(f"Sent confirmation email to {user.email}")
-    except Exception as e:
-        logger.error(f"Failed to send confirmation email to {user.email}: {e}")
-        raise
+    # Queued in the caller's transaction and delivered by the outbox worker (mail_outbox.py)
+    FRONTEND_BASE_URL = current_app.config.get('FRONTEND_BASE_URL', 'http://localhost:5000')
+    confirm_url = f"{FRONTEND_BASE_URL}/confirm_email?token={token}"
+    subject = "Please confirm your email"
+    body = f"Hi {user.username},\n\nPlease confirm your email by clicking the link below:\n{confirm_url}\n\nIf you did not register, please ignore this email.\n"
+    enqueue_email(user.email, subject, body)
+    logger.debug(f"Queued confirmation email to {user.email}")
 
 
 @auth_bp.route('/login', methods=['POST'])
@@ -157,6 +200,11 @@ def login_auth():
         if not user.check_password(data['password']):
             return jsonify({'error': 'Incorrect password'}), 401
 
+        # Transparently upgrade hashes created with older hashing parameters
+        if user.password_needs_rehash():
+            user.set_password(data['password'])
+            db.session.commit()
+
         token = jwt.encode({
             'user_id': user.id,
             'exp': datetime.now(timezone.utc) + timedelta(hours=24)
@@ -182,6 +230,8 @@ def login_auth():
             },
             'redirect': redirect_url
         })
+    except HashingOverloaded:
+        return server_busy_response()
     except Exception as e:
         logger.error(f"Error in login_auth: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -225,23 +275,26 @@ def register_auth():
 
             is_testing = data.get('is_testing', False)
 
+            # Hash before opening the registration transaction so the slow part holds no DB locks
+            password_hash = hash_password(data['password'])
+
             if role == 'teacher':
                 def register_teacher_operation():
                     new_user = User(
                         username=data['username'],
                         email=data['email'],
                         role='teacher',
-                        is_confirmed=is_testing
+                        is_confirmed=is_testing,
+                        password=password_hash
                     )
-                    new_user.set_password(data['password'])
                     db.session.add(new_user)
                     db.session.flush()  # flush to generate id before sending email
                     # generate confirmation token
-                    token = s.dumps({'user_id': new_user.id}, salt='email-confirm').decode('utf-8')
-                    db.session.commit()
+                    token = s.dumps({'user_id': new_user.id}, salt='email-confirm')
                     if not is_testing:
-                        # send confirmation email in non-testing env
+                        # queue confirmation email in non-testing env
                         send_confirmation_email(new_user, token)
+                    db.session.commit()
                     return jsonify({
                         'message': 'Registration successful. Please check your email to confirm your account.' if not is_testing else 'Registration successful (testing mode).',
                         'user_id': new_user.id,
@@ -286,21 +339,17 @@ def register_auth():
                         role='student',
                         grade=grade,
                         subjects=subjects,
-                        is_confirmed=is_testing
+                        is_confirmed=is_testing,
+                        password=password_hash
                     )
-                    new_user.set_password(data['password'])
                     db.session.add(new_user)
                     db.session.flush()  # flush to generate id before sending email
                     # generate confirmation token
-                    token = s.dumps({'user_id': new_user.id}, salt='email-confirm').decode('utf-8')
-                    db.session.commit()
+                    token = s.dumps({'user_id': new_user.id}, salt='email-confirm')
                     if not is_testing:
-                        # send confirmation email in non-testing env
-                        try:
-                            send_confirmation_email(new_user, token)
-                        except Exception as e:
-                            logger.error(f"Failed to send confirmation email: {e}")
-                            # Continue without failing the registration
+                        # queue confirmation email in non-testing env
+                        send_confirmation_email(new_user, token)
+                    db.session.commit()
                     return jsonify({
                         'message': 'Registration successful. Please check your email to confirm your account.' if not is_testing else 'Registration successful (testing mode).',
                         'user_id': new_user.id,
@@ -314,6 +363,8 @@ def register_auth():
 
             else:
                 return jsonify({'error': 'Invalid registration phase'}), 400
+    except HashingOverloaded:
+        return server_busy_response()
     except Exception as e:
         logger.error(f"Error in register_auth: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -333,6 +384,7 @@ def confirm_email():
             return jsonify({'message': 'Email already confirmed'}), 200
         user.is_confirmed = True
         db.session.commit()
+        invalidate_cached_user(user.id)
         # Redirect to login page after confirmation
         return redirect('/pages/user_login.html')
     except SignatureExpired:
@@ -340,6 +392,46 @@ def confirm_email():
     except BadSignature:
         return jsonify({'error': 'Invalid confirmation token'}), 400
 
+@auth_bp.route('/cache_stats', methods=['GET'])
+@token_required
+@role_required('admin')
+def cache_stats():
+    return jsonify({'user_cache': user_cache.stats()})
+
+@auth_bp.route('/outbox_stats', methods=['GET'])
+@token_required
+@role_required('admin')
+def get_outbox_stats():
+    return jsonify(outbox_stats())
+
+@auth_bp.route('/db_stats', methods=['GET'])
+@token_required
+@role_required('admin')
+def get_db_stats():
+    return jsonify(db_engine.pool_stats(current_app))
+
+@auth_bp.route('/content_stats', methods=['GET'])
+@token_required
+@role_required('admin')
+@read_only
+def get_content_stats():
+    # Content totals come from the per-grade rollups, so the listings never need a COUNT
+    row = db.session.execute(db.select(
+        db.func.coalesce(db.func.sum(GradeRollup.lesson_count), 0),
+        db.func.coalesce(db.func.sum(GradeRollup.approved_lesson_count), 0),
+        db.func.coalesce(db.func.sum(GradeRollup.quiz_count), 0),
+        db.func.coalesce(db.func.sum(GradeRollup.approved_quiz_count), 0),
+        db.select(db.func.count(User.id)).scalar_subquery()
+    )).one()
+    lessons, approved_lessons, quizzes, approved_quizzes, users = row
+    return jsonify({
+        'users': users,
+        'lessons': lessons,
+        'approved_lessons': approved_lessons,
+        'quizzes': quizzes,
+        'approved_quizzes': approved_quizzes
+    })
+
 @auth_bp.route('/test_email_send', methods=['GET'])
 def test_email_send():
     import traceback
@@ -0,0 +1,73 @@
+"""
+Compare time to first byte of the blocking and streaming AI tutor endpoints using the fake
+streaming backend, so no OpenAI key or network access is needed.
+
+    python bench_ai_stream.py --tokens 200 --token-delay 0.01
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import jwt
+from types import SimpleNamespace
+from app import app, limiter
+from auth import JWT_SECRET_KEY
+from models import db, User
+import ai_service
+
+
+def fake_blocking_client(backend):
+    def create(model, messages, stream=False, **params):
+        text = ''.join(backend.stream(model, messages, **params))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tokens', type=int, default=200)
+    parser.add_argument('--first-token-delay', type=float, default=0.3)
+    parser.add_argument('--token-delay', type=float, default=0.01)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    backend = ai_service.FakeStreamingBackend(
+        ' '.join(f'word{i}' for i in range(args.tokens)),
+        first_token_delay=args.first_token_delay,
+        token_delay=args.token_delay
+    )
+    ai_service.set_streaming_backend(backend)
+    ai_service.client = fake_blocking_client(backend)
+    limiter.enabled = False
+
+    with app.app_context():
+        db.create_all()
+        student = User(username='bench', email='bench@example.com', password='x', role='student', is_confirmed=True)
+        db.session.add(student)
+        db.session.commit()
+        token = jwt.encode({'user_id': student.id}, JWT_SECRET_KEY, algorithm='HS256')
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+
+    for name, url in (('blocking', '/api/ai/tutor'), ('streaming', '/api/ai/tutor/stream')):
+        first_bytes, totals = [], []
+        for run in range(args.runs):
+            ai_service.response_cache.clear()
+            start = time.perf_counter()
+            response = client.post(url, json={'query': f'question {run}'}, headers=headers, buffered=False)
+            chunks = iter(response.response)
+            next(chunks)
+            first_bytes.append(time.perf_counter() - start)
+            for _ in chunks:
+                pass
+            totals.append(time.perf_counter() - start)
+            response.close()
+        print(f"{name:>9}: time to first byte {sum(first_bytes) / len(first_bytes) * 1000:8.1f} ms, "
+              f"total {sum(totals) / len(totals) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Concurrent progress writers and lesson readers against a SQLite file, once with the old
+engine settings (rollback journal, synchronous=FULL) and once with the tuned profile from
+db_engine.py (WAL, synchronous=NORMAL, mmap and cache pragmas).
+
+    python bench_db_writes.py --writers 8 --readers 4 --transactions 200
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PROFILES = {
+    'baseline': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL',
+                 'SQLITE_MMAP_SIZE': '0', 'SQLITE_CACHE_SIZE': '-2000'},
+    'tuned': {},
+}
+
+
+def run(profile, args):
+    # Config reads the environment at import time, so pick the profile first
+    os.environ.update(PROFILES[profile])
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}'
+    from sqlalchemy.exc import OperationalError
+    from app import app
+    from models import db, User, Lesson, Progress
+    import db_engine
+
+    with app.app_context():
+        db.create_all()
+        teacher = User(username='t', email='t@example.com', password='x', role='teacher')
+        db.session.add(teacher)
+        db.session.flush()
+        lessons = [Lesson(title=f'L{n}', subject='Math', grade='Grade 8', content='x' * 2000, teacher_id=teacher.id)
+                   for n in range(50)]
+        students = [User(username=f's{n}', email=f's{n}@example.com', password='x', role='student')
+                    for n in range(args.writers)]
+        db.session.add_all(lessons + students)
+        db.session.commit()
+        lesson_ids = [lesson.id for lesson in lessons]
+        student_ids = [student.id for student in students]
+
+    locked = []
+    done = threading.Event()
+
+    def writer(student_id):
+        with app.app_context():
+            for n in range(args.transactions):
+                lesson_id = lesson_ids[n % len(lesson_ids)]
+                try:
+                    # Read then write in one transaction, like the progress endpoints
+                    row = Progress.query.filter_by(user_id=student_id, lesson_id=lesson_id).first()
+                    if row is None:
+                        db.session.add(Progress(user_id=student_id, lesson_id=lesson_id, progress=n))
+                    else:
+                        row.progress = n
+                    db.session.commit()
+                except OperationalError:
+                    db.session.rollback()
+                    locked.append(student_id)
+
+    def reader():
+        with app.app_context():
+            while not done.is_set():
+                Lesson.query.order_by(Lesson.id).limit(50).all()
+                db.session.commit()
+
+    readers = [threading.Thread(target=reader) for _ in range(args.readers)]
+    writers = [threading.Thread(target=writer, args=(student_id,)) for student_id in student_ids]
+    for thread in readers:
+        thread.start()
+    start = time.perf_counter()
+    for thread in writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    total = args.writers * args.transactions
+    stats = db_engine.pool_stats(app)['default']
+    print(f"{profile:>9}: {(total - len(locked)) / elapsed:8.0f} commits/s, {len(locked):5d} 'database is locked' "
+          f"of {total}, peak pool utilization {stats['peak_utilization']}, avg hold {stats['avg_hold_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profile', choices=['both'] + list(PROFILES), default='both')
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--transactions', type=int, default=200)
+    args = parser.parse_args()
+    if args.profile != 'both':
+        run(args.profile, args)
+        return
+    # Each profile runs in a fresh interpreter so its settings are read at import
+    for profile in PROFILES:
+        subprocess.run([sys.executable, __file__, '--profile', profile, '--writers', str(args.writers),
+                        '--readers', str(args.readers), '--transactions', str(args.transactions)], check=True)
+
+
+if __name__ == '__main__':
+    main()
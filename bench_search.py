@@ -0,0 +1,101 @@
+"""
+Time lesson search over a synthetic catalogue: the FTS5 index against a LIKE scan of the
+lesson table (roughly what filtering the full listing costs, minus the transfer).
+
+    python bench_search.py --lessons 100000 --queries 200
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(_db_dir, "bench.db")}'
+
+from app import app, limiter
+from models import db, User, Lesson
+import search
+
+SUBJECTS = ['Math', 'Biology', 'Physics', 'Chemistry', 'History', 'Geography', 'English', 'ICT']
+GRADES = [f'Grade {n}' for n in range(6, 14)]
+
+
+def vocabulary(size, rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return [''.join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(size)]
+
+
+def seed(count, rng):
+    words = vocabulary(20000, rng)
+    teacher = User(username='bench', email='bench@example.com', password='x', role='teacher')
+    db.session.add(teacher)
+    db.session.commit()
+    batch = []
+    for i in range(count):
+        batch.append({
+            'title': ' '.join(rng.choices(words, k=5)),
+            'content': ' '.join(rng.choices(words, k=300)),
+            'subject': rng.choice(SUBJECTS),
+            'grade': rng.choice(GRADES),
+            'status': 'approved',
+            'teacher_id': teacher.id,
+        })
+        if len(batch) == 5000:
+            db.session.execute(db.insert(Lesson), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(Lesson), batch)
+    db.session.commit()
+    return words
+
+
+def timed(label, queries, run):
+    start = time.perf_counter()
+    for term in queries:
+        run(term)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>18}: {elapsed / len(queries) * 1000:8.2f} ms/query")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lessons', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+    limiter.enabled = False
+    rng = random.Random(7)
+
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        words = seed(args.lessons, rng)
+        print(f"Seeded {args.lessons} lessons in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        search.rebuild_index()
+        print(f"Rebuilt the index in {time.perf_counter() - start:.1f}s")
+
+        queries = rng.sample(words, args.queries)
+        client = app.test_client()
+
+        def like_scan(term):
+            pattern = f'%{term}%'
+            query = Lesson.query.filter(db.or_(Lesson.title.like(pattern), Lesson.content.like(pattern)))
+            query.count()
+            query.order_by(Lesson.id).limit(20).all()
+
+        timed('LIKE scan', queries, like_scan)
+        timed('FTS5 /api/search', queries, lambda term: client.get(f'/api/search?type=lessons&q={term}'))
+
+        # Incremental maintenance on the write path
+        lessons = Lesson.query.order_by(Lesson.id).limit(200).all()
+        start = time.perf_counter()
+        for lesson in lessons:
+            lesson.content = ' '.join(rng.choices(words, k=300))
+            db.session.commit()
+        print(f"{'update + reindex':>18}: {(time.perf_counter() - start) / len(lessons) * 1000:8.2f} ms/lesson")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Compare bytes on the wire and requests per second for the static pages, CSS and JS served
+with plain send_from_directory (the previous routes) and with the precompressed asset store.
+
+    python bench_static.py --rounds 20
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from flask import send_from_directory
+from app import app, limiter
+
+BROWSER_HEADERS = {'Accept-Encoding': 'gzip, deflate, br'}
+
+
+# The old routes, mounted on the same app so both paths pass through the same middleware
+@app.route('/baseline/<any(pages, css, public):directory>/<path:filename>')
+@limiter.exempt
+def baseline_static(directory, filename):
+    return send_from_directory(directory, filename)
+
+
+def page_urls():
+    pages = [f'/pages/{name}' for name in sorted(os.listdir(os.path.join(app.root_path, 'pages')))]
+    # The fingerprinted CSS/JS URLs the rewritten pages reference
+    store = app.extensions['static_assets']
+    assets = sorted({url for url, asset in store.assets.items() if url != asset.url})
+    return pages, assets
+
+
+def measure(label, client, urls, rounds, revisit):
+    validators = {}
+    total_bytes = 0
+    requests = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for url in urls:
+            headers = dict(BROWSER_HEADERS)
+            if revisit and url in validators:
+                headers['If-None-Match'] = validators[url]
+            response = client.get(url, headers=headers)
+            total_bytes += len(response.data)
+            requests += 1
+            if response.headers.get('ETag'):
+                validators[url] = response.headers['ETag']
+    elapsed = time.perf_counter() - start
+    print(f"{label:>28}: {total_bytes / rounds / 1024:8.1f} KiB per page set, {requests / elapsed:8.0f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+    limiter.enabled = False
+
+    client = app.test_client()
+    pages, assets = page_urls()
+    baseline = ['/baseline' + url for url in pages + ['/css/main.css', '/public/app.js']]
+
+    measure('send_from_directory', client, baseline, args.rounds, revisit=False)
+    measure('send_from_directory, revisit', client, baseline, args.rounds, revisit=True)
+    measure('asset store', client, pages + assets, args.rounds, revisit=False)
+    measure('asset store, revisit', client, pages + assets, args.rounds, revisit=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Measure sustained quiz submissions per second with direct inserts and with the write-behind
+submission log, against a file-backed SQLite database as used in development.
+
+    python bench_submissions.py --submissions 2000 --threads 16
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+workdir = tempfile.mkdtemp(prefix='bench-submissions-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+
+import jwt
+from app import app, limiter
+from auth import JWT_SECRET_KEY
+from models import db, User, Quiz, QuizResult
+import submission_log
+
+
+def setup(students):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        teacher = User(username='teacher', email='teacher@example.com', password='x', role='teacher', is_confirmed=True)
+        db.session.add(teacher)
+        db.session.flush()
+        quiz = Quiz(title='Exam', subject='Math', grade='Grade 6', teacher_id=teacher.id)
+        quiz.set_questions([{'question': f'Q{i}', 'options': ['a', 'b', 'c', 'd'], 'correct_answer': 'a'}
+                            for i in range(20)])
+        users = [User(username=f'student{i}', email=f'student{i}@example.com', password='x', role='student',
+                      is_confirmed=True) for i in range(students)]
+        db.session.add_all([quiz] + users)
+        db.session.commit()
+        tokens = [jwt.encode({'user_id': user.id}, JWT_SECRET_KEY, algorithm='HS256') for user in users]
+        return quiz.id, tokens
+
+
+def run(label, quiz_id, tokens, submissions, threads):
+    answers = ['a', 'b', 'a', 'c'] * 5
+
+    def submit(n):
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {tokens[n % len(tokens)]}'}
+        return client.post(f'/api/student/quizzes/{quiz_id}/submit', json={'answers': answers}, headers=headers).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        statuses = list(executor.map(submit, range(submissions)))
+    elapsed = time.perf_counter() - start
+    errors = sum(1 for status in statuses if status >= 400)
+    print(f"{label:>12}: {submissions / elapsed:8.1f} submits/s acknowledged ({errors} errors)")
+
+    if app.config['SUBMISSION_WRITE_BEHIND']:
+        start = time.perf_counter()
+        with app.app_context():
+            while submission_log.flush_pending():
+                pass
+        print(f"{'':>12}  drained log into the database in {time.perf_counter() - start:.2f}s")
+    with app.app_context():
+        print(f"{'':>12}  {QuizResult.query.count()} results stored")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--submissions', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--students', type=int, default=500)
+    args = parser.parse_args()
+
+    limiter.enabled = False
+    app.config['SUBMISSION_LOG_PATH'] = os.path.join(workdir, 'submissions.log')
+    # Flush explicitly after each run instead of from the background thread
+    submission_log._worker = object()
+
+    for label, write_behind in (('direct', False), ('write-behind', True)):
+        quiz_id, tokens = setup(args.students)
+        app.config['SUBMISSION_WRITE_BEHIND'] = write_behind
+        run(label, quiz_id, tokens, args.submissions, args.threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,14 +8,73 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///edu_tech.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Database engine profile (db_engine.py): pragmas applied to every SQLite connection...
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))  # milliseconds
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')  # NORMAL is durable in WAL except on power loss
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # bytes
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', -64000))  # negative means KiB
+    # ...and pool settings (recycle and pre-ping only apply to server databases such as Postgres)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))  # seconds to wait for a connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # seconds
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+
+    # Read replicas (replicas.py): comma-separated database URLs, each added as a replica_<n> bind
+    READ_REPLICA_URLS = [url.strip() for url in os.getenv('READ_REPLICA_URLS', '').split(',') if url.strip()]
+    SQLALCHEMY_BINDS = {f'replica_{n}': url for n, url in enumerate(READ_REPLICA_URLS)}
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))  # primary reads after a user's write
+    REPLICA_RETRY_INTERVAL = int(os.getenv('REPLICA_RETRY_INTERVAL', 30))  # seconds a failed replica is skipped
+
+    # Authenticated user cache used by auth.token_required
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 60))  # seconds
+
+    # Password hashing pool (utils/hashing.py); 0 workers hashes inline
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    HASH_POOL_WORKERS = int(os.getenv('HASH_POOL_WORKERS', 2))
+    HASH_QUEUE_LIMIT = int(os.getenv('HASH_QUEUE_LIMIT', 32))
+    HASH_TIMEOUT = int(os.getenv('HASH_TIMEOUT', 10))  # seconds
+
     # File upload configuration
     UPLOAD_FOLDER = 'uploads'
     ALLOWED_EXTENSIONS = {'pdf', 'mp4', 'mov', 'avi', 'mkv'}
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max request body
+
+    # Resumable chunked uploads (uploads.py); each chunk must fit MAX_CONTENT_LENGTH
+    UPLOAD_MAX_FILE_SIZE = int(os.getenv('UPLOAD_MAX_FILE_SIZE', 8 * 1024 ** 3))  # 8GB
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))  # suggested to clients
+    UPLOAD_WRITE_BUFFER = int(os.getenv('UPLOAD_WRITE_BUFFER', 1024 * 1024))  # bytes read per write
+    UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 48))  # hours before an idle upload is pruned
+
+    # Serving uploaded media with byte ranges (utils/media.py)
+    MEDIA_BLOCK_SIZE = int(os.getenv('MEDIA_BLOCK_SIZE', 256 * 1024))  # bytes per read
+    MEDIA_USE_FILE_WRAPPER = os.getenv('MEDIA_USE_FILE_WRAPPER', 'True').lower() == 'true'  # sendfile under gunicorn
+    MEDIA_OFFLOAD = os.getenv('MEDIA_OFFLOAD')  # x-accel-redirect or x-sendfile to let the proxy send files
+    MEDIA_OFFLOAD_PREFIX = os.getenv('MEDIA_OFFLOAD_PREFIX', '/protected-uploads')  # nginx internal location
+
+    # Static pages, CSS and JS (static_assets.py)
+    STATIC_MEMORY_MAX_SIZE = int(os.getenv('STATIC_MEMORY_MAX_SIZE', 256 * 1024))  # bytes
+    STATIC_COMPRESS_MIN_SIZE = int(os.getenv('STATIC_COMPRESS_MIN_SIZE', 512))  # bytes
+    STATIC_CACHE_DIR = os.getenv('STATIC_CACHE_DIR')  # defaults to <instance>/static_cache
 
     # OpenAI configuration
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
+    # Background AI content generation jobs (generation_jobs.py)
+    AI_GENERATION_CONCURRENCY = int(os.getenv('AI_GENERATION_CONCURRENCY', 4))
+    AI_REQUESTS_PER_MINUTE = int(os.getenv('AI_REQUESTS_PER_MINUTE', 60))
+    AI_REQUEST_BURST = int(os.getenv('AI_REQUEST_BURST', 5))
+    # Bucket state shared by every worker process on the host; hosts sharing one provider key
+    # should point this at a common filesystem or lower AI_REQUESTS_PER_MINUTE per host
+    AI_RATE_LIMIT_PATH = os.getenv('AI_RATE_LIMIT_PATH', 'instance/ai_rate_limit')
+    AI_GENERATION_MAX_ATTEMPTS = int(os.getenv('AI_GENERATION_MAX_ATTEMPTS', 4))
+    AI_RETRY_BASE_DELAY = float(os.getenv('AI_RETRY_BASE_DELAY', 2.0))  # seconds
+    AI_RETRY_MAX_DELAY = float(os.getenv('AI_RETRY_MAX_DELAY', 60.0))  # seconds
+    # Running jobs older than this are assumed to have lost their process and are resumed
+    AI_GENERATION_JOB_TIMEOUT = int(os.getenv('AI_GENERATION_JOB_TIMEOUT', 3600))  # seconds
+
     # Flask-Mail configuration
     MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.getenv('MAIL_PORT', 587))
@@ -25,6 +84,32 @@ class Config:
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD', 'lobghmsuvowocqwe')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER', MAIL_USERNAME)
 
+    # Email outbox delivery (mail_outbox.py)
+    OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 50))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+    OUTBOX_RETRY_BASE = int(os.getenv('OUTBOX_RETRY_BASE', 30))  # seconds, doubled after each failure
+    OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', 300))
+    OUTBOX_POLL_INTERVAL = int(os.getenv('OUTBOX_POLL_INTERVAL', 5))  # seconds
+
+    # Quiz grading and write-behind submission ingestion (grading.py, submission_log.py)
+    GRADING_KEY_CACHE_SIZE = int(os.getenv('GRADING_KEY_CACHE_SIZE', 1000))
+    GRADING_KEY_CACHE_TTL = int(os.getenv('GRADING_KEY_CACHE_TTL', 300))  # seconds
+    SUBMISSION_WRITE_BEHIND = os.getenv('SUBMISSION_WRITE_BEHIND', 'False').lower() == 'true'
+    SUBMISSION_LOG_PATH = os.getenv('SUBMISSION_LOG_PATH', 'instance/submissions.log')
+    SUBMISSION_LOG_FSYNC = os.getenv('SUBMISSION_LOG_FSYNC', 'True').lower() == 'true'
+    SUBMISSION_FLUSH_BATCH = int(os.getenv('SUBMISSION_FLUSH_BATCH', 500))
+    SUBMISSION_FLUSH_INTERVAL = float(os.getenv('SUBMISSION_FLUSH_INTERVAL', 0.5))  # seconds
+
+    # Lesson progress heartbeats (progress_writer.py)
+    PROGRESS_COALESCE = os.getenv('PROGRESS_COALESCE', 'False').lower() == 'true'
+    PROGRESS_FLUSH_INTERVAL = float(os.getenv('PROGRESS_FLUSH_INTERVAL', 5.0))  # seconds
+    PROGRESS_FLUSH_BATCH = int(os.getenv('PROGRESS_FLUSH_BATCH', 1000))
+    PROGRESS_BATCH_MAX_ITEMS = int(os.getenv('PROGRESS_BATCH_MAX_ITEMS', 200))
+
+    # Student lesson/quiz feeds shared per (grade, subjects) (feed.py)
+    FEED_CACHE_SIZE = int(os.getenv('FEED_CACHE_SIZE', 512))
+    FEED_CACHE_TTL = int(os.getenv('FEED_CACHE_TTL', 600))  # seconds; content changes invalidate sooner
+
 class DevelopmentConfig(Config):
     DEBUG = True
 
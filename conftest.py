@@ -0,0 +1,52 @@
+import os
+
+# Point the app at a throwaway in-memory database before it is imported
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+import jwt
+import pytest
+from app import app as flask_app, limiter
+from models import db, User
+from auth import JWT_SECRET_KEY, user_cache
+import grading
+import feed
+
+
+@pytest.fixture
+def app():
+    limiter.enabled = False
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+        # Row ids are reused by the next test's fresh database
+        user_cache.clear()
+        grading.key_cache.clear()
+        feed.feed_cache.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers():
+    """Build the bearer-token headers for a user id."""
+    def build(user_id):
+        token = jwt.encode({'user_id': user_id}, JWT_SECRET_KEY, algorithm='HS256')
+        return {'Authorization': f'Bearer {token}'}
+    return build
+
+
+@pytest.fixture
+def make_user(app, auth_headers):
+    """Create a confirmed user and return it with its auth headers."""
+    def make(username, role, **fields):
+        user = User(username=username, email=f'{username}@example.com', password='x', role=role,
+                    is_confirmed=True, **fields)
+        db.session.add(user)
+        db.session.commit()
+        return user, auth_headers(user.id)
+    return make
@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+from sqlalchemy import event, select
+from sqlalchemy.orm import object_session
+from models import db, Lesson, Quiz, ContentVersion
+from utils.upsert import upsert
+
+# Every ORM change to a lesson or quiz bumps the row's version and updated_date, and the
+# counter for its collection in content_version. These back the ETag/Last-Modified headers
+# on the content endpoints. Bulk Query.update()/delete() bypass the events.
+
+content_version = ContentVersion.__table__
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _bump_collection(connection, name):
+    upsert(connection, content_version, {'name': name, 'version': 1, 'updated_date': _now()},
+           lambda current, excluded: {'version': current.version + 1, 'updated_date': excluded.updated_date})
+
+
+def collection_version(name):
+    """Return (version, updated_date) for a content collection."""
+    row = db.session.execute(
+        select(content_version.c.version, content_version.c.updated_date).where(content_version.c.name == name)
+    ).first()
+    return (row.version, row.updated_date) if row else (0, None)
+
+
+def _versioned(model, name):
+    @event.listens_for(model, 'before_update')
+    def _bump_row(mapper, connection, target):
+        # before_update also fires for rows that are only dirty through a relationship
+        if object_session(target).is_modified(target, include_collections=False):
+            target.version = (target.version or 0) + 1
+            target.updated_date = _now()
+
+    @event.listens_for(model, 'after_insert')
+    @event.listens_for(model, 'after_update')
+    @event.listens_for(model, 'after_delete')
+    def _bump(mapper, connection, target):
+        _bump_collection(connection, name)
+
+
+_versioned(Lesson, 'lesson')
+_versioned(Quiz, 'quiz')
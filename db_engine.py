@@ -0,0 +1,139 @@
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Engine profile applied to every configured engine. SQLite connections get WAL journaling
+# (readers stop blocking the writer), a busy timeout and the sync/cache/mmap pragmas from
+# config.py on connect. Pool sizing applies to every pooled engine, with pre-ping and
+# recycling for server databases such as Postgres. Each engine's pool is instrumented for
+# the admin db_stats endpoint.
+
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'SQLITE_JOURNAL_MODE'),
+    ('busy_timeout', 'SQLITE_BUSY_TIMEOUT'),
+    ('synchronous', 'SQLITE_SYNCHRONOUS'),
+    ('mmap_size', 'SQLITE_MMAP_SIZE'),
+    ('cache_size', 'SQLITE_CACHE_SIZE'),
+)
+
+
+def engine_options(config, uri):
+    """Pool options for the database at uri."""
+    url = make_url(uri)
+    options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    }
+    if url.get_backend_name() == 'sqlite':
+        # An in-memory database lives in a single shared connection, so it has no pool to size
+        return {} if url.database in (None, '', ':memory:') else options
+    options.update(pool_recycle=config['DB_POOL_RECYCLE'], pool_pre_ping=config['DB_POOL_PRE_PING'])
+    return options
+
+
+def sqlite_pragmas(config):
+    return [(pragma, config[key]) for pragma, key in SQLITE_PRAGMAS if config.get(key) is not None]
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas:
+                cursor.execute(f'PRAGMA {pragma}={value}')
+        finally:
+            cursor.close()
+
+
+class PoolMetrics:
+    """Checkout counters for one engine's pool, fed by pool events."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._checked_out_at = {}
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.hold_seconds = 0.0
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+            self._checked_out_at[id(connection_record)] = time.perf_counter()
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            started = self._checked_out_at.pop(id(connection_record), None)
+            if started is not None:
+                self.checked_out -= 1
+                self.hold_seconds += time.perf_counter() - started
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self):
+        pool = self.engine.pool
+        # Only a bounded QueuePool has a fixed capacity; the SQLite memory pools do not
+        capacity = None
+        if isinstance(pool, QueuePool) and pool._max_overflow >= 0:
+            capacity = pool.size() + pool._max_overflow
+        with self._lock:
+            returned = self.checkouts - self.checked_out
+            return {
+                'dialect': self.engine.dialect.name,
+                'pool': type(pool).__name__,
+                'status': pool.status(),
+                'capacity': capacity,
+                'checked_out': self.checked_out,
+                'peak_checked_out': self.peak_checked_out,
+                'utilization': round(self.checked_out / capacity, 4) if capacity else None,
+                'peak_utilization': round(self.peak_checked_out / capacity, 4) if capacity else None,
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'avg_hold_ms': round(self.hold_seconds / returned * 1000, 3) if returned else 0.0
+            }
+
+
+def init_app(app, db):
+    """Apply the engine profile from app.config, initialise db, and instrument every engine."""
+    config = app.config
+    config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = {**engine_options(config, config['SQLALCHEMY_DATABASE_URI']),
+                                           **config['SQLALCHEMY_ENGINE_OPTIONS']}
+    # Binds given as plain URLs get the pool options for their own database
+    config['SQLALCHEMY_BINDS'] = {
+        key: {'url': value, **engine_options(config, value)} if isinstance(value, str) else value
+        for key, value in (config.get('SQLALCHEMY_BINDS') or {}).items()
+    }
+    db.init_app(app)
+    metrics = {}
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            if engine.dialect.name == 'sqlite':
+                apply_sqlite_pragmas(engine, sqlite_pragmas(config))
+            metrics[bind] = PoolMetrics(engine)
+    app.extensions['db_engine'] = metrics
+    return metrics
+
+
+def pool_stats(app):
+    return {bind or 'default': metrics.stats() for bind, metrics in app.extensions['db_engine'].items()}
@@ -0,0 +1,114 @@
+import json
+from bisect import bisect_left
+from sqlalchemy import func
+from config import get_config
+from models import db, Lesson, Quiz
+from content_versions import collection_version
+from utils.cache import TTLCache
+from utils.pagination import encode_cursor, decode_cursor, LISTING_FILTERS
+from utils.projection import apply_projection
+
+# Student feeds: approved lessons/quizzes for one grade and subject set, newest first.
+# Every student with the same grade and subjects gets the same list, so it is built once
+# and cached under the collection version from content_versions.py; any lesson or quiz
+# change (approval included) bumps that version, which makes older entries unreachable
+# in every worker without explicit invalidation. Only summary rows are cached; a page that
+# asks for other fields loads just its own rows with that projection.
+
+config = get_config()
+
+feed_cache = TTLCache(maxsize=config.FEED_CACHE_SIZE, ttl=config.FEED_CACHE_TTL)
+
+MODELS = {'lesson': Lesson, 'quiz': Quiz}
+
+# Grade 12-13 students register a stream rather than subjects. Lesson and quiz subjects are
+# free text, so a stream cannot be mapped onto them reliably and these students get the
+# whole grade. Grade 10-11 students register their basket subjects and also take the core
+# subjects below (with the spellings teachers commonly use).
+STREAMS = frozenset({'science stream', 'commerce stream', 'arts stream', 'technology stream'})
+CORE_SUBJECTS = frozenset({'english', 'mathematics', 'maths', 'math', 'science', 'history', 'religion',
+                           'sinhala', 'tamil'})
+
+
+class Feed:
+    def __init__(self, model, rows):
+        self.model = model
+        self.items = [row.to_dict(model.SUMMARY_FIELDS) for row in rows]
+        # (uploaded_date, id) ascending, for finding a cursor's position with bisect
+        self.keys = [(row.uploaded_date, row.id) for row in reversed(rows)]
+
+    def page(self, cursor, limit, fields, args):
+        """One page after cursor, keeping only items that match the listing filters in args."""
+        start = 0
+        if cursor:
+            start = len(self.keys) - bisect_left(self.keys, decode_cursor(cursor))
+        filters = {field: args[field] for field in LISTING_FILTERS if args.get(field)}
+        items, last = [], None
+        next_cursor = None
+        for position in range(start, len(self.items)):
+            item = self.items[position]
+            if any(str(item[field]) != value for field, value in filters.items()):
+                continue
+            if len(items) == limit:
+                uploaded_date, row_id = self.keys[len(self.keys) - 1 - last]
+                next_cursor = encode_cursor(uploaded_date, row_id)
+                break
+            items.append(item)
+            last = position
+        return self._project(items, fields), next_cursor
+
+    def _project(self, items, fields):
+        if set(fields) <= set(self.model.SUMMARY_FIELDS):
+            return [{field: item[field] for field in fields} for item in items]
+        ids = [item['id'] for item in items]
+        if not ids:
+            return []
+        rows = apply_projection(self.model.query.filter(self.model.id.in_(ids)), self.model, fields).all()
+        by_id = {row.id: row for row in rows}
+        # A row deleted since the feed was built is simply left out
+        return [by_id[row_id].to_dict(fields) for row_id in ids if row_id in by_id]
+
+
+def student_subjects(user):
+    """The lowercased subjects whose content the student sees; None means every subject of the grade."""
+    raw = user.subjects
+    if not raw:
+        return None
+    try:
+        subjects = json.loads(raw)
+    except ValueError:
+        subjects = raw.split(',')
+    if isinstance(subjects, str):
+        subjects = [subjects]
+    elif not isinstance(subjects, list):
+        # Valid JSON but not a subject list, e.g. a number or an object
+        return None
+    subjects = frozenset(subject.strip().lower() for subject in subjects
+                         if isinstance(subject, str) and subject.strip())
+    if not subjects or subjects & STREAMS:
+        return None
+    return subjects | CORE_SUBJECTS
+
+
+def _build(model, grade, subjects):
+    query = model.query.filter(model.status == 'approved')
+    if grade:
+        query = query.filter(model.grade == grade)
+    if subjects:
+        query = query.filter(func.lower(model.subject).in_(sorted(subjects)))
+    rows = apply_projection(query, model, model.SUMMARY_FIELDS) \
+        .order_by(model.uploaded_date.desc(), model.id.desc()).all()
+    return Feed(model, rows)
+
+
+def get_feed(kind, user):
+    """Return (feed, version, updated_date) for the user's grade and subjects."""
+    version, updated_date = collection_version(kind)
+    grade = user.grade
+    subjects = student_subjects(user)
+    key = (kind, version, grade, subjects)
+    feed = feed_cache.get(key)
+    if feed is None:
+        feed = _build(MODELS[kind], grade, subjects)
+        feed_cache.set(key, feed)
+    return feed, version, updated_date
@@ -0,0 +1,117 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from config import get_config
+from models import db, GenerationJob
+from utils.ratelimit import SharedTokenBucket
+import ai_service
+
+# Bulk content generation runs on a small worker pool instead of the web workers. Every
+# upstream call takes a token from a bucket kept in AI_RATE_LIMIT_PATH, which all worker
+# processes on the host share, so a burst of jobs is paced to the provider's rate limit as a
+# whole; failed calls are retried with jittered exponential backoff.
+# A worker claims a job by moving it from queued to running in one conditional UPDATE, so a
+# job submitted twice, or resumed by several processes at once, still runs exactly once.
+
+logger = logging.getLogger(__name__)
+
+config = get_config()
+MAX_ATTEMPTS = config.AI_GENERATION_MAX_ATTEMPTS
+RETRY_BASE_DELAY = config.AI_RETRY_BASE_DELAY
+RETRY_MAX_DELAY = config.AI_RETRY_MAX_DELAY
+JOB_TIMEOUT = config.AI_GENERATION_JOB_TIMEOUT
+
+rate_limiter = SharedTokenBucket(config.AI_RATE_LIMIT_PATH, rate=config.AI_REQUESTS_PER_MINUTE / 60.0,
+                                 capacity=config.AI_REQUEST_BURST)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.AI_GENERATION_CONCURRENCY,
+                                           thread_name_prefix='ai-generation')
+        return _executor
+
+
+def resume_unfinished(app):
+    """Queue the jobs a previous process left behind; call once at startup."""
+    with app.app_context():
+        # A job still running after JOB_TIMEOUT has lost its worker; younger ones may be live
+        stale = datetime.now(timezone.utc) - timedelta(seconds=JOB_TIMEOUT)
+        db.session.execute(
+            db.update(GenerationJob)
+            .where(GenerationJob.status == 'running', GenerationJob.started_date < stale)
+            .values(status='queued')
+        )
+        db.session.commit()
+        job_ids = [job_id for (job_id,) in db.session.query(GenerationJob.id)
+                   .filter(GenerationJob.status == 'queued').order_by(GenerationJob.id)]
+    executor = _get_executor()
+    return [executor.submit(run_job, app, job_id) for job_id in job_ids]
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given 1-based attempt number."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+def submit_jobs(app, teacher_id, topics):
+    jobs = [GenerationJob(teacher_id=teacher_id, topic=topic) for topic in topics]
+    db.session.add_all(jobs)
+    db.session.commit()
+    executor = _get_executor()
+    for job in jobs:
+        executor.submit(run_job, app, job.id)
+    return jobs
+
+
+def run_job(app, job_id):
+    with app.app_context():
+        try:
+            _run_job(job_id)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Generation job {job_id} crashed: {e}")
+        finally:
+            db.session.remove()
+
+
+def _run_job(job_id):
+    claimed = db.session.execute(
+        db.update(GenerationJob)
+        .where(GenerationJob.id == job_id, GenerationJob.status == 'queued')
+        .values(status='running', started_date=datetime.now(timezone.utc))
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return
+    job = db.session.get(GenerationJob, job_id)
+
+    while True:
+        rate_limiter.acquire()
+        job.attempts += 1
+        try:
+            job.result = ai_service.complete_content(job.topic)
+        except Exception as e:
+            job.error = str(e)
+            if job.attempts >= MAX_ATTEMPTS:
+                job.status = 'failed'
+                job.finished_date = datetime.now(timezone.utc)
+                db.session.commit()
+                logger.warning(f"Generation job {job.id} failed after {job.attempts} attempts: {e}")
+                return
+            db.session.commit()
+            time.sleep(backoff_delay(job.attempts))
+            continue
+        job.status = 'succeeded'
+        job.error = None
+        job.finished_date = datetime.now(timezone.utc)
+        db.session.commit()
+        return
@@ -0,0 +1,184 @@
+import json
+from collections import namedtuple
+from datetime import datetime, timezone
+import numpy as np
+from sqlalchemy import select, insert, update
+from config import get_config
+from models import db, Quiz, QuizAttempt, QuizResult
+from utils.cache import TTLCache
+import analytics
+
+# Answers are normalised to strings once, then a whole batch of submissions is scored as
+# an (n_results, n_questions) array compared against the key in a single operation.
+
+REGRADE_BATCH_SIZE = 5000
+
+config = get_config()
+
+AnswerKey = namedtuple('AnswerKey', 'keys points question_count')
+
+key_cache = TTLCache(maxsize=config.GRADING_KEY_CACHE_SIZE, ttl=config.GRADING_KEY_CACHE_TTL)
+
+_LIST_SEPARATOR = '\x1f'
+
+
+def _to_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        # Multi-select answers match regardless of the order the options were picked in
+        return _LIST_SEPARATOR.join(sorted(_to_text(item) for item in value))
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def _normalize(values):
+    return np.char.lower(np.char.strip(np.asarray(values, dtype=str)))
+
+
+def _answer_index(key):
+    # Answers may be keyed by 0-based position ("0") or by 1-based label ("q1")
+    key = str(key).strip().lower()
+    if key.isdigit():
+        return int(key)
+    if key.startswith('q') and key[1:].isdigit():
+        return int(key[1:]) - 1
+    return None
+
+
+def _answer_row(answers, n_questions):
+    row = [''] * n_questions
+    if isinstance(answers, dict):
+        items = ((_answer_index(key), value) for key, value in answers.items())
+    elif isinstance(answers, list):
+        items = enumerate(answers)
+    else:
+        items = ()
+    for index, value in items:
+        if index is not None and 0 <= index < n_questions:
+            row[index] = _to_text(value)
+    return row
+
+
+def answer_key(quiz):
+    """Return (normalised keys, points) arrays for the quiz, ordered by question position."""
+    questions = list(quiz.questions)
+    keys = _normalize([_to_text(question.answer_key) for question in questions])
+    points = np.array([question.points for question in questions], dtype=float)
+    # Questions without an answer key are not graded
+    points[keys == ''] = 0.0
+    return keys, points
+
+
+def score_answers(keys, points, answer_sets):
+    """Score many submissions at once. Returns (scores, correct_counts) arrays."""
+    n_questions = len(keys)
+    if not answer_sets:
+        return np.array([], dtype=float), np.array([], dtype=int)
+    if n_questions == 0:
+        return np.zeros(len(answer_sets)), np.zeros(len(answer_sets), dtype=int)
+    matrix = _normalize([_answer_row(answers, n_questions) for answers in answer_sets])
+    correct = (matrix == keys) & (points > 0)
+    possible = points.sum()
+    scores = correct @ points / possible if possible else np.zeros(len(answer_sets))
+    return scores, correct.sum(axis=1)
+
+
+def cached_answer_key(quiz_id):
+    """Return the AnswerKey for a quiz, or None if it does not exist.
+
+    Entries are keyed by Quiz.version, which every quiz or question edit bumps, so a key
+    edited through another worker is never used; the version check is a primary key lookup.
+    """
+    version = db.session.execute(select(Quiz.version).where(Quiz.id == quiz_id)).scalar()
+    if version is None:
+        return None
+    key = key_cache.get((quiz_id, version))
+    if key is None:
+        quiz = db.session.get(Quiz, quiz_id)
+        if quiz is None:
+            return None
+        key = AnswerKey(*answer_key(quiz), quiz.question_count)
+        # Stored under the version the questions were read at, in case the quiz moved on meanwhile
+        key_cache.set((quiz_id, quiz.version), key)
+    return key
+
+
+def grade_submission(key, answers):
+    """Score a single submission against an AnswerKey. Returns (score, correct_count)."""
+    scores, correct_counts = score_answers(key.keys, key.points, [answers])
+    return float(scores[0]), int(correct_counts[0])
+
+
+def _parse(answers):
+    try:
+        return json.loads(answers) if answers else None
+    except ValueError:
+        return None
+
+
+def regrade_quiz(quiz_id, batch_size=REGRADE_BATCH_SIZE):
+    """Re-score every stored result for a quiz against its current answer key.
+
+    Results are scored in batches and written back with bulk statements. These skip the
+    mapper events, so the teacher rollup is adjusted here by the net change. Results
+    submitted before auto-grading existed get a QuizAttempt created for them.
+    Returns the number of results regraded.
+    """
+    quiz = db.session.get(Quiz, quiz_id)
+    if quiz is None:
+        raise ValueError(f'Quiz {quiz_id} not found')
+    keys, points = answer_key(quiz)
+    total_questions = quiz.question_count
+    now = datetime.now(timezone.utc)
+
+    regraded = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(QuizResult.id, QuizResult.student_id, QuizResult.answers, QuizResult.attempt_id, QuizAttempt.score)
+            .outerjoin(QuizAttempt, QuizAttempt.id == QuizResult.attempt_id)
+            .where(QuizResult.quiz_id == quiz_id, QuizResult.id > last_id)
+            .order_by(QuizResult.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        scores, correct_counts = score_answers(keys, points, [_parse(row.answers) for row in rows])
+        scores, correct_counts = scores.tolist(), correct_counts.tolist()
+
+        attempt_ids = [row.attempt_id for row in rows]
+        attempt_updates = []
+        new_attempts = []
+        score_delta = 0.0
+        for index, (row, score) in enumerate(zip(rows, scores)):
+            if row.attempt_id is None:
+                new_attempts.append((index, {'quiz_id': quiz_id, 'user_id': row.student_id, 'score': score,
+                                             'total_questions': total_questions, 'completed': True,
+                                             'attempted_at': now, 'completed_date': now}))
+            else:
+                attempt_updates.append({'id': row.attempt_id, 'score': score, 'total_questions': total_questions})
+            score_delta += score - (row.score or 0.0)
+
+        if new_attempts:
+            inserted = db.session.scalars(
+                insert(QuizAttempt).returning(QuizAttempt.id, sort_by_parameter_order=True),
+                [values for _, values in new_attempts]
+            ).all()
+            for (index, _), attempt_id in zip(new_attempts, inserted):
+                attempt_ids[index] = attempt_id
+        if attempt_updates:
+            db.session.execute(update(QuizAttempt), attempt_updates)
+        db.session.execute(update(QuizResult), [
+            {'id': row.id, 'score': score, 'correct_count': correct_count, 'total_questions': total_questions,
+             'graded_date': now, 'attempt_id': attempt_id}
+            for row, score, correct_count, attempt_id in zip(rows, scores, correct_counts, attempt_ids)
+        ])
+        analytics.adjust_quiz_attempts(db.session.connection(), quiz_id, attempt_count=len(new_attempts),
+                                       completed_attempt_count=len(new_attempts), score_sum=score_delta)
+        db.session.commit()
+        regraded += len(rows)
+    return regraded
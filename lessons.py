@@ -1,19 +1,51 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, abort
 from models import db, Lesson
 from auth import token_required, get_current_user
 from utils.validation import validate_required_fields, role_required
+from utils.pagination import paginate_listing, InvalidCursor
+from utils.projection import parse_fields, apply_projection, InvalidFields, SUMMARY
+from utils.conditional import make_etag, not_modified, with_validators
+from content_versions import collection_version
+from replicas import read_only
 
 lessons_bp = Blueprint('lessons_bp', __name__, url_prefix='/api/lessons')
 
 @lessons_bp.route('', methods=['GET'])
+@read_only
 def get_lessons():
-    lessons = Lesson.query.all()
-    return jsonify([lesson.to_dict() for lesson in lessons])
+    version, updated_date = collection_version('lesson')
+    etag = make_etag('lessons', version)
+    cached = not_modified(etag, updated_date)
+    if cached:
+        return cached
+    try:
+        fields = parse_fields(request.args, Lesson, default_view=SUMMARY)
+        query = apply_projection(Lesson.query, Lesson, fields)
+        lessons, next_cursor = paginate_listing(query, Lesson, request.args)
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
+    return with_validators(jsonify({
+        'lessons': [lesson.to_dict(fields) for lesson in lessons],
+        'next_cursor': next_cursor
+    }), etag, updated_date)
 
 @lessons_bp.route('/<int:lesson_id>', methods=['GET'])
+@read_only
 def get_lesson(lesson_id):
-    lesson = Lesson.query.get_or_404(lesson_id)
-    return jsonify(lesson.to_dict())
+    try:
+        fields = parse_fields(request.args, Lesson)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    current = db.session.execute(
+        db.select(Lesson.version, Lesson.updated_date).where(Lesson.id == lesson_id)).first()
+    if current is None:
+        abort(404)
+    etag = make_etag('lesson', lesson_id, current.version)
+    cached = not_modified(etag, current.updated_date)
+    if cached:
+        return cached
+    lesson = apply_projection(Lesson.query, Lesson, fields).get_or_404(lesson_id)
+    return with_validators(jsonify(lesson.to_dict(fields)), etag, current.updated_date)
 
 @lessons_bp.route('', methods=['POST'])
 @token_required
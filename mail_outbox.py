@@ -0,0 +1,130 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+_wakeup = threading.Event()
+
+
+def enqueue_email(recipient, subject, body):
+    """Queue an email for background delivery. The row is committed with the caller's transaction."""
+    message = EmailOutbox(recipient=recipient, subject=subject, body=body)
+    db.session.add(message)
+    # The worker is woken once the row is visible, not before the caller commits
+    db.session.info['outbox_wakeup'] = True
+    return message
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_after_commit(session):
+    if session.info.pop('outbox_wakeup', False):
+        _wakeup.set()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_wakeup(session):
+    session.info.pop('outbox_wakeup', None)
+
+
+def _claim_batch(batch_size, lease_seconds):
+    # Push next_attempt_at forward as a lease so concurrent workers skip these rows; if this
+    # worker dies mid-batch the rows become due again once the lease runs out.
+    now = datetime.now(timezone.utc)
+    lease_until = now + timedelta(seconds=lease_seconds)
+    due_ids = [row.id for row in db.session.query(EmailOutbox.id)
+               .filter(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now)
+               .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+               .limit(batch_size)]
+    if not due_ids:
+        return []
+    db.session.query(EmailOutbox) \
+        .filter(EmailOutbox.id.in_(due_ids), EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now) \
+        .update({'next_attempt_at': lease_until, 'attempts': EmailOutbox.attempts + 1}, synchronize_session=False)
+    db.session.commit()
+    return EmailOutbox.query.filter(EmailOutbox.id.in_(due_ids), EmailOutbox.next_attempt_at == lease_until) \
+        .order_by(EmailOutbox.id).all()
+
+
+def _record_failure(message, error):
+    config = current_app.config
+    message.last_error = str(error)
+    if message.attempts >= config['OUTBOX_MAX_ATTEMPTS']:
+        message.status = 'failed'
+        logger.error(f"Giving up on email {message.id} to {message.recipient}: {error}")
+    else:
+        delay = config['OUTBOX_RETRY_BASE'] * 2 ** (message.attempts - 1)
+        message.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        logger.warning(f"Email {message.id} to {message.recipient} failed, retrying in {delay}s: {error}")
+
+
+def deliver_pending(batch_size=None):
+    """Send one batch of due messages over a single SMTP connection. Returns the number sent."""
+    config = current_app.config
+    messages = _claim_batch(batch_size or config['OUTBOX_BATCH_SIZE'], config['OUTBOX_LEASE_SECONDS'])
+    if not messages:
+        return 0
+
+    sent = 0
+    mail = current_app.extensions['mail']
+    try:
+        with mail.connect() as connection:
+            for message in messages:
+                try:
+                    connection.send(Message(message.subject, recipients=[message.recipient], body=message.body))
+                except Exception as e:
+                    _record_failure(message, e)
+                    continue
+                message.status = 'sent'
+                message.sent_date = datetime.now(timezone.utc)
+                message.last_error = None
+                sent += 1
+    except Exception as e:
+        # Connecting or closing the SMTP session failed; retry whatever was not sent
+        for message in messages:
+            if message.status == 'pending':
+                _record_failure(message, e)
+    db.session.commit()
+    return sent
+
+
+def outbox_stats():
+    counts = dict(db.session.query(EmailOutbox.status, db.func.count(EmailOutbox.id)).group_by(EmailOutbox.status).all())
+    oldest_pending = db.session.query(db.func.min(EmailOutbox.created_date)).filter(EmailOutbox.status == 'pending').scalar()
+    return {
+        'pending': counts.get('pending', 0),
+        'sent': counts.get('sent', 0),
+        'failed': counts.get('failed', 0),
+        'oldest_pending': oldest_pending.isoformat() if oldest_pending else None
+    }
+
+
+def run_worker(app, stop_event=None):
+    """Deliver outbox messages until stop_event is set, waking early when new mail is queued."""
+    stop_event = stop_event or threading.Event()
+    interval = app.config['OUTBOX_POLL_INTERVAL']
+    while not stop_event.is_set():
+        sent = 0
+        with app.app_context():
+            try:
+                sent = deliver_pending()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Outbox delivery failed: {e}")
+            finally:
+                db.session.remove()
+        if not sent:
+            _wakeup.wait(interval)
+            _wakeup.clear()
+
+
+def start_worker(app):
+    stop_event = threading.Event()
+    thread = threading.Thread(target=run_worker, args=(app, stop_event), name='email-outbox', daemon=True)
+    thread.start()
+    return thread, stop_event
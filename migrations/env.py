@@ -94,6 +94,14 @@ def run_migrations_online():
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
 
+    # The FTS5 search tables and their shadow tables are not models (see search.py)
+    def include_name(name, type_, parent_names):
+        from search import is_index_table
+        return not (type_ == 'table' and is_index_table(name))
+
+    if conf_args.get("include_name") is None:
+        conf_args["include_name"] = include_name
+
     connectable = get_engine()
 
     with connectable.connect() as connection:
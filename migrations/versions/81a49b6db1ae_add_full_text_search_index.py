@@ -0,0 +1,43 @@
+"""Add full-text search index
+
+Revision ID: 81a49b6db1ae
+Revises: 173b75127281
+Create Date: 2026-10-17 22:37:05.720230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '81a49b6db1ae'
+down_revision = '173b75127281'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = {
+    'lesson_search': ('lesson', ('title', 'content'), 'bm25(10.0, 1.0)'),
+    'quiz_search': ('quiz', ('title',), 'bm25(1.0)'),
+}
+FILTER_COLUMNS = ('grade', 'subject', 'status')
+
+
+def upgrade():
+    # FTS5 is SQLite only; other databases have no search index
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table, (source, text_columns, rank) in INDEXES.items():
+        columns = ', '.join(text_columns + tuple(f'{column} UNINDEXED' for column in FILTER_COLUMNS))
+        op.execute(f"CREATE VIRTUAL TABLE {table} USING fts5({columns}, "
+                   f"tokenize='porter unicode61 remove_diacritics 2')")
+        op.execute(f"INSERT INTO {table}({table}, rank) VALUES ('rank', '{rank}')")
+        indexed = ', '.join(text_columns + FILTER_COLUMNS)
+        op.execute(f'INSERT INTO {table}(rowid, {indexed}) SELECT id, {indexed} FROM {source}')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in INDEXES:
+        op.execute(f'DROP TABLE {table}')
@@ -0,0 +1,79 @@
+"""Add indexes for hot query paths
+
+Revision ID: a73b7dc26dd8
+Revises: 857704b578d5
+Create Date: 2026-10-17 22:10:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a73b7dc26dd8'
+down_revision = '857704b578d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index('ix_user_role_grade', ['role', 'grade'], unique=False)
+
+    with op.batch_alter_table('lesson', schema=None) as batch_op:
+        batch_op.create_index('ix_lesson_teacher_id_status', ['teacher_id', 'status'], unique=False)
+        batch_op.create_index('ix_lesson_grade_subject', ['grade', 'subject'], unique=False)
+        batch_op.create_index('ix_lesson_uploaded_date_id', ['uploaded_date', 'id'], unique=False)
+
+    with op.batch_alter_table('quiz', schema=None) as batch_op:
+        batch_op.create_index('ix_quiz_teacher_id_status', ['teacher_id', 'status'], unique=False)
+        batch_op.create_index('ix_quiz_grade_subject', ['grade', 'subject'], unique=False)
+        batch_op.create_index('ix_quiz_uploaded_date_id', ['uploaded_date', 'id'], unique=False)
+
+    with op.batch_alter_table('quiz_attempt', schema=None) as batch_op:
+        batch_op.create_index('ix_quiz_attempt_quiz_id_completed', ['quiz_id', 'completed'], unique=False)
+        batch_op.create_index('ix_quiz_attempt_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('lesson_progress', schema=None) as batch_op:
+        batch_op.create_index('ix_lesson_progress_lesson_id_user_id', ['lesson_id', 'user_id'], unique=False)
+
+    with op.batch_alter_table('quiz_result', schema=None) as batch_op:
+        batch_op.create_index('ix_quiz_result_student_id_submitted_date', ['student_id', 'submitted_date'], unique=False)
+        batch_op.create_index('ix_quiz_result_quiz_id', ['quiz_id'], unique=False)
+
+    # Keep only the most recent progress row per (user, lesson) before enforcing uniqueness
+    op.execute(
+        'DELETE FROM progress WHERE id NOT IN '
+        '(SELECT MAX(id) FROM progress GROUP BY user_id, lesson_id)'
+    )
+    with op.batch_alter_table('progress', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_progress_user_id_lesson_id', ['user_id', 'lesson_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('progress', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_progress_user_id_lesson_id', type_='unique')
+
+    with op.batch_alter_table('quiz_result', schema=None) as batch_op:
+        batch_op.drop_index('ix_quiz_result_quiz_id')
+        batch_op.drop_index('ix_quiz_result_student_id_submitted_date')
+
+    with op.batch_alter_table('lesson_progress', schema=None) as batch_op:
+        batch_op.drop_index('ix_lesson_progress_lesson_id_user_id')
+
+    with op.batch_alter_table('quiz_attempt', schema=None) as batch_op:
+        batch_op.drop_index('ix_quiz_attempt_user_id')
+        batch_op.drop_index('ix_quiz_attempt_quiz_id_completed')
+
+    with op.batch_alter_table('quiz', schema=None) as batch_op:
+        batch_op.drop_index('ix_quiz_uploaded_date_id')
+        batch_op.drop_index('ix_quiz_grade_subject')
+        batch_op.drop_index('ix_quiz_teacher_id_status')
+
+    with op.batch_alter_table('lesson', schema=None) as batch_op:
+        batch_op.drop_index('ix_lesson_uploaded_date_id')
+        batch_op.drop_index('ix_lesson_grade_subject')
+        batch_op.drop_index('ix_lesson_teacher_id_status')
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_role_grade')
@@ -0,0 +1,46 @@
+"""Add teacher and grade rollup tables
+
+Revision ID: af3a270405b1
+Revises: a73b7dc26dd8
+Create Date: 2026-10-17 22:31:47.902114
+
+Run `flask rebuild-rollups` after upgrading to backfill the new tables.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'af3a270405b1'
+down_revision = 'a73b7dc26dd8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('teacher_rollup',
+    sa.Column('teacher_id', sa.Integer(), nullable=False),
+    sa.Column('grade', sa.String(length=20), nullable=False),
+    sa.Column('subject', sa.String(length=50), nullable=False),
+    sa.Column('lesson_count', sa.Integer(), nullable=False),
+    sa.Column('approved_lesson_count', sa.Integer(), nullable=False),
+    sa.Column('attempt_count', sa.Integer(), nullable=False),
+    sa.Column('completed_attempt_count', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.Float(), nullable=False),
+    sa.Column('progress_count', sa.Integer(), nullable=False),
+    sa.Column('completed_progress_count', sa.Integer(), nullable=False),
+    sa.Column('progress_sum', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['teacher_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('teacher_id', 'grade', 'subject')
+    )
+    op.create_table('grade_rollup',
+    sa.Column('grade', sa.String(length=20), nullable=False),
+    sa.Column('student_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('grade')
+    )
+
+
+def downgrade():
+    op.drop_table('grade_rollup')
+    op.drop_table('teacher_rollup')
@@ -0,0 +1,109 @@
+"""Move quiz questions into quiz_question table
+
+Revision ID: cbdeaf659199
+Revises: f706aaf9144e
+Create Date: 2026-10-17 23:41:26.208913
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cbdeaf659199'
+down_revision = 'f706aaf9144e'
+branch_labels = None
+depends_on = None
+
+QUESTION_KEYS = ('question', 'options', 'correct_answer')
+
+quiz_table = sa.table('quiz',
+    sa.column('id', sa.Integer),
+    sa.column('questions', sa.Text),
+    sa.column('question_count', sa.Integer)
+)
+quiz_question_table = sa.table('quiz_question',
+    sa.column('quiz_id', sa.Integer),
+    sa.column('position', sa.Integer),
+    sa.column('question', sa.Text),
+    sa.column('options', sa.Text),
+    sa.column('correct_answer', sa.Text),
+    sa.column('extra', sa.Text)
+)
+
+
+def _question_row(quiz_id, position, data):
+    if not isinstance(data, dict):
+        data = {'question': data}
+    extra = {key: value for key, value in data.items() if key not in QUESTION_KEYS}
+    return {
+        'quiz_id': quiz_id,
+        'position': position,
+        'question': data.get('question'),
+        'options': json.dumps(data['options']) if 'options' in data else None,
+        'correct_answer': json.dumps(data['correct_answer']) if 'correct_answer' in data else None,
+        'extra': json.dumps(extra) if extra else None
+    }
+
+
+def upgrade():
+    op.create_table('quiz_question',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('question', sa.Text(), nullable=True),
+    sa.Column('options', sa.Text(), nullable=True),
+    sa.Column('correct_answer', sa.Text(), nullable=True),
+    sa.Column('extra', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quiz.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('quiz_id', 'position', name='uq_quiz_question_quiz_id_position')
+    )
+    with op.batch_alter_table('quiz', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('question_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill from the JSON column
+    connection = op.get_bind()
+    for quiz_id, questions in connection.execute(sa.select(quiz_table.c.id, quiz_table.c.questions)).fetchall():
+        try:
+            parsed = json.loads(questions) if questions else []
+        except ValueError:
+            parsed = []
+        if not isinstance(parsed, list):
+            parsed = [parsed]
+        if parsed:
+            connection.execute(quiz_question_table.insert(),
+                               [_question_row(quiz_id, position, data) for position, data in enumerate(parsed)])
+        connection.execute(quiz_table.update().where(quiz_table.c.id == quiz_id).values(question_count=len(parsed)))
+
+    with op.batch_alter_table('quiz', schema=None) as batch_op:
+        batch_op.drop_column('questions')
+
+
+def downgrade():
+    with op.batch_alter_table('quiz', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('questions', sa.TEXT(), nullable=True))
+
+    connection = op.get_bind()
+    questions_by_quiz = {}
+    rows = connection.execute(sa.select(quiz_question_table).order_by(
+        quiz_question_table.c.quiz_id, quiz_question_table.c.position)).mappings().fetchall()
+    for row in rows:
+        data = {'question': row['question']}
+        if row['options'] is not None:
+            data['options'] = json.loads(row['options'])
+        if row['correct_answer'] is not None:
+            data['correct_answer'] = json.loads(row['correct_answer'])
+        if row['extra']:
+            data.update(json.loads(row['extra']))
+        questions_by_quiz.setdefault(row['quiz_id'], []).append(data)
+    for (quiz_id,) in connection.execute(sa.select(quiz_table.c.id)).fetchall():
+        connection.execute(quiz_table.update().where(quiz_table.c.id == quiz_id)
+                           .values(questions=json.dumps(questions_by_quiz.get(quiz_id, []))))
+
+    with op.batch_alter_table('quiz', schema=None) as batch_op:
+        batch_op.alter_column('questions', existing_type=sa.TEXT(), nullable=False)
+        batch_op.drop_column('question_count')
+
+    op.drop_table('quiz_question')
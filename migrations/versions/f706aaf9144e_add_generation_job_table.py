@@ -0,0 +1,44 @@
+"""Add generation job table
+
+Revision ID: f706aaf9144e
+Revises: 8c9b86b5fdfa
+Create Date: 2026-10-17 23:24:51.630284
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f706aaf9144e'
+down_revision = '8c9b86b5fdfa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('generation_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('teacher_id', sa.Integer(), nullable=False),
+    sa.Column('topic', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('result', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_date', sa.DateTime(), nullable=True),
+    sa.Column('started_date', sa.DateTime(), nullable=True),
+    sa.Column('finished_date', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['teacher_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('generation_job', schema=None) as batch_op:
+        batch_op.create_index('ix_generation_job_status', ['status'], unique=False)
+        batch_op.create_index('ix_generation_job_teacher_id_created_date', ['teacher_id', 'created_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('generation_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_generation_job_teacher_id_created_date')
+        batch_op.drop_index('ix_generation_job_status')
+
+    op.drop_table('generation_job')
@@ -1,8 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm.attributes import flag_modified
+from utils.hashing import hash_password, verify_password, needs_rehash
 from datetime import datetime, timezone
+from replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+def _serialize_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -17,11 +22,18 @@ class User(db.Model):
     grade = db.Column(db.String(20))  # For students
     subjects = db.Column(db.Text)  # JSON string of subjects for students/teachers
 
+    __table_args__ = (
+        db.Index('ix_user_role_grade', 'role', 'grade'),
+    )
+
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return verify_password(self.password, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password)
 
 class Lesson(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -33,6 +45,8 @@ class Lesson(db.Model):
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected
     created_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     uploaded_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    version = db.Column(db.Integer, nullable=False, default=1)  # Maintained by content_versions.py
+    updated_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
     # New fields for file attachments and media
     pdf_file = db.Column(db.String(500))  # Path to uploaded PDF file
@@ -40,22 +54,19 @@ class Lesson(db.Model):
     youtube_link = db.Column(db.String(500))  # YouTube video URL
     attachment_type = db.Column(db.String(20))  # 'pdf', 'video', 'youtube', 'text'
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'subject': self.subject,
-            'grade': self.grade,
-            'content': self.content,
-            'teacher_id': self.teacher_id,
-            'status': self.status,
-            'created_date': self.created_date.isoformat() if self.created_date else None,
-            'uploaded_date': self.uploaded_date.isoformat() if self.uploaded_date else None,
-            'pdf_file': self.pdf_file,
-            'video_file': self.video_file,
-            'youtube_link': self.youtube_link,
-            'attachment_type': self.attachment_type
-        }
+    __table_args__ = (
+        db.Index('ix_lesson_teacher_id_status', 'teacher_id', 'status'),
+        db.Index('ix_lesson_grade_subject', 'grade', 'subject'),
+        db.Index('ix_lesson_uploaded_date_id', 'uploaded_date', 'id'),
+    )
+
+    FIELDS = ('id', 'title', 'subject', 'grade', 'content', 'teacher_id', 'status', 'created_date',
+              'uploaded_date', 'pdf_file', 'video_file', 'youtube_link', 'attachment_type')
+    SUMMARY_FIELDS = ('id', 'title', 'subject', 'grade', 'teacher_id', 'status', 'created_date',
+                      'uploaded_date', 'attachment_type')
+
+    def to_dict(self, fields=None):
+        return {field: _serialize_value(getattr(self, field)) for field in (fields or self.FIELDS)}
 
 import json
 
@@ -64,30 +75,97 @@ class Quiz(db.Model):
     title = db.Column(db.String(200), nullable=False)
     subject = db.Column(db.String(50), nullable=False)
     grade = db.Column(db.String(20), nullable=False)
-    questions = db.Column(db.Text, nullable=False)  # JSON string of questions
+    question_count = db.Column(db.Integer, nullable=False, default=0)
     teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected
     created_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     uploaded_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    version = db.Column(db.Integer, nullable=False, default=1)  # Maintained by content_versions.py
+    updated_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    questions = db.relationship('QuizQuestion', order_by='QuizQuestion.position',
+                                cascade='all, delete-orphan', lazy='select')
 
     # New fields for quiz attachments
     instructions = db.Column(db.Text)  # Additional instructions for the quiz
     time_limit = db.Column(db.Integer)  # Time limit in minutes (optional)
 
+    __table_args__ = (
+        db.Index('ix_quiz_teacher_id_status', 'teacher_id', 'status'),
+        db.Index('ix_quiz_grade_subject', 'grade', 'subject'),
+        db.Index('ix_quiz_uploaded_date_id', 'uploaded_date', 'id'),
+    )
+
+    FIELDS = ('id', 'title', 'subject', 'grade', 'questions', 'question_count', 'teacher_id', 'status',
+              'created_date', 'uploaded_date', 'instructions', 'time_limit')
+    SUMMARY_FIELDS = ('id', 'title', 'subject', 'grade', 'question_count', 'teacher_id', 'status',
+                      'created_date', 'uploaded_date', 'time_limit')
+
+    def set_questions(self, questions):
+        # Existing rows are updated in place so (quiz_id, position) never collides with an orphan
+        existing = list(self.questions)
+        updated = []
+        for position, data in enumerate(questions):
+            question = existing[position] if position < len(existing) else QuizQuestion(position=position)
+            question.update_from_dict(data)
+            updated.append(question)
+        self.questions = updated
+        self.question_count = len(updated)
+        # Question edits live in another table; mark the quiz row changed so its version moves
+        flag_modified(self, 'question_count')
+
+    def to_dict(self, fields=None):
+        data = {}
+        for field in (fields or self.FIELDS):
+            if field == 'questions':
+                data[field] = [question.to_dict() for question in self.questions]
+            else:
+                data[field] = _serialize_value(getattr(self, field))
+        return data
+
+class QuizQuestion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    question = db.Column(db.Text)
+    options = db.Column(db.Text)  # JSON list of answer options
+    correct_answer = db.Column(db.Text)  # JSON encoded answer key
+    extra = db.Column(db.Text)  # JSON object of any other keys the teacher supplied
+
+    __table_args__ = (
+        db.UniqueConstraint('quiz_id', 'position', name='uq_quiz_question_quiz_id_position'),
+    )
+
+    def update_from_dict(self, data):
+        if not isinstance(data, dict):
+            data = {'question': data}
+        extra = {key: value for key, value in data.items() if key not in ('question', 'options', 'correct_answer')}
+        self.question = data.get('question')
+        self.options = json.dumps(data['options']) if 'options' in data else None
+        self.correct_answer = json.dumps(data['correct_answer']) if 'correct_answer' in data else None
+        self.extra = json.dumps(extra) if extra else None
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'subject': self.subject,
-            'grade': self.grade,
-            'questions': json.loads(self.questions) if self.questions else [],
-            'teacher_id': self.teacher_id,
-            'status': self.status,
-            'created_date': self.created_date.isoformat() if self.created_date else None,
-            'uploaded_date': self.uploaded_date.isoformat() if self.uploaded_date else None,
-            'instructions': self.instructions,
-            'time_limit': self.time_limit
-        }
+        data = {'question': self.question}
+        if self.options is not None:
+            data['options'] = json.loads(self.options)
+        if self.correct_answer is not None:
+            data['correct_answer'] = json.loads(self.correct_answer)
+        if self.extra:
+            data.update(json.loads(self.extra))
+        return data
+
+    @property
+    def answer_key(self):
+        # Older quizzes stored the key under "answer" rather than "correct_answer"
+        if self.correct_answer is not None:
+            return json.loads(self.correct_answer)
+        return json.loads(self.extra).get('answer') if self.extra else None
+
+    @property
+    def points(self):
+        points = json.loads(self.extra).get('points', 1) if self.extra else 1
+        return points if isinstance(points, (int, float)) and not isinstance(points, bool) else 1
 
 class QuizAttempt(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -100,6 +178,11 @@ class QuizAttempt(db.Model):
     attempted_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     completed = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        db.Index('ix_quiz_attempt_quiz_id_completed', 'quiz_id', 'completed'),
+        db.Index('ix_quiz_attempt_user_id', 'user_id'),
+    )
+
 class LessonProgress(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     lesson_id = db.Column(db.Integer, db.ForeignKey('lesson.id'), nullable=False)
@@ -109,12 +192,30 @@ class LessonProgress(db.Model):
     last_accessed = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     time_spent = db.Column(db.Integer, default=0)  # Time spent in minutes
 
+    __table_args__ = (
+        db.Index('ix_lesson_progress_lesson_id_user_id', 'lesson_id', 'user_id'),
+    )
+
 class QuizResult(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     answers = db.Column(db.Text, nullable=False)  # Stored as JSON string
     submitted_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    score = db.Column(db.Float)  # Fraction of available points, 0.0 to 1.0; NULL until graded
+    correct_count = db.Column(db.Integer)
+    total_questions = db.Column(db.Integer)
+    graded_date = db.Column(db.DateTime)
+    attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempt.id'))
+    submission_id = db.Column(db.String(32))  # Set for submissions ingested through submission_log
+
+    attempt = db.relationship('QuizAttempt')
+
+    __table_args__ = (
+        db.Index('ix_quiz_result_student_id_submitted_date', 'student_id', 'submitted_date'),
+        db.Index('ix_quiz_result_quiz_id', 'quiz_id'),
+        db.UniqueConstraint('submission_id', name='uq_quiz_result_submission_id'),
+    )
 
     def to_dict(self):
         import json
@@ -123,7 +224,11 @@ class QuizResult(db.Model):
             'quiz_id': self.quiz_id,
             'student_id': self.student_id,
             'answers': json.loads(self.answers) if self.answers else [],
-            'submitted_date': self.submitted_date.isoformat() if self.submitted_date else None
+            'submitted_date': self.submitted_date.isoformat() if self.submitted_date else None,
+            'score': round(self.score * 100, 1) if self.score is not None else None,
+            'correct_count': self.correct_count,
+            'total_questions': self.total_questions,
+            'completed': self.score is not None
         }
 
 class Progress(db.Model):
@@ -131,13 +236,151 @@ class Progress(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     lesson_id = db.Column(db.Integer, db.ForeignKey('lesson.id'), nullable=False)
     progress = db.Column(db.Float, default=0.0)
+    time_spent = db.Column(db.Integer, nullable=False, default=0)  # Time spent in minutes
+    completed = db.Column(db.Boolean, nullable=False, default=False)
     last_updated = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'lesson_id', name='uq_progress_user_id_lesson_id'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
             'user_id': self.user_id,
             'lesson_id': self.lesson_id,
             'progress': self.progress,
+            'time_spent': self.time_spent,
+            'completed': self.completed,
             'last_updated': self.last_updated.isoformat() if self.last_updated else None
         }
+
+class TeacherRollup(db.Model):
+    # Per teacher and (grade, subject) counters, kept current by the listeners in analytics.py
+    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    grade = db.Column(db.String(20), primary_key=True)
+    subject = db.Column(db.String(50), primary_key=True)
+    lesson_count = db.Column(db.Integer, nullable=False, default=0)
+    approved_lesson_count = db.Column(db.Integer, nullable=False, default=0)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    progress_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_progress_count = db.Column(db.Integer, nullable=False, default=0)
+    progress_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+class ContentVersion(db.Model):
+    # Collection-wide change counter per content type, used for listing ETags
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+class GradeRollup(db.Model):
+    # Per grade student and content counters, kept current by the listeners in analytics.py
+    grade = db.Column(db.String(20), primary_key=True)
+    student_count = db.Column(db.Integer, nullable=False, default=0)
+    lesson_count = db.Column(db.Integer, nullable=False, default=0)
+    approved_lesson_count = db.Column(db.Integer, nullable=False, default=0)
+    quiz_count = db.Column(db.Integer, nullable=False, default=0)
+    approved_quiz_count = db.Column(db.Integer, nullable=False, default=0)
+
+class StudentStats(db.Model):
+    # Per student dashboard counters, kept current by the listeners in analytics.py
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    quizzes_taken = db.Column(db.Integer, nullable=False, default=0)
+    latest_result_id = db.Column(db.Integer, db.ForeignKey(
+        'quiz_result.id', name='fk_student_stats_latest_result_id_quiz_result', ondelete='SET NULL'))
+    latest_submitted_date = db.Column(db.DateTime)
+
+    latest_result = db.relationship('QuizResult')
+
+class EmailOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    created_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    next_attempt_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    sent_date = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'recipient': self.recipient,
+            'subject': self.subject,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'sent_date': self.sent_date.isoformat() if self.sent_date else None
+        }
+
+class UploadSession(db.Model):
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, handed to the client
+    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    lesson_id = db.Column(db.Integer, db.ForeignKey('lesson.id'))
+    filename = db.Column(db.String(255), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # pdf, video
+    size = db.Column(db.BigInteger, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0)  # bytes safely on disk
+    sha256 = db.Column(db.String(64))  # set when finalized
+    status = db.Column(db.String(20), nullable=False, default='uploading')  # uploading, complete
+    stored_path = db.Column(db.String(500))  # relative to UPLOAD_FOLDER once complete
+    created_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        db.Index('ix_upload_session_status_updated_date', 'status', 'updated_date'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'lesson_id': self.lesson_id,
+            'filename': self.filename,
+            'kind': self.kind,
+            'size': self.size,
+            'offset': self.received,
+            'sha256': self.sha256,
+            'status': self.status,
+            'url': f'/uploads/{self.stored_path}' if self.stored_path else None,
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'updated_date': self.updated_date.isoformat() if self.updated_date else None
+        }
+
+class GenerationJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    topic = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    started_date = db.Column(db.DateTime)
+    finished_date = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_generation_job_teacher_id_created_date', 'teacher_id', 'created_date'),
+        db.Index('ix_generation_job_status', 'status'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'topic': self.topic,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'started_date': self.started_date.isoformat() if self.started_date else None,
+            'finished_date': self.finished_date.isoformat() if self.finished_date else None
+        }
@@ -1,9 +1,9 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_cors import CORS
-from models import db, Progress
+from models import db, Lesson, Progress
 from auth import token_required, get_current_user
-from datetime import datetime
 from utils.validation import role_required, validate_required_fields
+import progress_writer
 
 progress_bp = Blueprint('progress_bp', __name__, url_prefix='/api/progress')
 CORS(progress_bp)
@@ -18,8 +18,14 @@ def get_progress():
         return jsonify({'error': 'Missing user_id parameter'}), 400
     if str(user.id) != user_id:
         return jsonify({'error': 'Unauthorized access'}), 403
-    progress_records = Progress.query.filter_by(user_id=user.id).all()
-    return jsonify([record.to_dict() for record in progress_records])
+    records = {record.lesson_id: record.to_dict() for record in Progress.query.filter_by(user_id=user.id)}
+    # Overlay heartbeats still waiting in the coalescing buffer so students read their own writes
+    for row in progress_writer.buffer.pending_for_user(user.id):
+        record = records.setdefault(row['lesson_id'], {'id': None, 'user_id': user.id, 'lesson_id': row['lesson_id'],
+                                                       **progress_writer.VALUE_DEFAULTS})
+        record.update({name: row[name] for name in progress_writer.VALUE_DEFAULTS if row.get(name) is not None})
+        record['last_updated'] = row['last_updated'].isoformat()
+    return jsonify(list(records.values()))
 
 @progress_bp.route('', methods=['POST'])
 @token_required
@@ -30,17 +36,76 @@ def update_progress():
     data = request.get_json()
     lesson_id = data.get('lesson_id')
 
-    progress = Progress.query.filter_by(user_id=user.id, lesson_id=lesson_id).first()
-    if not progress:
-        progress = Progress(user_id=user.id, lesson_id=lesson_id, progress=0, last_updated=datetime.utcnow())
-        db.session.add(progress)
-
-    progress.progress = data.get('progress', progress.progress)
-    progress.last_updated = datetime.utcnow()
-
     try:
+        progress_writer.record_progress(user.id, lesson_id, data.get('progress'),
+                                        data.get('time_spent'), data.get('completed'))
         db.session.commit()
         return jsonify({'message': 'Progress updated successfully'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to update progress'}), 500
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _validate_item(item):
+    if not isinstance(item, dict):
+        return 'Item must be an object'
+    if not isinstance(item.get('lesson_id'), int) or isinstance(item.get('lesson_id'), bool):
+        return 'lesson_id must be an integer'
+    progress = item.get('progress')
+    if progress is not None and not (_is_number(progress) and 0 <= progress <= 100):
+        return 'progress must be a number between 0 and 100'
+    time_spent = item.get('time_spent')
+    if time_spent is not None and not (_is_number(time_spent) and time_spent >= 0):
+        return 'time_spent must be a non-negative number'
+    if item.get('completed') is not None and not isinstance(item['completed'], bool):
+        return 'completed must be a boolean'
+    return None
+
+@progress_bp.route('/batch', methods=['POST'])
+@token_required
+@validate_required_fields(['items'])
+@role_required('student', 'teacher')
+def update_progress_batch():
+    """Apply many progress updates in one transaction, reporting a result per item."""
+    user = get_current_user()
+    items = request.get_json().get('items')
+    if not isinstance(items, list):
+        return jsonify({'error': 'items must be a list'}), 400
+    max_items = current_app.config['PROGRESS_BATCH_MAX_ITEMS']
+    if len(items) > max_items:
+        return jsonify({'error': f'At most {max_items} items may be sent at once'}), 400
+
+    results = [{'index': index, 'status': 'error', 'error': _validate_item(item)} for index, item in enumerate(items)]
+    lesson_ids = {item['lesson_id'] for item, result in zip(items, results) if result['error'] is None}
+    existing = set(db.session.scalars(db.select(Lesson.id).where(Lesson.id.in_(lesson_ids)))) if lesson_ids else set()
+
+    # Later items for the same lesson override earlier ones, as if they had been sent one by one
+    rows = {}
+    for item, result in zip(items, results):
+        if result['error'] is not None:
+            continue
+        result['lesson_id'] = item['lesson_id']
+        if item['lesson_id'] not in existing:
+            result['error'] = 'Lesson not found'
+            continue
+        row = progress_writer.progress_row(user.id, item['lesson_id'], item.get('progress'),
+                                           item.get('time_spent'), item.get('completed'))
+        previous = rows.get(item['lesson_id'])
+        if previous is not None:
+            row.update({name: previous[name] for name in progress_writer.VALUE_DEFAULTS if row[name] is None})
+        rows[item['lesson_id']] = row
+        result['status'] = 'ok'
+        del result['error']
+
+    try:
+        if rows:
+            progress_writer.upsert_progress(list(rows.values()))
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to update progress'}), 500
+
+    applied = sum(1 for result in results if result['status'] == 'ok')
+    return jsonify({'applied': applied, 'failed': len(results) - applied, 'results': results})
@@ -0,0 +1,141 @@
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Progress
+
+# Progress heartbeats are written with a single INSERT ... ON CONFLICT DO UPDATE. With
+# PROGRESS_COALESCE enabled they are first collected in memory, keeping only the latest
+# value per (user_id, lesson_id), and a background thread upserts them in batches every
+# PROGRESS_FLUSH_INTERVAL seconds. A crash loses at most one interval of heartbeats.
+
+logger = logging.getLogger(__name__)
+
+_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+# Optional values a heartbeat may carry, with what a new row gets when one is missing
+VALUE_DEFAULTS = {'progress': 0.0, 'time_spent': 0, 'completed': False}
+
+
+def upsert_progress(rows):
+    """Insert or update Progress rows given dicts of user_id, lesson_id, last_updated and values.
+
+    Values left as None are not changed on existing rows. Rows older than what is already
+    stored are ignored, so a delayed batch never overwrites a newer heartbeat.
+    """
+    insert = _INSERTS[db.engine.dialect.name]
+    groups = {}
+    for row in rows:
+        provided = tuple(name for name in VALUE_DEFAULTS if row.get(name) is not None)
+        groups.setdefault(provided, []).append(row)
+    for provided, batch in groups.items():
+        values = [{**row, **{name: VALUE_DEFAULTS[name] for name in VALUE_DEFAULTS if name not in provided}}
+                  for row in batch]
+        stmt = insert(Progress).values(values)
+        updates = {'last_updated': stmt.excluded.last_updated}
+        updates.update({name: stmt.excluded[name] for name in provided})
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[Progress.user_id, Progress.lesson_id],
+            set_=updates,
+            where=db.or_(Progress.last_updated.is_(None), Progress.last_updated <= stmt.excluded.last_updated)
+        ))
+
+
+class ProgressBuffer:
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add(self, row):
+        key = (row['user_id'], row['lesson_id'])
+        with self._lock:
+            previous = self._pending.get(key)
+            if previous is not None:
+                row = {**row, **{name: previous.get(name) for name in VALUE_DEFAULTS if row.get(name) is None}}
+            self._pending[key] = row
+
+    def drain(self):
+        with self._lock:
+            rows, self._pending = self._pending, {}
+        return list(rows.values())
+
+    def restore(self, rows):
+        # Put back rows from a failed flush unless a newer heartbeat has replaced them
+        with self._lock:
+            for row in rows:
+                self._pending.setdefault((row['user_id'], row['lesson_id']), row)
+
+    def pending_for_user(self, user_id):
+        with self._lock:
+            return [row for (row_user_id, _), row in self._pending.items() if row_user_id == user_id]
+
+    def __len__(self):
+        return len(self._pending)
+
+
+buffer = ProgressBuffer()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def progress_row(user_id, lesson_id, progress=None, time_spent=None, completed=None):
+    return {'user_id': user_id, 'lesson_id': lesson_id, 'progress': progress, 'time_spent': time_spent,
+            'completed': completed, 'last_updated': datetime.now(timezone.utc)}
+
+
+def record_progress(user_id, lesson_id, progress=None, time_spent=None, completed=None):
+    """Record a heartbeat, buffering it when PROGRESS_COALESCE is on. The caller commits."""
+    row = progress_row(user_id, lesson_id, progress, time_spent, completed)
+    if current_app.config['PROGRESS_COALESCE']:
+        buffer.add(row)
+        ensure_worker(current_app._get_current_object())
+    else:
+        upsert_progress([row])
+
+
+def flush_buffer():
+    """Upsert everything buffered so far in batches. Returns the number of rows written."""
+    rows = buffer.drain()
+    batch_size = current_app.config['PROGRESS_FLUSH_BATCH']
+    for start in range(0, len(rows), batch_size):
+        try:
+            upsert_progress(rows[start:start + batch_size])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            buffer.restore(rows[start:])
+            raise
+    return len(rows)
+
+
+def run_worker(app, stop_event=None):
+    stop_event = stop_event or threading.Event()
+    interval = app.config['PROGRESS_FLUSH_INTERVAL']
+    while not stop_event.wait(interval):
+        _flush(app)
+
+
+def _flush(app):
+    with app.app_context():
+        try:
+            flush_buffer()
+        except Exception as e:
+            logger.error(f"Progress flush failed: {e}")
+        finally:
+            db.session.remove()
+
+
+def ensure_worker(app):
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                stop_event = threading.Event()
+                thread = threading.Thread(target=run_worker, args=(app, stop_event), name='progress-flusher',
+                                          daemon=True)
+                thread.start()
+                atexit.register(_flush, app)
+                _worker = thread, stop_event
+    return _worker
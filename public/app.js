@@ -172,6 +172,22 @@ async function getQuizzes() {
     }
 }
 
+// Full-text search; filters may hold grade, subject, status, type ('lessons' or 'quizzes'), limit, offset
+async function searchContent(query, filters = {}) {
+    const params = new URLSearchParams({ q: query });
+    for (const [key, value] of Object.entries(filters)) {
+        if (value !== null && value !== undefined && value !== '') {
+            params.set(key, value);
+        }
+    }
+    const response = await fetch(`http://localhost:5000/api/search?${params}`);
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.error || `HTTP error! status: ${response.status}`);
+    }
+    return data;
+}
+
 async function updateProgress(lessonId, progressData) {
     try {
         return await apiRequest('/progress', {
@@ -205,6 +221,53 @@ async function getAITutorResponse(query) {
     }
 }
 
+// Streams the tutor answer over Server-Sent Events, calling onToken for each piece
+async function streamAITutorResponse(query, onToken) {
+    const headers = { 'Content-Type': 'application/json' };
+    const sessionData = localStorage.getItem('edutech_session') || sessionStorage.getItem('edutech_session');
+    if (sessionData) {
+        const session = JSON.parse(sessionData);
+        if (session.token) {
+            headers['Authorization'] = `Bearer ${session.token}`;
+        }
+    }
+
+    const response = await fetch('http://localhost:5000/api/ai/tutor/stream', {
+        method: 'POST',
+        headers,
+        body: JSON.stringify({ query })
+    });
+    if (!response.ok || !response.body) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let answer = '';
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const raw of events) {
+            const eventLine = raw.split('\n').find(line => line.startsWith('event: '));
+            const dataLine = raw.split('\n').find(line => line.startsWith('data: '));
+            const event = eventLine ? eventLine.slice(7) : 'message';
+            const data = dataLine ? JSON.parse(dataLine.slice(6)) : {};
+            if (event === 'error') {
+                throw new Error(data.error);
+            }
+            if (event === 'message') {
+                answer += data.token;
+                onToken(data.token, answer);
+            }
+        }
+    }
+    return answer;
+}
+
 async function generateContent(topic) {
     try {
         const data = await apiRequest('/ai/generate-content', {
@@ -218,27 +281,107 @@ async function generateContent(topic) {
 }
 
 // -------------------- FILE UPLOAD --------------------
-async function uploadFile(file) {
-    const formData = new FormData();
-    formData.append('file', file);
+const UPLOADS_URL = 'http://localhost:5000/api/uploads';
+const UPLOAD_WHOLE_FILE_DIGEST_MAX = 64 * 1024 * 1024;  // larger files rely on per-chunk checksums
 
-    try {
-        const response = await fetch(`${API_BASE_URL}/upload-file`, {
-            method: 'POST',
-            body: formData
-        });
+function authHeaders() {
+    const headers = {};
+    const sessionData = localStorage.getItem('edutech_session') || sessionStorage.getItem('edutech_session');
+    if (sessionData) {
+        const session = JSON.parse(sessionData);
+        if (session.token) {
+            headers['Authorization'] = `Bearer ${session.token}`;
+        }
+    }
+    return headers;
+}
 
-        const data = await response.json();
+async function sha256Hex(blob) {
+    const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+}
 
+// Uploads in chunks with Upload-Offset so a dropped connection (or a page reload) resumes
+// where the server left off instead of starting over.
+async function uploadFile(file, { lessonId = null, onProgress = null, maxRetries = 8 } = {}) {
+    const resumeKey = `edutech_upload:${file.name}:${file.size}:${file.lastModified}:${lessonId}`;
+    let upload = null;
+    const savedId = localStorage.getItem(resumeKey);
+    if (savedId) {
+        const response = await fetch(`${UPLOADS_URL}/${savedId}`, { headers: authHeaders() });
+        if (response.ok) {
+            upload = await response.json();
+        } else {
+            localStorage.removeItem(resumeKey);
+        }
+    }
+    if (!upload) {
+        const response = await fetch(UPLOADS_URL, {
+            method: 'POST',
+            headers: { ...authHeaders(), 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: file.name, size: file.size, lesson_id: lessonId })
+        });
+        upload = await response.json();
         if (!response.ok) {
-            throw new Error(data.error || 'Upload failed');
+            throw new Error(upload.error || 'Upload failed');
         }
+        localStorage.setItem(resumeKey, upload.id);
+    }
 
-        showAlert('File uploaded successfully!', 'success');
-        return data;
-    } catch (error) {
-        throw error;
+    const chunkSize = upload.chunk_size || 8 * 1024 * 1024;
+    let offset = upload.offset;
+    let failures = 0;
+    while (upload.status === 'uploading' && offset < file.size) {
+        const chunk = file.slice(offset, offset + chunkSize);
+        try {
+            const response = await fetch(`${UPLOADS_URL}/${upload.id}`, {
+                method: 'PUT',
+                headers: {
+                    ...authHeaders(),
+                    'Content-Type': 'application/offset+octet-stream',
+                    'Upload-Offset': String(offset),
+                    'Upload-Checksum': await sha256Hex(chunk)
+                },
+                body: chunk
+            });
+            const data = await response.json();
+            if (response.ok || response.status === 409 || response.status === 422) {
+                // 409/422: resync with the server's offset and carry on from there
+                offset = data.offset;
+                failures = response.ok ? 0 : failures + 1;
+            } else {
+                throw new Error(data.error || `HTTP error! status: ${response.status}`);
+            }
+        } catch (error) {
+            failures += 1;
+            if (failures > maxRetries) {
+                throw error;
+            }
+            await new Promise(resolve => setTimeout(resolve, Math.min(30000, 500 * 2 ** failures)));
+            const status = await fetch(`${UPLOADS_URL}/${upload.id}`, { headers: authHeaders() }).catch(() => null);
+            if (status && status.ok) {
+                offset = (await status.json()).offset;
+            }
+            continue;
+        }
+        if (onProgress) {
+            onProgress(offset, file.size);
+        }
+    }
+
+    const finalize = { sha256: file.size <= UPLOAD_WHOLE_FILE_DIGEST_MAX ? await sha256Hex(file) : null };
+    const response = await fetch(`${UPLOADS_URL}/${upload.id}/finalize`, {
+        method: 'POST',
+        headers: { ...authHeaders(), 'Content-Type': 'application/json' },
+        body: JSON.stringify(finalize)
+    });
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.error || 'Upload failed');
     }
+    localStorage.removeItem(resumeKey);
+    showAlert('File uploaded successfully!', 'success');
+    return data;
 }
 
 // -------------------- VALIDATION --------------------
@@ -272,9 +415,11 @@ window.EDUApp = {
     getLessons,
     getLesson,
     getQuizzes,
+    searchContent,
     updateProgress,
     getProgress,
     getAITutorResponse,
+    streamAITutorResponse,
     generateContent,
     uploadFile,
     showAlert,
@@ -1,20 +1,52 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, abort
 from models import db, Quiz
 from auth import token_required, get_current_user
-import json
 from utils.validation import validate_required_fields, role_required
+from utils.pagination import paginate_listing, InvalidCursor
+from utils.projection import parse_fields, apply_projection, InvalidFields, SUMMARY
+from utils.conditional import make_etag, not_modified, with_validators
+from content_versions import collection_version
+from replicas import read_only
+import grading
 
 quizzes_bp = Blueprint('quizzes_bp', __name__, url_prefix='/api/quizzes')
 
 @quizzes_bp.route('', methods=['GET'])
+@read_only
 def get_quizzes():
-    quizzes = Quiz.query.all()
-    return jsonify([quiz.to_dict() for quiz in quizzes])
+    version, updated_date = collection_version('quiz')
+    etag = make_etag('quizzes', version)
+    cached = not_modified(etag, updated_date)
+    if cached:
+        return cached
+    try:
+        fields = parse_fields(request.args, Quiz, default_view=SUMMARY)
+        query = apply_projection(Quiz.query, Quiz, fields)
+        quizzes, next_cursor = paginate_listing(query, Quiz, request.args)
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
+    return with_validators(jsonify({
+        'quizzes': [quiz.to_dict(fields) for quiz in quizzes],
+        'next_cursor': next_cursor
+    }), etag, updated_date)
 
 @quizzes_bp.route('/<int:quiz_id>', methods=['GET'])
+@read_only
 def get_quiz(quiz_id):
-    quiz = Quiz.query.get_or_404(quiz_id)
-    return jsonify(quiz.to_dict())
+    try:
+        fields = parse_fields(request.args, Quiz)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    current = db.session.execute(
+        db.select(Quiz.version, Quiz.updated_date).where(Quiz.id == quiz_id)).first()
+    if current is None:
+        abort(404)
+    etag = make_etag('quiz', quiz_id, current.version)
+    cached = not_modified(etag, current.updated_date)
+    if cached:
+        return cached
+    quiz = apply_projection(Quiz.query, Quiz, fields).get_or_404(quiz_id)
+    return with_validators(jsonify(quiz.to_dict(fields)), etag, current.updated_date)
 
 @quizzes_bp.route('', methods=['POST'])
 @token_required
@@ -23,14 +55,13 @@ def get_quiz(quiz_id):
 def create_quiz():
     user = get_current_user()
     data = request.get_json()
-    questions_json = json.dumps(data.get('questions', []))
     quiz = Quiz(
         title=data.get('title'),
         subject=data.get('subject'),
         grade=data.get('grade'),
-        questions=questions_json,
         teacher_id=user.id
     )
+    quiz.set_questions(data.get('questions', []))
     db.session.add(quiz)
     db.session.commit()
     return jsonify(quiz.to_dict()), 201
@@ -45,7 +76,7 @@ def update_quiz(quiz_id):
         return jsonify({'error': 'Unauthorized'}), 403
     data = request.get_json()
     if 'questions' in data:
-        quiz.questions = json.dumps(data['questions'])
+        quiz.set_questions(data['questions'])
     quiz.title = data.get('title', quiz.title)
     quiz.subject = data.get('subject', quiz.subject)
     quiz.grade = data.get('grade', quiz.grade)
@@ -63,3 +94,14 @@ def delete_quiz(quiz_id):
     db.session.delete(quiz)
     db.session.commit()
     return jsonify({'message': 'Quiz deleted'})
+
+@quizzes_bp.route('/<int:quiz_id>/regrade', methods=['POST'])
+@token_required
+@role_required('teacher')
+def regrade_quiz(quiz_id):
+    user = get_current_user()
+    quiz = Quiz.query.get_or_404(quiz_id)
+    if quiz.teacher_id != user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    regraded = grading.regrade_quiz(quiz.id)
+    return jsonify({'message': 'Quiz regraded', 'regraded': regraded})
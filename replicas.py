@@ -0,0 +1,159 @@
+import itertools
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from utils.cache import TTLCache
+
+# Read replica routing. Every bind in SQLALCHEMY_BINDS named replica_<n> (config.py builds
+# them from READ_REPLICA_URLS) is a read replica of the default database. Views wrapped in
+# read_only send their queries to one healthy replica per request; flushes and DML always go
+# to the primary. For REPLICA_STICKY_SECONDS after a request writes, that user (or browser,
+# through a cookie) reads from the primary so they see their own change. A replica that
+# fails is skipped for REPLICA_RETRY_INTERVAL seconds and the view is re-run on the next
+# replica or the primary.
+
+REPLICA_PREFIX = 'replica_'
+STICKY_COOKIE = 'primary_reads'
+
+
+class ReplicaRouter:
+    """Replica choice, health and recent writers for one app."""
+
+    def __init__(self, keys, sticky_seconds, retry_interval):
+        self.keys = list(keys)
+        self.sticky_seconds = sticky_seconds
+        self.retry_interval = retry_interval
+        self.recent_writers = TTLCache(maxsize=10000, ttl=sticky_seconds)
+        self._down_until = {}
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+
+    def choose(self, exclude=()):
+        """Round-robin over the healthy replicas, or None to use the primary."""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [key for key in self.keys
+                       if key not in exclude and self._down_until.get(key, 0) <= now]
+            return healthy[next(self._turn) % len(healthy)] if healthy else None
+
+    def mark_down(self, key):
+        with self._lock:
+            self._down_until[key] = time.monotonic() + self.retry_interval
+
+    def is_sticky(self, user):
+        if request.cookies.get(STICKY_COOKIE):
+            return True
+        return user is not None and self.recent_writers.get(user.id) is not None
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {key: {'healthy': self._down_until.get(key, 0) <= now} for key in self.keys}
+
+    def _on_error(self, key, context):
+        # A failed pre-ping is retried on a fresh connection, and query errors are the caller's
+        if context.is_pre_ping or not (context.is_disconnect or isinstance(
+                context.sqlalchemy_exception, (OperationalError, InterfaceError))):
+            return
+        self.mark_down(key)
+        if has_request_context():
+            g.db_replica_failed = True
+            g.pop('db_replica', None)
+            g.setdefault('db_failed_replicas', set()).add(key)
+
+    def _remember_writes(self, response):
+        if g.pop('db_wrote', False):
+            user = g.get('current_user')
+            if user is not None:
+                self.recent_writers.set(user.id, True)
+            response.set_cookie(STICKY_COOKIE, '1', max_age=self.sticky_seconds, httponly=True, samesite='Lax')
+        return response
+
+
+class RoutingSession(Session):
+    """db.session: reads inside a read_only view go to a replica, everything else to the bind
+    Flask-SQLAlchemy would pick."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or getattr(clause, 'is_dml', False):
+                _mark_write(self)
+            elif g.get('db_read_only') and not self.info.get('wrote'):
+                key = _request_replica()
+                if key is not None:
+                    return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _mark_write(session):
+    session.info['wrote'] = True
+    if has_request_context():
+        g.db_wrote = True
+
+
+def _request_replica():
+    router = current_app.extensions.get('replicas')
+    if router is None or not router.keys or router.is_sticky(g.get('current_user')):
+        return None
+    if g.get('db_replica') is None:
+        g.db_replica = router.choose(exclude=g.get('db_failed_replicas', ()))
+    return g.db_replica
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _after_flush(session, flush_context):
+    _mark_write(session)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+@event.listens_for(RoutingSession, 'after_rollback')
+def _transaction_ended(session):
+    session.info.pop('wrote', None)
+
+
+def read_only(f):
+    """Serve the view from a read replica when one is configured and healthy."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        router = current_app.extensions.get('replicas')
+        if router is None or not router.keys:
+            return f(*args, **kwargs)
+        g.db_read_only = True
+        try:
+            while True:
+                try:
+                    response = f(*args, **kwargs)
+                except DBAPIError:
+                    if not g.get('db_replica_failed'):
+                        raise
+                    response = None
+                # Views may swallow database errors, so check the flag rather than the result
+                if not g.pop('db_replica_failed', False):
+                    return response
+                current_app.extensions['sqlalchemy'].session.rollback()
+        finally:
+            g.db_read_only = False
+            g.pop('db_replica', None)
+            g.pop('db_failed_replicas', None)
+    return decorated_function
+
+
+def init_app(app, db):
+    """Set up routing for the replica binds; call after db_engine.init_app."""
+    keys = sorted(key for key in app.config.get('SQLALCHEMY_BINDS') or {} if key.startswith(REPLICA_PREFIX))
+    router = ReplicaRouter(keys, app.config['REPLICA_STICKY_SECONDS'], app.config['REPLICA_RETRY_INTERVAL'])
+    with app.app_context():
+        for key in keys:
+            # Flask-SQLAlchemy gives every bind its own empty metadata; a replica shares the
+            # primary's schema, so drop it to keep create_all and drop_all off the replicas
+            if not db.metadatas[key].tables:
+                del db.metadatas[key]
+            event.listen(db.engines[key], 'handle_error',
+                         lambda context, key=key: router._on_error(key, context))
+    app.after_request(router._remember_writes)
+    app.extensions['replicas'] = router
+    return router
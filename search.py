@@ -0,0 +1,190 @@
+import html
+import re
+from flask import Blueprint, jsonify, request
+from sqlalchemy import event, text, inspect
+from sqlalchemy.schema import DDL
+from models import db, Lesson, Quiz
+
+# Full-text search over lessons (title, content) and quizzes (title) using SQLite FTS5
+# tables that hold their own copy of the text plus the facet columns, so a search never
+# touches the lesson table. The ORM events below keep them in step with every insert,
+# update and delete; bulk statements bypass them, and `flask rebuild-search-index`
+# repopulates both tables from scratch.
+
+search_bp = Blueprint('search_bp', __name__, url_prefix='/api/search')
+
+FACET_COLUMNS = ('grade', 'subject')
+FILTER_COLUMNS = FACET_COLUMNS + ('status',)
+MAX_LIMIT = 100
+# Snippets are HTML-escaped after FTS5 marks the hits, so the markers must survive escaping
+_OPEN, _CLOSE = '\x02', '\x03'
+
+
+class SearchIndex:
+    def __init__(self, model, table, text_columns, title_weight):
+        self.model = model
+        self.table = table
+        self.text_columns = text_columns
+        self.columns = text_columns + FILTER_COLUMNS
+        self.title_weight = title_weight
+
+    def create_sql(self):
+        columns = ', '.join(self.text_columns + tuple(f'{column} UNINDEXED' for column in FILTER_COLUMNS))
+        return (f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5({columns}, "
+                f"tokenize='porter unicode61 remove_diacritics 2')")
+
+    def rank_sql(self):
+        # Persist the bm25 weights so ORDER BY rank uses them (title counts for more)
+        weights = ', '.join([str(self.title_weight)] + ['1.0'] * (len(self.text_columns) - 1))
+        return f"INSERT INTO {self.table}({self.table}, rank) VALUES ('rank', 'bm25({weights})')"
+
+    def delete(self, connection, row_id):
+        connection.execute(text(f'DELETE FROM {self.table} WHERE rowid = :id'), {'id': row_id})
+
+    def insert(self, connection, target):
+        values = {column: getattr(target, column) for column in self.columns}
+        placeholders = ', '.join(f':{column}' for column in self.columns)
+        connection.execute(text(f"INSERT INTO {self.table}(rowid, {', '.join(self.columns)}) "
+                                f"VALUES (:rowid, {placeholders})"), {'rowid': target.id, **values})
+
+    def rebuild(self, connection):
+        columns = ', '.join(self.columns)
+        connection.execute(text(f'DELETE FROM {self.table}'))
+        connection.execute(text(f'INSERT INTO {self.table}(rowid, {columns}) '
+                                f'SELECT id, {columns} FROM {self.model.__table__.name}'))
+        connection.execute(text(f"INSERT INTO {self.table}({self.table}) VALUES ('optimize')"))
+
+
+INDEXES = {
+    'lessons': SearchIndex(Lesson, 'lesson_search', ('title', 'content'), title_weight=10.0),
+    'quizzes': SearchIndex(Quiz, 'quiz_search', ('title',), title_weight=1.0),
+}
+
+
+def is_index_table(name):
+    """True for the FTS5 tables and their shadow tables, which live outside the models."""
+    return any(name == index.table or name.startswith(index.table + '_') for index in INDEXES.values())
+
+
+def _supported(connection):
+    return connection.dialect.name == 'sqlite'
+
+
+def _listen(index):
+    @event.listens_for(index.model, 'after_insert')
+    def _insert(mapper, connection, target):
+        if _supported(connection):
+            index.insert(connection, target)
+
+    @event.listens_for(index.model, 'after_update')
+    def _update(mapper, connection, target):
+        state = inspect(target)
+        if _supported(connection) and any(state.attrs[column].history.has_changes() for column in index.columns):
+            index.delete(connection, target.id)
+            index.insert(connection, target)
+
+    @event.listens_for(index.model, 'after_delete')
+    def _delete(mapper, connection, target):
+        if _supported(connection):
+            index.delete(connection, target.id)
+
+
+for _index in INDEXES.values():
+    _listen(_index)
+    # Lets db.create_all() build the index for fresh databases (tests, first run)
+    event.listen(db.metadata, 'after_create', DDL(_index.create_sql()).execute_if(dialect='sqlite'))
+    event.listen(db.metadata, 'after_create', DDL(_index.rank_sql()).execute_if(dialect='sqlite'))
+    event.listen(db.metadata, 'after_drop', DDL(f'DROP TABLE IF EXISTS {_index.table}').execute_if(dialect='sqlite'))
+
+
+def rebuild_index():
+    """Repopulate every search table from the source tables; returns row counts."""
+    counts = {}
+    with db.engine.begin() as connection:
+        for name, index in INDEXES.items():
+            connection.execute(text(index.create_sql()))
+            connection.execute(text(index.rank_sql()))
+            index.rebuild(connection)
+            counts[name] = connection.execute(text(f'SELECT count(*) FROM {index.table}')).scalar()
+    return counts
+
+
+def match_expression(query):
+    """Quote every word so user input can't form FTS5 syntax; the last word also matches as a prefix."""
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _marked(value):
+    return html.escape(value or '').replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+
+
+def _search_index(index, match, filters, limit, offset):
+    conditions = [f'{index.table} MATCH :match']
+    conditions += [f'{column} = :{column}' for column in filters]
+    where = ' AND '.join(conditions)
+    snippet_column = len(index.text_columns) - 1
+    rows = db.session.execute(text(
+        f"SELECT rowid AS id, title, grade, subject, status, rank, "
+        f"highlight({index.table}, 0, :open, :close) AS title_highlight, "
+        f"snippet({index.table}, {snippet_column}, :open, :close, '…', 16) AS snippet "
+        f"FROM {index.table} WHERE {where} ORDER BY rank LIMIT :limit OFFSET :offset"),
+        {'match': match, 'open': _OPEN, 'close': _CLOSE, 'limit': limit, 'offset': offset, **filters}).all()
+
+    # One grouped pass gives both facets and the total; facets ignore the grade/subject
+    # filters so the client can show what switching grade or subject would find
+    status_filter = ' AND status = :status' if 'status' in filters else ''
+    groups = db.session.execute(text(
+        f"SELECT grade, subject, count(*) AS hits FROM {index.table} "
+        f"WHERE {index.table} MATCH :match{status_filter} GROUP BY grade, subject"),
+        {'match': match, **filters}).all()
+    facets = {column: {} for column in FACET_COLUMNS}
+    total = 0
+    for group in groups:
+        for column in FACET_COLUMNS:
+            value = getattr(group, column)
+            facets[column][value] = facets[column].get(value, 0) + group.hits
+        if all(getattr(group, column) == filters[column] for column in FACET_COLUMNS if column in filters):
+            total += group.hits
+
+    results = [{
+        'id': row.id,
+        'title': row.title,
+        'title_highlight': _marked(row.title_highlight),
+        'snippet': _marked(row.snippet),
+        'grade': row.grade,
+        'subject': row.subject,
+        'status': row.status,
+        'score': -row.rank
+    } for row in rows]
+    return {'total': total, 'results': results, 'facets': facets}
+
+
+@search_bp.route('', methods=['GET'])
+def search():
+    if not _supported(db.session.connection()):
+        return jsonify({'error': 'Search requires SQLite FTS5'}), 501
+    match = match_expression(request.args.get('q', ''))
+    if match is None:
+        return jsonify({'error': 'q is required'}), 400
+    try:
+        limit = min(int(request.args.get('limit', 20)), MAX_LIMIT)
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    if limit < 1 or offset < 0:
+        return jsonify({'error': 'limit and offset must be positive'}), 400
+    kind = request.args.get('type')
+    if kind is not None and kind not in INDEXES:
+        return jsonify({'error': f"type must be one of: {', '.join(INDEXES)}"}), 400
+    filters = {column: request.args[column] for column in FILTER_COLUMNS if request.args.get(column)}
+
+    response = {'query': request.args['q']}
+    for name, index in INDEXES.items():
+        if kind in (None, name):
+            response[name] = _search_index(index, match, filters, limit, offset)
+    return jsonify(response)
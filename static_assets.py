@@ -0,0 +1,182 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+from flask import current_app, request, send_file, abort, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Static pages, CSS and JS are read once at startup. Every file is precompressed with gzip
+# (and brotli when installed), CSS/JS get a content-hashed URL that HTML references are
+# rewritten to, so those can be cached as immutable. Files up to STATIC_MEMORY_MAX_SIZE are
+# served from memory; larger ones from disk with their compressed variants in
+# STATIC_CACHE_DIR.
+
+FINGERPRINTED_EXTENSIONS = ('.css', '.js')
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/manifest+json',
+                      'image/svg+xml', 'image/x-icon', 'image/vnd.microsoft.icon')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+_REFERENCE = re.compile(r'''((?:href|src)=["'])(?:\.\./|/)((?:css|public)/[^"'?#]+)(["'])''')
+
+
+class Asset:
+    def __init__(self, url, path, body, content_type):
+        self.url = url
+        self.path = path
+        self.content_type = content_type
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        self.size = len(body)
+        self.body = body  # None once spilled to disk
+        self.encoded = {}  # encoding -> bytes, or path when on disk
+
+    def fingerprinted_url(self):
+        stem, ext = os.path.splitext(self.url)
+        return f'{stem}.{self.etag[:10]}{ext}'
+
+
+def _compress(body):
+    variants = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11)
+    # Keep only encodings that actually save bytes
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+
+class AssetStore:
+    def __init__(self, roots, memory_max_size=256 * 1024, compress_min_size=512, cache_dir=None):
+        self.roots = roots  # url prefix -> directory
+        self.memory_max_size = memory_max_size
+        self.compress_min_size = compress_min_size
+        self.cache_dir = cache_dir
+        self.assets = {}
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _files(self):
+        for prefix, directory in self.roots.items():
+            for dirpath, _, filenames in os.walk(directory):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    yield prefix + '/' + os.path.relpath(path, directory).replace(os.sep, '/'), path
+
+    def _current_signature(self):
+        return tuple(sorted((url, os.stat(path).st_mtime_ns) for url, path in self._files()))
+
+    def build(self):
+        assets = {}
+        pending_html = []
+        for url, path in self._files():
+            with open(path, 'rb') as f:
+                body = f.read()
+            content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            if content_type == 'text/html':
+                pending_html.append((url, path, body))
+                continue
+            assets[url] = Asset(url, path, body, content_type)
+
+        fingerprints = {url: asset.fingerprinted_url() for url, asset in assets.items()
+                        if url.endswith(FINGERPRINTED_EXTENSIONS)}
+
+        def rewrite(match):
+            target = '/' + match.group(2)
+            return match.group(1) + fingerprints.get(target, target) + match.group(3)
+
+        for url, path, body in pending_html:
+            body = _REFERENCE.sub(rewrite, body.decode('utf-8')).encode('utf-8')
+            assets[url] = Asset(url, path, body, 'text/html; charset=utf-8')
+
+        for asset in assets.values():
+            self._prepare(asset)
+        for url, fingerprinted in fingerprints.items():
+            assets[fingerprinted] = assets[url]
+        with self._lock:
+            self.assets = assets
+            self._signature = self._current_signature()
+
+    def _prepare(self, asset):
+        compressible = asset.size >= self.compress_min_size and asset.content_type.startswith(COMPRESSIBLE_TYPES)
+        variants = _compress(asset.body) if compressible else {}
+        # Rewritten HTML only exists in memory, so it is never spilled
+        if asset.size <= self.memory_max_size or not self.cache_dir or asset.content_type.startswith('text/html'):
+            asset.encoded = variants
+            return
+        # Large files stay on disk with their compressed variants written to the cache directory
+        asset.body = None
+        target = os.path.join(self.cache_dir, asset.etag)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for encoding, data in variants.items():
+            path = f'{target}.{encoding}'
+            if not os.path.exists(path):
+                with open(path, 'wb') as f:
+                    f.write(data)
+            asset.encoded[encoding] = path
+
+    def refresh_if_changed(self, interval=1.0):
+        # Scanning the directories is cheap but not free, so look at most once per interval
+        now = time.monotonic()
+        if now - self._checked_at < interval:
+            return
+        self._checked_at = now
+        if self._current_signature() != self._signature:
+            self.build()
+
+    def _negotiate(self, asset):
+        accepted = request.accept_encodings
+        best, best_quality = None, 0
+        for encoding in ('br', 'gzip'):
+            quality = accepted[encoding]
+            if encoding in asset.encoded and quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def serve(self, url):
+        asset = self.assets.get(url)
+        if asset is None:
+            abort(404)
+        encoding = self._negotiate(asset)
+        etag = f'{asset.etag}-{encoding}' if encoding else asset.etag
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            data = asset.encoded[encoding] if encoding else asset.body
+            if data is None:
+                response = send_file(asset.path, mimetype=asset.content_type, etag=False, conditional=False)
+            elif isinstance(data, str):
+                response = send_file(data, mimetype=asset.content_type, etag=False, conditional=False)
+            else:
+                response = Response(data, mimetype=asset.content_type)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.headers['Content-Type'] = asset.content_type
+        response.set_etag(etag)
+        # Only the content-hashed URL may be cached forever; the plain one can change under it
+        response.headers['Cache-Control'] = IMMUTABLE if url != asset.url else REVALIDATE
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+def init_app(app, directories):
+    config = app.config
+    roots = {'/' + directory: os.path.join(app.root_path, directory) for directory in directories}
+    cache_dir = config['STATIC_CACHE_DIR'] or os.path.join(app.instance_path, 'static_cache')
+    store = AssetStore(roots, memory_max_size=config['STATIC_MEMORY_MAX_SIZE'],
+                       compress_min_size=config['STATIC_COMPRESS_MIN_SIZE'], cache_dir=cache_dir)
+    store.build()
+    app.extensions['static_assets'] = store
+    return store
+
+
+def serve(url):
+    store = current_app.extensions['static_assets']
+    if current_app.debug:
+        store.refresh_if_changed()
+    return store.serve(url)
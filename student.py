@@ -1,21 +1,44 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
 from flask_cors import CORS
-from models import db, Lesson, Quiz, QuizResult
+from models import db, User, Lesson, Quiz, QuizAttempt, QuizResult, GradeRollup, StudentStats
 from auth import token_required, get_current_user
 import json
 from datetime import datetime, timezone
 from utils.validation import role_required, validate_required_fields
+from utils.pagination import get_page_size, InvalidCursor
+from utils.projection import parse_fields, InvalidFields, SUMMARY
+from utils.conditional import make_etag, not_modified, with_validators
+from replicas import read_only
+import feed
+import grading
+import submission_log
 
 
 students_bp = Blueprint('students_bp', __name__, url_prefix='/api/student')
 CORS(students_bp)
 
+def student_feed(kind, key):
+    """Approved content for the student's grade and subjects, shared through feed.feed_cache."""
+    user = get_current_user()
+    try:
+        fields = parse_fields(request.args, feed.MODELS[kind], default_view=SUMMARY)
+        content, version, updated_date = feed.get_feed(kind, user)
+        etag = make_etag('feed', kind, version, user.grade, sorted(feed.student_subjects(user) or ()))
+        cached = not_modified(etag, updated_date)
+        if cached:
+            return cached
+        items, next_cursor = content.page(request.args.get('cursor'), get_page_size(request.args), fields,
+                                          request.args)
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
+    return with_validators(jsonify({key: items, 'next_cursor': next_cursor}), etag, updated_date)
+
 @students_bp.route('/lessons', methods=['GET'])
 @token_required
 @role_required('student')
+@read_only
 def get_student_lessons():
-    lessons = Lesson.query.all()
-    return jsonify([lesson.to_dict() for lesson in lessons])
+    return student_feed('lesson', 'lessons')
 
 @students_bp.route('/lessons', methods=['OPTIONS'])
 def options_student_lessons():
@@ -24,9 +47,9 @@ def options_student_lessons():
 @students_bp.route('/quizzes', methods=['GET'])
 @token_required
 @role_required('student')
+@read_only
 def get_student_quizzes():
-    quizzes = Quiz.query.all()
-    return jsonify([quiz.to_dict() for quiz in quizzes])
+    return student_feed('quiz', 'quizzes')
 
 @students_bp.route('/quizzes', methods=['OPTIONS'])
 def options_student_quizzes():
@@ -35,6 +58,7 @@ def options_student_quizzes():
 @students_bp.route('/quizzes/attempts', methods=['GET'])
 @token_required
 @role_required('student')
+@read_only
 def get_quiz_attempts():
     user = get_current_user()
     attempts = QuizResult.query.filter_by(student_id=user.id).all()
@@ -43,18 +67,33 @@ def get_quiz_attempts():
 @students_bp.route('/dashboard', methods=['GET'])
 @token_required
 @role_required('student')
+@read_only
 def get_student_dashboard():
     user = get_current_user()
 
-    total_lessons = Lesson.query.count()
-    total_quizzes = Quiz.query.count()
-    quizzes_taken = QuizResult.query.filter_by(student_id=user.id).count()
-    latest_result = QuizResult.query.filter_by(student_id=user.id).order_by(QuizResult.submitted_date.desc()).first()
+    # One round trip: the student's counters, their latest result and the grade and global
+    # content counts, all from rows maintained by analytics.py
+    all_grades = db.aliased(GradeRollup)
+    total_lessons = db.select(db.func.coalesce(db.func.sum(all_grades.lesson_count), 0)).scalar_subquery()
+    total_quizzes = db.select(db.func.coalesce(db.func.sum(all_grades.quiz_count), 0)).scalar_subquery()
+    row = db.session.execute(
+        db.select(StudentStats.quizzes_taken, QuizResult,
+                  GradeRollup.approved_lesson_count, GradeRollup.approved_quiz_count,
+                  total_lessons, total_quizzes)
+        .select_from(User)
+        .outerjoin(StudentStats, StudentStats.user_id == User.id)
+        .outerjoin(QuizResult, QuizResult.id == StudentStats.latest_result_id)
+        .outerjoin(GradeRollup, GradeRollup.grade == User.grade)
+        .where(User.id == user.id)
+    ).one()
+    quizzes_taken, latest_result, grade_lessons, grade_quizzes, total_lessons, total_quizzes = row
 
     dashboard = {
         'total_lessons': total_lessons,
         'total_quizzes': total_quizzes,
-        'quizzes_taken': quizzes_taken,
+        'grade_lessons': grade_lessons or 0,
+        'grade_quizzes': grade_quizzes or 0,
+        'quizzes_taken': quizzes_taken or 0,
         'latest_quiz_result': latest_result.to_dict() if latest_result else None
     }
     return jsonify(dashboard)
@@ -72,15 +111,42 @@ def submit_quiz(quiz_id):
     data = request.get_json()
     answers = data.get('answers')
 
-    quiz = Quiz.query.get_or_404(quiz_id)
+    key = grading.cached_answer_key(quiz_id)
+    if key is None:
+        return jsonify({'error': 'Quiz not found'}), 404
+    score, correct_count = grading.grade_submission(key, answers)
+    now = datetime.now(timezone.utc)
 
+    if current_app.config['SUBMISSION_WRITE_BEHIND']:
+        # Acknowledge once the submission is durable in the log; it reaches QuizResult on the next flush
+        submission_id = submission_log.record_submission(quiz_id, user.id, answers, score, correct_count,
+                                                         key.question_count, now)
+        result = QuizResult(quiz_id=quiz_id, student_id=user.id, answers=json.dumps(answers), submitted_date=now,
+                            score=score, correct_count=correct_count, total_questions=key.question_count)
+        return jsonify({'message': 'Quiz submission accepted', 'submission_id': submission_id,
+                        'result': result.to_dict()}), 202
+
+    attempt = QuizAttempt(
+        quiz_id=quiz_id,
+        user_id=user.id,
+        score=score,
+        total_questions=key.question_count,
+        completed=True,
+        completed_date=now,
+        attempted_at=now
+    )
     quiz_result = QuizResult(
-        quiz_id=quiz.id,
+        quiz_id=quiz_id,
         student_id=user.id,
         answers=json.dumps(answers),
-        submitted_date=datetime.now(timezone.utc)
+        submitted_date=now,
+        score=score,
+        correct_count=correct_count,
+        total_questions=key.question_count,
+        graded_date=now,
+        attempt=attempt
     )
     db.session.add(quiz_result)
     db.session.commit()
 
-    return jsonify({'message': 'Quiz submitted successfully'})
+    return jsonify({'message': 'Quiz submitted successfully', 'result': quiz_result.to_dict()})
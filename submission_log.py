@@ -0,0 +1,316 @@
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+from models import db, Quiz, QuizAttempt, QuizResult
+import analytics
+from utils.filelock import try_lock
+
+# Write-behind ingestion for quiz submissions. A submission is acknowledged once its JSON
+# line is fsynced to an append-only log; a background flusher then moves the log into
+# QuizResult/QuizAttempt in batched transactions. The flushed position is checkpointed in
+# a sidecar file, and submission ids make replays after a crash idempotent.
+# A log has a single writer, enforced with an exclusive lock on a sidecar file: each server
+# process takes the first free slot (SUBMISSION_LOG_PATH, then <path>.1, <path>.2, ...), so
+# workers sharing one configured path never truncate each other's unflushed submissions.
+# A batch that fails for any reason other than a lost database connection is bisected
+# until the failing records are isolated; those go to <path>.quarantine for inspection so
+# one bad record cannot hold back every submission behind it.
+
+logger = logging.getLogger(__name__)
+
+MAX_LOG_SLOTS = 64
+
+
+class LogInUse(RuntimeError):
+    """Another process holds the submission log at this path."""
+
+
+class SubmissionLog:
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.checkpoint_path = path + '.checkpoint'
+        self.quarantine_path = path + '.quarantine'
+        self.fsync = fsync
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(path + '.lock', 'a+b')
+        if not try_lock(self._lock_file):
+            self._lock_file.close()
+            raise LogInUse(f"Submission log {path} is in use by another process")
+        self._trim_partial_tail()
+        self._file = open(path, 'ab')
+        self._written = self._file.tell()
+        self._synced = self._written
+        self._write_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._checkpoint = min(self._read_checkpoint(), self._written)
+
+    def _trim_partial_tail(self):
+        # A crash mid-append can leave half a line at the end; it was never acknowledged
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            end = size
+            while end > 0:
+                f.seek(max(0, end - 4096))
+                chunk = f.read(end - max(0, end - 4096))
+                newline = chunk.rfind(b'\n')
+                if newline != -1:
+                    end = max(0, end - 4096) + newline + 1
+                    break
+                end = max(0, end - 4096)
+            if end != size:
+                f.truncate(end)
+
+    def _read_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_checkpoint(self, offset):
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+        self._checkpoint = offset
+
+    def append(self, record):
+        """Append a record and return once it is durable on disk."""
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._write_lock:
+            self._file.write(line)
+            self._file.flush()
+            self._written += len(line)
+            end = self._written
+        if not self.fsync:
+            return
+        # Group commit: whoever holds the sync lock fsyncs everything written so far, so
+        # concurrent submitters waiting behind it usually find their line already synced
+        with self._sync_lock:
+            if self._synced < end:
+                target = self._written
+                os.fsync(self._file.fileno())
+                self._synced = target
+
+    def read_pending(self, max_records):
+        """Return (records, end_offset) for up to max_records unflushed records."""
+        records = []
+        offset = self._checkpoint
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            while len(records) < max_records:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    break  # end of file, or a line still being written
+                offset += len(line)
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.error(f"Skipping unreadable submission log entry at offset {offset - len(line)}")
+        return records, offset
+
+    def checkpoint(self, offset):
+        """Mark everything before offset as flushed, truncating the log once it is fully drained."""
+        with self._sync_lock, self._write_lock:
+            if offset == self._written:
+                self._file.truncate(0)
+                self._written = self._synced = 0
+                offset = 0
+            self._write_checkpoint(offset)
+
+    def quarantine(self, record, error):
+        """Durably set aside a record that cannot be stored, with the reason."""
+        line = json.dumps({'record': record, 'error': f'{type(error).__name__}: {error}',
+                           'quarantined_at': datetime.now().isoformat()}, separators=(',', ':'), default=str)
+        with open(self.quarantine_path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def pending_bytes(self):
+        return self._written - self._checkpoint
+
+    def close(self):
+        self._file.close()
+        # Closing the lock file releases the lock
+        self._lock_file.close()
+
+
+def log_paths(path):
+    """The configured log path and every numbered slot next to it that exists on disk."""
+    slots = [candidate for candidate in glob.glob(glob.escape(path) + '.*')
+             if candidate[len(path) + 1:].isdigit()]
+    return [path] + sorted(slots, key=lambda candidate: int(candidate[len(path) + 1:]))
+
+
+def open_log(path, fsync=True):
+    """Open the first submission log slot for path that no other process holds."""
+    for slot in range(MAX_LOG_SLOTS):
+        try:
+            return SubmissionLog(path if slot == 0 else f'{path}.{slot}', fsync=fsync)
+        except LogInUse:
+            continue
+    raise LogInUse(f"All {MAX_LOG_SLOTS} submission log slots for {path} are in use")
+
+
+_log = None
+_log_lock = threading.Lock()
+_worker = None
+
+
+def get_log(app=None):
+    global _log
+    app = app or current_app
+    with _log_lock:
+        if _log is None:
+            _log = open_log(app.config['SUBMISSION_LOG_PATH'], fsync=app.config['SUBMISSION_LOG_FSYNC'])
+        return _log
+
+
+def record_submission(quiz_id, student_id, answers, score, correct_count, total_questions, submitted_date):
+    """Durably log a graded submission for later flushing. Returns the submission id."""
+    app = current_app._get_current_object()
+    submission_id = uuid.uuid4().hex
+    get_log(app).append({
+        'submission_id': submission_id,
+        'quiz_id': quiz_id,
+        'student_id': student_id,
+        'answers': answers,
+        'score': score,
+        'correct_count': correct_count,
+        'total_questions': total_questions,
+        'submitted_date': submitted_date.isoformat()
+    })
+    ensure_worker(app)
+    return submission_id
+
+
+def _store(records):
+    submission_ids = [record['submission_id'] for record in records]
+    already_stored = set(db.session.scalars(
+        select(QuizResult.submission_id).where(QuizResult.submission_id.in_(submission_ids))))
+    quiz_ids = {record['quiz_id'] for record in records}
+    live_quizzes = set(db.session.scalars(select(Quiz.id).where(Quiz.id.in_(quiz_ids))))
+
+    fresh = []
+    for record in records:
+        if record['submission_id'] in already_stored:
+            continue
+        if record['quiz_id'] not in live_quizzes:
+            logger.warning(f"Dropping submission {record['submission_id']} for deleted quiz {record['quiz_id']}")
+            continue
+        fresh.append({**record, 'submitted_date': datetime.fromisoformat(record['submitted_date'])})
+    if not fresh:
+        return 0
+
+    attempt_ids = db.session.scalars(
+        insert(QuizAttempt).returning(QuizAttempt.id, sort_by_parameter_order=True),
+        [{'quiz_id': r['quiz_id'], 'user_id': r['student_id'], 'score': r['score'],
+          'total_questions': r['total_questions'], 'completed': True,
+          'attempted_at': r['submitted_date'], 'completed_date': r['submitted_date']} for r in fresh]
+    ).all()
+    result_ids = db.session.scalars(insert(QuizResult).returning(QuizResult.id, sort_by_parameter_order=True), [
+        {'submission_id': r['submission_id'], 'quiz_id': r['quiz_id'], 'student_id': r['student_id'],
+         'answers': json.dumps(r['answers']), 'submitted_date': r['submitted_date'],
+         'score': r['score'], 'correct_count': r['correct_count'], 'total_questions': r['total_questions'],
+         'graded_date': r['submitted_date'], 'attempt_id': attempt_id}
+        for r, attempt_id in zip(fresh, attempt_ids)
+    ]).all()
+
+    # Bulk inserts skip the rollup listeners, so apply the per-quiz and per-student totals directly
+    totals = defaultdict(lambda: [0, 0.0])
+    for record in fresh:
+        totals[record['quiz_id']][0] += 1
+        totals[record['quiz_id']][1] += record['score']
+    connection = db.session.connection()
+    for quiz_id, (count, score_sum) in totals.items():
+        analytics.adjust_quiz_attempts(connection, quiz_id, attempt_count=count,
+                                       completed_attempt_count=count, score_sum=score_sum)
+    analytics.adjust_student_results(connection, [(r['student_id'], result_id, r['submitted_date'])
+                                                  for r, result_id in zip(fresh, result_ids)])
+    return len(fresh)
+
+
+def flush_pending(batch_size=None, log=None):
+    """Move one batch of logged submissions into the database. Returns the number of records read."""
+    log = log or get_log()
+    records, end = log.read_pending(batch_size or current_app.config['SUBMISSION_FLUSH_BATCH'])
+    if not records:
+        return 0
+    _store_isolating(log, records)
+    log.checkpoint(end)
+    return len(records)
+
+
+def _store_isolating(log, records):
+    """Store records in one transaction, bisecting on failure and quarantining single bad records.
+
+    Lost connections are raised so the whole batch is retried later. Halves that succeed are
+    committed on their own, which is safe because replays skip stored submission ids.
+    """
+    try:
+        _store(records)
+        db.session.commit()
+    except (OperationalError, InterfaceError):
+        db.session.rollback()
+        raise
+    except Exception as e:
+        db.session.rollback()
+        if len(records) == 1:
+            logger.error(f"Quarantining submission log record: {e}")
+            log.quarantine(records[0], e)
+            return
+        middle = len(records) // 2
+        _store_isolating(log, records[:middle])
+        _store_isolating(log, records[middle:])
+
+
+def run_worker(app, stop_event=None):
+    """Flush the submission log until stop_event is set, draining it fully before stopping."""
+    stop_event = stop_event or threading.Event()
+    interval = app.config['SUBMISSION_FLUSH_INTERVAL']
+    while True:
+        flushed = 0
+        with app.app_context():
+            try:
+                flushed = flush_pending()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Submission flush failed: {e}")
+            finally:
+                db.session.remove()
+        if flushed:
+            continue
+        if stop_event.is_set():
+            return
+        stop_event.wait(interval)
+
+
+def ensure_worker(app):
+    global _worker
+    if _worker is None:
+        with _log_lock:
+            if _worker is None:
+                _worker = start_worker(app)
+
+
+def start_worker(app):
+    stop_event = threading.Event()
+    thread = threading.Thread(target=run_worker, args=(app, stop_event), name='submission-flusher', daemon=True)
+    thread.start()
+    return thread, stop_event
@@ -1,29 +1,35 @@
 from flask import Blueprint, jsonify
-from models import db, User, Lesson, Quiz, QuizAttempt, LessonProgress
+from models import db, User, Lesson, Quiz, QuizAttempt, LessonProgress, TeacherRollup, GradeRollup
 from auth import token_required, get_current_user
 from utils.validation import role_required
+from replicas import read_only
 
 teacher_bp = Blueprint('teacher_bp', __name__, url_prefix='/api/teacher')
 
 @teacher_bp.route('/dashboard', methods=['GET'])
 @token_required
 @role_required('teacher')
+@read_only
 def get_dashboard():
     try:
         user = get_current_user()
 
         teacher_id = user.id
 
-        teacher_lessons = Lesson.query.filter_by(teacher_id=teacher_id).all()
-        grades = list(set([lesson.grade for lesson in teacher_lessons]))
-        total_students = User.query.filter(User.role == 'student', User.grade.in_(grades)).count()
+        # Served from the rollups maintained in analytics.py rather than the raw attempt history
+        active_lessons, pending_grades, score_sum, attempt_count = db.session.query(
+            db.func.coalesce(db.func.sum(TeacherRollup.approved_lesson_count), 0),
+            db.func.coalesce(db.func.sum(TeacherRollup.completed_attempt_count), 0),
+            db.func.coalesce(db.func.sum(TeacherRollup.score_sum), 0),
+            db.func.coalesce(db.func.sum(TeacherRollup.attempt_count), 0)
+        ).filter(TeacherRollup.teacher_id == teacher_id).one()
 
-        active_lessons = Lesson.query.filter_by(teacher_id=teacher_id, status='approved').count()
+        teacher_grades = db.session.query(TeacherRollup.grade) \
+            .filter(TeacherRollup.teacher_id == teacher_id, TeacherRollup.lesson_count > 0)
+        total_students = db.session.query(db.func.coalesce(db.func.sum(GradeRollup.student_count), 0)) \
+            .filter(GradeRollup.grade.in_(teacher_grades)).scalar()
 
-        pending_grades = QuizAttempt.query.join(Quiz).filter(Quiz.teacher_id == teacher_id, QuizAttempt.completed == True).count()
-
-        avg_performance = db.session.query(db.func.avg(QuizAttempt.score)).join(Quiz).filter(Quiz.teacher_id == teacher_id).scalar()
-        avg_performance = round(avg_performance * 100, 1) if avg_performance else 0
+        avg_performance = round(score_sum / attempt_count * 100, 1) if attempt_count else 0
 
         dashboard_data = {
             'total_students': total_students,
@@ -41,26 +47,35 @@ def get_dashboard():
 @teacher_bp.route('/classes', methods=['GET'])
 @token_required
 @role_required('teacher')
+@read_only
 def get_classes():
     try:
         user = get_current_user()
 
         teacher_id = user.id
-        lessons = Lesson.query.filter_by(teacher_id=teacher_id, status='approved').all()
-
-        classes = {}
-        for lesson in lessons:
-            key = f"{lesson.grade} - {lesson.subject}"
-            if key not in classes:
-                classes[key] = {
-                    'grade': lesson.grade,
-                    'subject': lesson.subject,
-                    'lesson_count': 0,
-                    'student_count': User.query.filter_by(role='student', grade=lesson.grade).count()
-                }
-            classes[key]['lesson_count'] += 1
-
-        return jsonify(list(classes.values()))
+        student_counts = db.session.query(
+            User.grade.label('grade'),
+            db.func.count(User.id).label('student_count')
+        ).filter(User.role == 'student').group_by(User.grade).subquery()
+
+        rows = db.session.query(
+            Lesson.grade,
+            Lesson.subject,
+            db.func.count(Lesson.id),
+            db.func.coalesce(student_counts.c.student_count, 0)
+        ).outerjoin(student_counts, student_counts.c.grade == Lesson.grade) \
+            .filter(Lesson.teacher_id == teacher_id, Lesson.status == 'approved') \
+            .group_by(Lesson.grade, Lesson.subject, student_counts.c.student_count) \
+            .all()
+
+        classes = [{
+            'grade': grade,
+            'subject': subject,
+            'lesson_count': lesson_count,
+            'student_count': student_count
+        } for grade, subject, lesson_count, student_count in rows]
+
+        return jsonify(classes)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -69,28 +84,26 @@ def get_classes():
 @teacher_bp.route('/progress', methods=['GET'])
 @token_required
 @role_required('teacher')
+@read_only
 def get_progress():
     try:
         user = get_current_user()
 
         teacher_id = user.id
-        lessons = Lesson.query.filter_by(teacher_id=teacher_id).all()
-        lesson_ids = [l.id for l in lessons]
+        total_progress, completed, avg_progress, total_students = db.session.query(
+            db.func.count(LessonProgress.id),
+            db.func.sum(db.case((LessonProgress.completed == True, 1), else_=0)),
+            db.func.avg(LessonProgress.progress_percentage),
+            db.func.count(db.distinct(LessonProgress.user_id))
+        ).join(Lesson, Lesson.id == LessonProgress.lesson_id).filter(Lesson.teacher_id == teacher_id).one()
 
-        progress_records = LessonProgress.query.filter(LessonProgress.lesson_id.in_(lesson_ids)).all()
-
-        total_progress = len(progress_records)
-        completed = sum(1 for p in progress_records if p.completed)
-        avg_progress = sum(p.progress_percentage for p in progress_records) / total_progress if total_progress > 0 else 0
-
-        quiz_attempts = QuizAttempt.query.join(Quiz).filter(Quiz.teacher_id == teacher_id).all()
-        avg_score = sum(a.score for a in quiz_attempts) / len(quiz_attempts) if quiz_attempts else 0
+        avg_score = db.session.query(db.func.avg(QuizAttempt.score)).join(Quiz).filter(Quiz.teacher_id == teacher_id).scalar()
 
         return jsonify({
-            'total_students': len(set(p.user_id for p in progress_records)),
-            'avg_progress': round(avg_progress, 1),
-            'completion_rate': round(completed / total_progress * 100, 1) if total_progress > 0 else 0,
-            'avg_score': round(avg_score * 100, 1)
+            'total_students': total_students,
+            'avg_progress': round(avg_progress or 0, 1),
+            'completion_rate': round((completed or 0) / total_progress * 100, 1) if total_progress > 0 else 0,
+            'avg_score': round((avg_score or 0) * 100, 1)
         })
     except Exception as e:
         import traceback
@@ -100,25 +113,32 @@ def get_progress():
 @teacher_bp.route('/grading', methods=['GET'])
 @token_required
 @role_required('teacher')
+@read_only
 def get_grading():
     try:
         user = get_current_user()
 
         teacher_id = user.id
-        quizzes = Quiz.query.filter_by(teacher_id=teacher_id).all()
-
-        grading_queue = []
-        for quiz in quizzes:
-            attempts = QuizAttempt.query.filter_by(quiz_id=quiz.id, completed=True).all()
-            if attempts:
-                grading_queue.append({
-                    'quiz_id': quiz.id,
-                    'title': quiz.title,
-                    'grade': quiz.grade,
-                    'subject': quiz.subject,
-                    'pending_count': len(attempts),
-                    'total_questions': len(quiz.questions) if quiz.questions else 0
-                })
+        rows = db.session.query(
+            Quiz.id,
+            Quiz.title,
+            Quiz.grade,
+            Quiz.subject,
+            Quiz.question_count,
+            db.func.count(QuizAttempt.id)
+        ).join(QuizAttempt, QuizAttempt.quiz_id == Quiz.id) \
+            .filter(Quiz.teacher_id == teacher_id, QuizAttempt.completed == True) \
+            .group_by(Quiz.id, Quiz.title, Quiz.grade, Quiz.subject, Quiz.question_count) \
+            .all()
+
+        grading_queue = [{
+            'quiz_id': quiz_id,
+            'title': title,
+            'grade': grade,
+            'subject': subject,
+            'pending_count': pending_count,
+            'total_questions': question_count
+        } for quiz_id, title, grade, subject, question_count, pending_count in rows]
 
         return jsonify(grading_queue)
     except Exception as e:
@@ -129,6 +149,7 @@ def get_grading():
 @teacher_bp.route('/lessons', methods=['GET'])
 @token_required
 @role_required('teacher')
+@read_only
 def get_teacher_lessons():
     try:
         user = get_current_user()
@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import pytest
+import ai_service
+from utils.filelock import try_lock
+
+
+class StubCompletions:
+    def __init__(self, delay=0.0, fail=False):
+        self.calls = []
+        self.delay = delay
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def create(self, model, messages, **params):
+        with self._lock:
+            self.calls.append(messages[-1]['content'])
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('upstream unavailable')
+        message = SimpleNamespace(content=f"  answer to {messages[-1]['content']}  ")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def stub_client(monkeypatch):
+    def install(**kwargs):
+        completions = StubCompletions(**kwargs)
+        monkeypatch.setattr(ai_service, 'client', SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+        return completions
+    ai_service.response_cache.clear()
+    yield install
+    ai_service.response_cache.clear()
+
+
+def test_normalized_repeat_questions_hit_the_cache(stub_client):
+    completions = stub_client()
+    first = ai_service.get_ai_tutor_response('What is photosynthesis?')
+    again = ai_service.get_ai_tutor_response('  what is   PHOTOSYNTHESIS ')
+    assert first == again == 'answer to What is photosynthesis?'
+    assert len(completions.calls) == 1
+
+
+def test_concurrent_identical_questions_share_one_upstream_call(stub_client):
+    completions = stub_client(delay=0.2)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        answers = list(executor.map(ai_service.get_ai_tutor_response, ['Explain gravity'] * 8))
+    assert set(answers) == {'answer to Explain gravity'}
+    assert len(completions.calls) == 1
+
+
+def test_upstream_errors_are_not_cached(stub_client):
+    stub_client(fail=True)
+    assert ai_service.get_ai_tutor_response('Define osmosis').startswith('Error:')
+    completions = stub_client()
+    assert ai_service.get_ai_tutor_response('Define osmosis') == 'answer to Define osmosis'
+    assert len(completions.calls) == 1
+
+
+def test_cache_survives_restart_via_persistence_file(stub_client, monkeypatch, tmp_path):
+    path = tmp_path / 'ai_cache.jsonl'
+    monkeypatch.setattr(ai_service, 'AI_CACHE_PATH', str(path))
+    stub_client()
+    ai_service.get_ai_tutor_response('What is a noun?')
+
+    ai_service.response_cache.clear()
+    assert ai_service.load_persisted_cache() == 1
+    completions = stub_client()
+    assert ai_service.get_ai_tutor_response('what is a noun') == 'answer to What is a noun?'
+    assert completions.calls == []
+
+
+def test_persisted_entries_keep_their_age_across_restarts(monkeypatch, tmp_path):
+    path = tmp_path / 'ai_cache.jsonl'
+    now = time.time()
+    lines = [{'key': 'fresh', 'value': 'a', 'created_at': now - 60},
+             {'key': 'expired', 'value': 'b', 'created_at': now - ai_service.AI_CACHE_TTL - 1},
+             {'key': 'legacy', 'value': 'c'}]
+    path.write_text(''.join(json.dumps(line) + '\n' for line in lines))
+    ai_service.response_cache.clear()
+
+    # Another worker is compacting the file, so this one only reads it
+    with open(f'{path}.lock', 'a+b') as lock_file:
+        assert try_lock(lock_file)
+        assert ai_service.load_persisted_cache(str(path)) == 1
+        assert len(path.read_text().splitlines()) == 3
+
+    ai_service.response_cache.clear()
+    assert ai_service.load_persisted_cache(str(path)) == 1
+    assert ai_service.response_cache.get('fresh') == 'a' and ai_service.response_cache.get('expired') is None
+    assert [json.loads(line)['key'] for line in path.read_text().splitlines()] == ['fresh']
+    ai_service.response_cache.clear()
+
+
+def test_appends_wait_for_a_compaction_in_progress(monkeypatch, tmp_path):
+    path = tmp_path / 'ai_cache.jsonl'
+    monkeypatch.setattr(ai_service, 'AI_CACHE_PATH', str(path))
+    path.write_text(json.dumps({'key': 'old', 'value': 'a', 'created_at': time.time()}) + '\n')
+
+    # Stand in for another worker between reading the file and swapping in its rewrite
+    with open(f'{path}.lock', 'a+b') as lock_file:
+        assert try_lock(lock_file)
+        writer = threading.Thread(target=ai_service._persist, args=('new', 'b'))
+        writer.start()
+        writer.join(0.2)
+        assert writer.is_alive()
+        ai_service._compact(str(path), [json.loads(path.read_text())])
+    writer.join(5)
+    assert [json.loads(line)['key'] for line in path.read_text().splitlines()] == ['old', 'new']
+
+
+def test_tutor_stream_relays_tokens_as_server_sent_events(client, make_user, monkeypatch):
+    _, headers = make_user('s', 'student')
+    backend = ai_service.FakeStreamingBackend('Plants make food')
+    monkeypatch.setattr(ai_service, 'streaming_backend', backend)
+    ai_service.response_cache.clear()
+
+    response = client.post('/api/ai/tutor/stream', json={'query': 'What is photosynthesis?'},
+                           headers=headers)
+
+    assert response.mimetype == 'text/event-stream'
+    events = response.get_data(as_text=True).strip().split('\n\n')
+    assert events == [
+        'data: {"token": "Plants"}',
+        'data: {"token": " make"}',
+        'data: {"token": " food"}',
+        'event: done\ndata: {}',
+    ]
+    assert ai_service.response_cache.get(ai_service.cache_key('what is photosynthesis')) == 'Plants make food'
@@ -0,0 +1,132 @@
+from datetime import datetime
+from models import db, Lesson, Quiz, QuizAttempt, QuizResult, LessonProgress, TeacherRollup, GradeRollup
+import analytics
+
+
+def counters(row, *keys):
+    return {name: value for name, value in row._mapping.items() if value and name not in keys}
+
+
+def snapshot():
+    """Every rollup and student counter row, leaving out counters (and rows) that are back to zero."""
+    teachers = {(row.teacher_id, row.grade, row.subject): counters(row, 'teacher_id', 'grade', 'subject')
+                for row in db.session.execute(db.select(analytics.teacher_rollup))}
+    grades = {row.grade: counters(row, 'grade') for row in db.session.execute(db.select(analytics.grade_rollup))}
+    students = {row.user_id: (row.quizzes_taken, row.latest_result_id)
+                for row in db.session.execute(db.select(analytics.student_stats)) if row.quizzes_taken}
+    return ({key: values for key, values in teachers.items() if values},
+            {key: values for key, values in grades.items() if values}, students)
+
+
+def assert_matches_rebuild():
+    maintained = snapshot()
+    analytics.rebuild_rollups()
+    assert snapshot() == maintained
+    return maintained
+
+
+def teacher_row(teacher, grade, subject='Math'):
+    return db.session.get(TeacherRollup, (teacher.id, grade, subject))
+
+
+def test_lesson_and_progress_counters_follow_inserts_moves_and_deletes(make_user):
+    (teacher, _), (other, _) = make_user('t', 'teacher'), make_user('o', 'teacher')
+    student, _ = make_user('s', 'student', grade='Grade 6')
+    lesson = Lesson(title='L', subject='Math', grade='Grade 6', content='x', teacher_id=teacher.id, status='pending')
+    db.session.add(lesson)
+    db.session.commit()
+    progress = LessonProgress(lesson_id=lesson.id, user_id=student.id, progress_percentage=40.0)
+    db.session.add(progress)
+    db.session.commit()
+    row = teacher_row(teacher, 'Grade 6')
+    assert (row.lesson_count, row.approved_lesson_count, row.progress_count, row.progress_sum) == (1, 0, 1, 40.0)
+
+    progress.progress_percentage, progress.completed = 100.0, True
+    lesson.status = 'approved'
+    db.session.commit()
+    row = teacher_row(teacher, 'Grade 6')
+    assert (row.approved_lesson_count, row.completed_progress_count, row.progress_sum) == (1, 1, 100.0)
+    assert db.session.get(GradeRollup, 'Grade 6').approved_lesson_count == 1
+    assert_matches_rebuild()
+
+    # Moving the lesson carries its progress to the new teacher and grade
+    lesson.teacher_id, lesson.grade = other.id, 'Grade 7'
+    db.session.commit()
+    teachers, grades, _ = assert_matches_rebuild()
+    assert (teacher.id, 'Grade 6', 'Math') not in teachers
+    assert teachers[(other.id, 'Grade 7', 'Math')]['progress_sum'] == 100.0
+    assert grades['Grade 7']['lesson_count'] == 1 and 'lesson_count' not in grades['Grade 6']
+
+    db.session.delete(progress)
+    db.session.commit()
+    assert teacher_row(other, 'Grade 7').progress_count == 0
+    db.session.delete(lesson)
+    db.session.commit()
+    teachers, grades, _ = assert_matches_rebuild()
+    assert teachers == {} and grades == {'Grade 6': {'student_count': 1}}
+
+
+def test_quiz_and_attempt_counters_follow_inserts_moves_and_deletes(make_user):
+    (teacher, _), (other, _) = make_user('t', 'teacher'), make_user('o', 'teacher')
+    student, _ = make_user('s', 'student', grade='Grade 6')
+    quizzes = [Quiz(title=f'Q{n}', subject='Math', grade='Grade 6', teacher_id=teacher.id, status='approved')
+               for n in range(2)]
+    db.session.add_all(quizzes)
+    db.session.commit()
+    attempt = QuizAttempt(quiz_id=quizzes[0].id, user_id=student.id, score=0.5, total_questions=2, completed=True)
+    db.session.add(attempt)
+    db.session.commit()
+    row = teacher_row(teacher, 'Grade 6')
+    assert (row.attempt_count, row.completed_attempt_count, row.score_sum) == (1, 1, 0.5)
+    assert db.session.get(GradeRollup, 'Grade 6').approved_quiz_count == 2
+
+    attempt.score = 1.0
+    quizzes[1].teacher_id, quizzes[1].subject = other.id, 'Science'
+    db.session.commit()
+    assert teacher_row(teacher, 'Grade 6').score_sum == 1.0
+    assert_matches_rebuild()
+
+    # An attempt moved to a quiz of another teacher moves its totals with it
+    attempt.quiz_id = quizzes[1].id
+    db.session.commit()
+    teachers, _, _ = assert_matches_rebuild()
+    assert teachers == {(other.id, 'Grade 6', 'Science'): {'attempt_count': 1, 'completed_attempt_count': 1,
+                                                           'score_sum': 1.0}}
+
+    quizzes[1].status = 'pending'
+    db.session.delete(attempt)
+    db.session.commit()
+    db.session.delete(quizzes[0])
+    db.session.commit()
+    teachers, grades, _ = assert_matches_rebuild()
+    assert teachers == {}
+    assert grades == {'Grade 6': {'student_count': 1, 'quiz_count': 1}}
+
+
+def test_user_and_result_counters_follow_role_grade_and_deletes(make_user):
+    teacher, _ = make_user('t', 'teacher')
+    students = [make_user(f's{n}', 'student', grade='Grade 6')[0] for n in range(2)]
+    quiz = Quiz(title='Q', subject='Math', grade='Grade 6', teacher_id=teacher.id)
+    db.session.add(quiz)
+    db.session.commit()
+    results = [QuizResult(quiz_id=quiz.id, student_id=students[0].id, answers='[]', submitted_date=datetime(2025, 1, day))
+               for day in (2, 1)]
+    db.session.add_all(results)
+    db.session.commit()
+    _, grades, stats = assert_matches_rebuild()
+    assert grades['Grade 6']['student_count'] == 2
+    assert stats == {students[0].id: (2, results[0].id)}
+
+    students[1].grade = 'Grade 7'
+    teacher.role, teacher.grade = 'student', 'Grade 7'
+    results[0].student_id = students[1].id
+    db.session.commit()
+    _, grades, stats = assert_matches_rebuild()
+    assert (grades['Grade 6']['student_count'], grades['Grade 7']['student_count']) == (1, 2)
+    assert stats == {students[0].id: (1, results[1].id), students[1].id: (1, results[0].id)}
+
+    db.session.delete(results[1])
+    db.session.delete(teacher)
+    db.session.commit()
+    _, grades, stats = assert_matches_rebuild()
+    assert grades['Grade 7']['student_count'] == 1 and stats == {students[1].id: (1, results[0].id)}
@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy import event
+from models import db, Lesson, Quiz
+import content_versions
+
+
+@pytest.fixture
+def teacher(make_user):
+    user, headers = make_user('t', 'teacher')
+    return user.id, headers
+
+
+def make_lesson(teacher_id):
+    lesson = Lesson(title='Cells', subject='Biology', grade='Grade 8', content='x' * 5000, teacher_id=teacher_id)
+    db.session.add(lesson)
+    db.session.commit()
+    return lesson.id
+
+
+def test_lesson_detail_revalidates_without_loading_the_row(client, teacher):
+    teacher_id, headers = teacher
+    lesson_id = make_lesson(teacher_id)
+    first = client.get(f'/api/lessons/{lesson_id}')
+    assert first.status_code == 200 and first.headers['ETag'] and first.headers['Last-Modified']
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        again = client.get(f'/api/lessons/{lesson_id}', headers={'If-None-Match': first.headers['ETag']})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert again.status_code == 304 and again.data == b''
+    assert len(statements) == 1 and 'content' not in statements[0]
+
+    since = client.get(f'/api/lessons/{lesson_id}', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+
+    client.put(f'/api/lessons/{lesson_id}', json={'title': 'Cell biology'}, headers=headers)
+    changed = client.get(f'/api/lessons/{lesson_id}', headers={'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200 and changed.json['title'] == 'Cell biology'
+    assert changed.headers['ETag'] != first.headers['ETag']
+
+
+def test_etag_depends_on_requested_fields(client, teacher):
+    lesson_id = make_lesson(teacher[0])
+    full = client.get(f'/api/lessons/{lesson_id}')
+    summary = client.get(f'/api/lessons/{lesson_id}?view=summary', headers={'If-None-Match': full.headers['ETag']})
+    assert summary.status_code == 200 and 'content' not in summary.json
+
+
+def test_listing_etag_follows_collection_changes(client, teacher):
+    teacher_id, headers = teacher
+    make_lesson(teacher_id)
+    first = client.get('/api/lessons')
+    assert client.get('/api/lessons', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    make_lesson(teacher_id)
+    changed = client.get('/api/lessons', headers={'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200 and len(changed.json['lessons']) == 2
+
+
+def test_editing_quiz_questions_changes_its_etag(client, teacher):
+    teacher_id, headers = teacher
+    quiz_id = client.post('/api/quizzes', json={'title': 'Q', 'subject': 'Math', 'grade': 'Grade 6',
+                                                'questions': [{'question': '1 + 1?', 'correct_answer': '2'}]},
+                          headers=headers).json['id']
+    detail, listing = client.get(f'/api/quizzes/{quiz_id}'), client.get('/api/quizzes')
+
+    client.put(f'/api/quizzes/{quiz_id}', json={'questions': [{'question': '1 + 2?', 'correct_answer': '3'}]},
+               headers=headers)
+
+    assert client.get(f'/api/quizzes/{quiz_id}', headers={'If-None-Match': detail.headers['ETag']}).status_code == 200
+    assert client.get('/api/quizzes', headers={'If-None-Match': listing.headers['ETag']}).status_code == 200
+    assert db.session.get(Quiz, quiz_id).version == 2
+    assert client.get('/api/quizzes/999').status_code == 404
+
+
+def test_collection_counter_is_created_and_bumped_with_one_upsert(app):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        for _ in range(3):
+            content_versions._bump_collection(db.session.connection(), 'lesson')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    db.session.commit()
+    assert content_versions.collection_version('lesson')[0] == 3
+    assert len(statements) == 3 and all('ON CONFLICT' in statement for statement in statements)
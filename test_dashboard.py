@@ -0,0 +1,75 @@
+from sqlalchemy import event
+from models import db, Lesson, Quiz, QuizResult, GradeRollup, StudentStats
+import analytics
+import submission_log
+
+
+def make_content(teacher_id):
+    lessons = [Lesson(title=f'L{n}', subject='Math', grade=grade, content='x', teacher_id=teacher_id, status=status)
+               for n, (grade, status) in enumerate([('Grade 6', 'approved'), ('Grade 6', 'pending'),
+                                                    ('Grade 7', 'approved')])]
+    quiz = Quiz(title='Q', subject='Math', grade='Grade 6', teacher_id=teacher_id, status='approved')
+    quiz.set_questions([{'question': '2 + 2?', 'correct_answer': '4'}])
+    db.session.add_all(lessons + [quiz])
+    db.session.commit()
+    return lessons, quiz
+
+
+def test_dashboard_is_one_query_over_maintained_counters(client, make_user):
+    teacher, _ = make_user('t', 'teacher')
+    _, headers = make_user('s', 'student', grade='Grade 6')
+    lessons, quiz = make_content(teacher.id)
+
+    empty = client.get('/api/student/dashboard', headers=headers).json
+    assert empty['quizzes_taken'] == 0 and empty['latest_quiz_result'] is None
+    assert (empty['total_lessons'], empty['grade_lessons'], empty['total_quizzes']) == (3, 1, 1)
+
+    client.post(f'/api/student/quizzes/{quiz.id}/submit', json={'answers': ['5']}, headers=headers)
+    client.post(f'/api/student/quizzes/{quiz.id}/submit', json={'answers': ['4']}, headers=headers)
+    lessons[1].status = 'approved'
+    db.session.commit()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        dashboard = client.get('/api/student/dashboard', headers=headers).json
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert len(statements) == 1
+    assert dashboard['quizzes_taken'] == 2 and dashboard['grade_lessons'] == 2
+    assert dashboard['latest_quiz_result']['score'] == 100.0
+
+    # Deleting the latest result falls back to the previous one
+    latest = db.session.get(QuizResult, dashboard['latest_quiz_result']['id'])
+    db.session.delete(latest)
+    db.session.commit()
+    dashboard = client.get('/api/student/dashboard', headers=headers).json
+    assert dashboard['quizzes_taken'] == 1 and dashboard['latest_quiz_result']['score'] == 0.0
+
+
+def test_write_behind_results_and_rebuild_agree(app, client, make_user, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'SUBMISSION_WRITE_BEHIND', True)
+    monkeypatch.setitem(app.config, 'SUBMISSION_LOG_PATH', str(tmp_path / 'submissions.log'))
+    monkeypatch.setattr(submission_log, '_log', None)
+    monkeypatch.setattr(submission_log, '_worker', object())
+    teacher, _ = make_user('t', 'teacher')
+    student, headers = make_user('s', 'student', grade='Grade 6')
+    _, quiz = make_content(teacher.id)
+
+    for answer in ('4', '5', '4'):
+        client.post(f'/api/student/quizzes/{quiz.id}/submit', json={'answers': [answer]}, headers=headers)
+    submission_log.flush_pending()
+    submission_log._log.close()
+    stats = db.session.get(StudentStats, student.id)
+    newest = QuizResult.query.order_by(QuizResult.submitted_date.desc(), QuizResult.id.desc()).first()
+    assert stats.quizzes_taken == 3 and stats.latest_result_id == newest.id
+
+    maintained = {row.grade: (row.student_count, row.lesson_count, row.approved_lesson_count, row.quiz_count)
+                  for row in GradeRollup.query.all()}
+    analytics.rebuild_rollups()
+    rebuilt = {row.grade: (row.student_count, row.lesson_count, row.approved_lesson_count, row.quiz_count)
+               for row in GradeRollup.query.all()}
+    assert maintained == rebuilt == {'Grade 6': (1, 2, 1, 1), 'Grade 7': (0, 1, 1, 0)}
+    stats = db.session.get(StudentStats, student.id)
+    assert stats.quizzes_taken == 3 and stats.latest_result_id == newest.id
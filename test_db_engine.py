@@ -0,0 +1,35 @@
+from sqlalchemy import create_engine, text
+import db_engine
+
+
+def test_sqlite_connections_get_the_pragmas(app, tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "profile.db"}')
+    db_engine.apply_sqlite_pragmas(engine, db_engine.sqlite_pragmas(app.config))
+    with engine.connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA busy_timeout')).scalar() == app.config['SQLITE_BUSY_TIMEOUT']
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+    engine.dispose()
+
+
+def test_pool_options_follow_the_database(app):
+    postgres = db_engine.engine_options(app.config, 'postgresql://edu@db/edu')
+    assert postgres['pool_size'] == app.config['DB_POOL_SIZE'] and postgres['pool_pre_ping'] is True
+    assert 'pool_pre_ping' not in db_engine.engine_options(app.config, 'sqlite:///edu.db')
+    assert db_engine.engine_options(app.config, 'sqlite://') == {}
+
+
+def test_pool_metrics_are_reported_to_admins(app, client, make_user, tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "pool.db"}', pool_size=2, max_overflow=1)
+    metrics = db_engine.PoolMetrics(engine)
+    first, second = engine.connect(), engine.connect()
+    assert metrics.stats()['utilization'] == round(2 / 3, 4)
+    first.close()
+    second.close()
+    stats = metrics.stats()
+    assert (stats['checked_out'], stats['peak_checked_out'], stats['checkouts'], stats['capacity']) == (0, 2, 2, 3)
+    engine.dispose()
+
+    _, admin = make_user('a', 'admin')
+    response = client.get('/api/db_stats', headers=admin)
+    assert response.status_code == 200 and response.json['default']['checkouts'] > 0
@@ -0,0 +1,124 @@
+import pytest
+from content_versions import collection_version
+from models import db, User, Lesson
+import feed
+
+
+def add_lesson(teacher_id, title, grade, subject, status='approved'):
+    lesson = Lesson(title=title, subject=subject, grade=grade, content='x', teacher_id=teacher_id, status=status)
+    db.session.add(lesson)
+    db.session.commit()
+    return lesson
+
+
+@pytest.fixture
+def catalogue(make_user):
+    teacher_id = make_user('t', 'teacher')[0].id
+    add_lesson(teacher_id, 'Algebra', 'Grade 10', 'Mathematics')
+    add_lesson(teacher_id, 'Poems', 'Grade 10', 'English')
+    add_lesson(teacher_id, 'Drawing', 'Grade 10', 'Art')
+    add_lesson(teacher_id, 'Spreadsheets', 'Grade 10', 'ICT')
+    add_lesson(teacher_id, 'Fractions', 'Grade 6', 'Mathematics')
+    add_lesson(teacher_id, 'Mechanics', 'Grade 12', 'Physics')
+    pending = add_lesson(teacher_id, 'Vectors', 'Grade 10', 'Mathematics', status='pending')
+    return pending
+
+
+def titles_of(page):
+    return [lesson['title'] for lesson in page['lessons']]
+
+
+def titles(response):
+    return titles_of(response.json)
+
+
+def test_feed_is_filtered_and_shared_by_grade_and_subjects(client, catalogue, make_user):
+    _, first = make_user('s1', 'student', grade='Grade 10', subjects='Music,Commerce,ICT')
+    _, second = make_user('s2', 'student', grade='Grade 10', subjects='commerce, music,ICT')
+    _, junior = make_user('s3', 'student', grade='Grade 6')
+
+    # Basket subjects plus the core subjects every grade 10-11 student takes
+    assert sorted(titles(client.get('/api/student/lessons', headers=first))) == ['Algebra', 'Poems', 'Spreadsheets']
+    misses = feed.feed_cache.misses
+    assert sorted(titles(client.get('/api/student/lessons', headers=second))) == ['Algebra', 'Poems', 'Spreadsheets']
+    assert feed.feed_cache.misses == misses
+    # No subjects recorded means every subject of the grade
+    assert titles(client.get('/api/student/lessons', headers=junior)) == ['Fractions']
+
+
+def test_unusable_subjects_fall_back_to_every_subject(client, catalogue, make_user):
+    for n, raw in enumerate(('5', '{}', 'null', '[1, null, " "]', ' , ')):
+        _, headers = make_user(f's{n}', 'student', grade='Grade 10', subjects=raw)
+        response = client.get('/api/student/lessons', headers=headers)
+        assert response.status_code == 200, raw
+        assert sorted(titles(response)) == ['Algebra', 'Drawing', 'Poems', 'Spreadsheets']
+    assert feed.student_subjects(User(subjects='["Art", 7]')) == feed.CORE_SUBJECTS | {'art'}
+    assert feed.student_subjects(User(subjects='"ICT"')) == feed.CORE_SUBJECTS | {'ict'}
+
+
+def test_stream_students_see_their_whole_grade(client, catalogue, auth_headers):
+    registered = client.post('/api/register', json={
+        'phase': 2, 'username': 'alevel', 'email': 'alevel@example.com', 'password': 'secret', 'role': 'student',
+        'grade': 'Grade 12', 'stream': 'Science Stream', 'is_testing': True})
+    assert registered.status_code == 201
+    response = client.get('/api/student/lessons', headers=auth_headers(registered.json['user_id']))
+    assert titles(response) == ['Mechanics']
+
+
+def test_feed_caches_summaries_and_loads_other_fields_per_page(client, catalogue, make_user):
+    _, headers = make_user('s', 'student', grade='Grade 10')
+    for query in ('', '?view=full', '?fields=content,title', '?fields=title,content'):
+        client.get(f'/api/student/lessons{query}', headers=headers)
+    assert feed.feed_cache.stats()['size'] == 1
+    cached = feed.feed_cache.get(('lesson', collection_version('lesson')[0], 'Grade 10', None))
+    assert all('content' not in item for item in cached.items)
+
+    page = client.get('/api/student/lessons?fields=title,content&limit=2', headers=headers).json
+    assert page['lessons'] == [{'title': 'Spreadsheets', 'content': 'x'}, {'title': 'Drawing', 'content': 'x'}]
+    assert page['next_cursor']
+
+
+def test_feed_applies_listing_filters(client, catalogue, make_user):
+    teacher_id = make_user('o', 'teacher')[0].id
+    add_lesson(teacher_id, 'Geometry', 'Grade 10', 'Mathematics')
+    add_lesson(teacher_id, 'Essays', 'Grade 10', 'English')
+    add_lesson(teacher_id, 'Sets', 'Grade 10', 'Mathematics')
+    _, headers = make_user('s', 'student', grade='Grade 10')
+
+    seen, cursor = [], ''
+    while True:
+        page = client.get(f'/api/student/lessons?subject=Mathematics&limit=1&cursor={cursor}', headers=headers).json
+        seen += titles_of(page)
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert seen == ['Sets', 'Geometry', 'Algebra']
+    response = client.get(f'/api/student/lessons?teacher_id={teacher_id}&subject=English', headers=headers)
+    assert titles(response) == ['Essays']
+    # Only approved content is in the feed
+    assert titles(client.get('/api/student/lessons?status=pending', headers=headers)) == []
+
+
+def test_approving_a_lesson_refreshes_the_feed(client, catalogue, make_user):
+    _, headers = make_user('s', 'student', grade='Grade 10', subjects='ICT')
+    before = client.get('/api/student/lessons', headers=headers)
+    assert sorted(titles(before)) == ['Algebra', 'Poems', 'Spreadsheets']
+    assert client.get('/api/student/lessons', headers={**headers, 'If-None-Match': before.headers['ETag']}).status_code == 304
+
+    catalogue.status = 'approved'
+    db.session.commit()
+    after = client.get('/api/student/lessons', headers={**headers, 'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 200 and sorted(titles(after)) == ['Algebra', 'Poems', 'Spreadsheets', 'Vectors']
+
+
+def test_feed_pages_with_cursors(client, catalogue, make_user):
+    _, headers = make_user('s', 'student', grade='Grade 10')
+    seen = []
+    cursor = ''
+    while True:
+        page = client.get(f'/api/student/lessons?limit=2&cursor={cursor}', headers=headers).json
+        seen += [lesson['title'] for lesson in page['lessons']]
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert seen == ['Spreadsheets', 'Drawing', 'Poems', 'Algebra']
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from models import db, GenerationJob
+import ai_service
+import generation_jobs
+from utils.ratelimit import SharedTokenBucket
+
+
+@pytest.fixture
+def upstream(app, monkeypatch):
+    calls = []
+
+    def complete_content(topic):
+        calls.append(topic)
+        return f'Lesson on {topic}'
+
+    monkeypatch.setattr(ai_service, 'complete_content', complete_content)
+    monkeypatch.setattr(generation_jobs.rate_limiter, 'acquire', lambda: None)
+    # One worker: the in-memory test database is a single shared connection
+    monkeypatch.setattr(generation_jobs.config, 'AI_GENERATION_CONCURRENCY', 1)
+    monkeypatch.setattr(generation_jobs, '_executor', None)
+    yield calls
+    if generation_jobs._executor is not None:
+        generation_jobs._executor.shutdown(wait=True)
+
+
+def test_rate_limit_budget_is_shared_between_processes(tmp_path):
+    # Two buckets on one path stand in for two worker processes
+    path = str(tmp_path / 'ai_rate_limit')
+    first, second = (SharedTokenBucket(path, rate=0.001, capacity=3) for _ in range(2))
+    assert [first.try_acquire(), second.try_acquire(), first.try_acquire()] == [True, True, True]
+    assert not second.try_acquire() and not first.try_acquire()
+
+
+def test_each_submitted_job_runs_once(app, upstream, make_user):
+    jobs = generation_jobs.submit_jobs(app, make_user('t', 'teacher')[0].id, ['Fractions', 'Cells'])
+    job_ids = [job.id for job in jobs]
+    generation_jobs._executor.shutdown(wait=True)
+    # A duplicate delivery finds the job already claimed
+    generation_jobs.run_job(app, job_ids[0])
+
+    assert sorted(upstream) == ['Cells', 'Fractions']
+    db.session.expire_all()
+    assert [db.session.get(GenerationJob, job_id).status for job_id in job_ids] == ['succeeded', 'succeeded']
+
+
+def test_unfinished_jobs_resume_after_a_restart(app, upstream, make_user):
+    teacher_id = make_user('t', 'teacher')[0].id
+    now = datetime.now(timezone.utc)
+    db.session.add_all([
+        GenerationJob(teacher_id=teacher_id, topic='Queued'),
+        GenerationJob(teacher_id=teacher_id, topic='Abandoned', status='running', attempts=1,
+                      started_date=now - timedelta(seconds=generation_jobs.JOB_TIMEOUT + 60)),
+        GenerationJob(teacher_id=teacher_id, topic='Live', status='running', started_date=now),
+        GenerationJob(teacher_id=teacher_id, topic='Done', status='succeeded'),
+    ])
+    db.session.commit()
+
+    futures = generation_jobs.resume_unfinished(app)
+    for future in futures:
+        future.result()
+    assert sorted(upstream) == ['Abandoned', 'Queued']
+    db.session.expire_all()
+    statuses = {job.topic: (job.status, job.attempts) for job in GenerationJob.query}
+    assert statuses == {'Queued': ('succeeded', 1), 'Abandoned': ('succeeded', 2),
+                        'Live': ('running', 0), 'Done': ('succeeded', 0)}
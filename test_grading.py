@@ -0,0 +1,95 @@
+import json
+import pytest
+from sqlalchemy import event
+from models import db, Quiz, QuizAttempt, QuizResult, TeacherRollup
+import grading
+
+QUESTIONS = [
+    {'question': '2 + 2?', 'options': ['3', '4'], 'correct_answer': '4'},
+    {'question': 'Capital of France?', 'options': ['Paris', 'Rome'], 'correct_answer': 'Paris', 'points': 2},
+    {'question': 'Primes?', 'options': ['2', '3', '4'], 'correct_answer': ['2', '3']},
+    {'question': 'Describe a cell'},
+]
+
+
+@pytest.fixture
+def quiz(make_user):
+    teacher, _ = make_user('t', 'teacher')
+    quiz = Quiz(title='Quiz', subject='Math', grade='Grade 6', teacher_id=teacher.id)
+    quiz.set_questions(QUESTIONS)
+    db.session.add(quiz)
+    db.session.commit()
+    return quiz
+
+
+def test_score_answers_handles_positions_labels_and_multi_select(quiz):
+    keys, points = grading.answer_key(quiz)
+    scores, correct = grading.score_answers(keys, points, [
+        ['4', ' paris ', ['3', '2'], 'anything'],
+        {'q1': '4', 'q2': 'Rome'},
+        {'1': 'Paris'},
+        None,
+    ])
+    assert scores.tolist() == [1.0, 0.25, 0.5, 0.0]
+    assert correct.tolist() == [3, 1, 1, 0]
+
+
+def test_submit_quiz_scores_and_records_attempt(client, quiz, make_user):
+    _, headers = make_user('s', 'student')
+
+    response = client.post(f'/api/student/quizzes/{quiz.id}/submit', json={'answers': ['4', 'Rome', ['2', '3']]},
+                           headers=headers)
+
+    assert response.status_code == 200
+    assert response.json['result']['score'] == 50.0
+    assert response.json['result']['correct_count'] == 2
+    attempt = QuizAttempt.query.one()
+    assert attempt.score == 0.5 and attempt.completed
+    assert QuizResult.query.one().attempt_id == attempt.id
+
+
+def test_regrade_rescores_results_and_keeps_rollup_in_step(quiz, make_user):
+    student, _ = make_user('s', 'student')
+    db.session.add_all([
+        QuizResult(quiz_id=quiz.id, student_id=student.id, answers=json.dumps(['4', 'Rome', ['2', '3']])),
+        QuizResult(quiz_id=quiz.id, student_id=student.id, answers=json.dumps(['4', 'Paris', []])),
+    ])
+    db.session.commit()
+
+    assert grading.regrade_quiz(quiz.id, batch_size=1) == 2
+    assert sorted(r.score for r in QuizResult.query) == [0.5, 0.75]
+
+    quiz.set_questions([dict(q, correct_answer='Rome') if i == 1 else q for i, q in enumerate(QUESTIONS)])
+    db.session.commit()
+    assert grading.regrade_quiz(quiz.id) == 2
+
+    assert sorted(r.score for r in QuizResult.query) == [0.25, 1.0]
+    assert QuizAttempt.query.count() == 2
+    rollup = TeacherRollup.query.one()
+    assert rollup.attempt_count == 2
+    assert rollup.score_sum == 1.25
+
+
+def test_regrade_statements_scale_with_batches_not_results(quiz, make_user):
+    student, _ = make_user('s', 'student')
+    answers = json.dumps(['4', 'Paris', ['2', '3']])
+    db.session.execute(QuizResult.__table__.insert(), [
+        {'quiz_id': quiz.id, 'student_id': student.id, 'answers': answers} for _ in range(2000)
+    ])
+    db.session.commit()
+    # The first pass creates the missing attempts. SQLite has no insertmanyvalues sentinel,
+    # so those RETURNING inserts go one row at a time here (Postgres batches them)
+    assert grading.regrade_quiz(quiz.id, batch_size=500) == 2000
+
+    quiz.set_questions([dict(q, correct_answer='Rome') if i == 1 else q for i, q in enumerate(QUESTIONS)])
+    db.session.commit()
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        assert grading.regrade_quiz(quiz.id, batch_size=500) == 2000
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    # A handful of statements per batch of 500, not per result
+    assert len(statements) <= 6 * 4
+    assert db.session.query(db.func.min(QuizResult.score), db.func.max(QuizResult.score)).one() == (0.5, 0.5)
@@ -0,0 +1,88 @@
+import threading
+import time
+import pytest
+from werkzeug.security import generate_password_hash
+from models import db, User
+from utils import hashing
+from utils.hashing import HashingOverloaded
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # Cheap parameters keep the tests fast; the pool itself is the real one
+    monkeypatch.setattr(hashing, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    monkeypatch.setattr(hashing, 'HASH_POOL_WORKERS', 1)
+    monkeypatch.setattr(hashing, '_executor', None)
+    yield
+    hashing.shutdown()
+
+
+def test_hashes_are_computed_in_the_process_pool(pool):
+    pwhash = hashing.hash_password('secret')
+    assert isinstance(hashing._executor, hashing.ProcessPoolExecutor)
+    assert pwhash.startswith('pbkdf2:sha256:1000$')
+    assert hashing.verify_password(pwhash, 'secret')
+    assert not hashing.verify_password(pwhash, 'wrong')
+
+
+def test_full_queue_and_timeouts_raise_overloaded(pool, monkeypatch):
+    monkeypatch.setattr(hashing, '_slots', threading.BoundedSemaphore(1))
+    hashing._slots.acquire()
+    with pytest.raises(HashingOverloaded):
+        hashing.hash_password('secret')
+    hashing._slots.release()
+
+    monkeypatch.setattr(hashing, 'HASH_TIMEOUT', 0.05)
+    with pytest.raises(HashingOverloaded):
+        hashing._run(time.sleep, 0.5)
+    # The slot is held until the worker finishes, not just until the caller gives up
+    assert not hashing._slots.acquire(blocking=False)
+    hashing._executor.shutdown(wait=True)
+    assert hashing._slots.acquire(blocking=False)
+
+
+def test_login_returns_503_when_hashing_is_overloaded(client, pool, monkeypatch):
+    db.session.add(User(username='s', email='s@example.com', password=generate_password_hash('secret'),
+                        role='student', is_confirmed=True))
+    db.session.commit()
+    monkeypatch.setattr(hashing, '_slots', threading.BoundedSemaphore(1))
+    hashing._slots.acquire()
+    response = client.post('/api/login', json={'email': 's@example.com', 'password': 'secret'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_needs_rehash_compares_hash_parameters(pool):
+    assert not hashing.needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:1000'))
+    assert hashing.needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:500'))
+    assert hashing.needs_rehash(generate_password_hash('secret', 'scrypt'))
+
+
+@pytest.mark.parametrize('method', ['scrypt', 'pbkdf2'])
+def test_needs_rehash_understands_shorthand_methods(monkeypatch, method):
+    monkeypatch.setattr(hashing, 'PASSWORD_HASH_METHOD', method)
+    assert not hashing.needs_rehash(generate_password_hash('secret', method))
+    assert hashing.needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:500'))
+
+
+def test_login_does_not_rewrite_a_current_shorthand_hash(client, pool, monkeypatch):
+    monkeypatch.setattr(hashing, 'PASSWORD_HASH_METHOD', 'scrypt')
+    stored = generate_password_hash('secret', 'scrypt')
+    db.session.add(User(username='s', email='s@example.com', password=stored, role='student', is_confirmed=True))
+    db.session.commit()
+    assert client.post('/api/login', json={'email': 's@example.com', 'password': 'secret'}).status_code == 200
+    assert db.session.scalar(db.select(User.password).filter_by(email='s@example.com')) == stored
+
+
+def test_login_upgrades_outdated_hashes(client, pool):
+    db.session.add(User(username='s', email='s@example.com', password=generate_password_hash('secret', 'pbkdf2:sha256:500'),
+                        role='student', is_confirmed=True))
+    db.session.commit()
+    login = {'email': 's@example.com', 'password': 'secret'}
+    assert client.post('/api/login', json=login).status_code == 200
+    upgraded = db.session.scalar(db.select(User.password).filter_by(email='s@example.com'))
+    assert upgraded.startswith('pbkdf2:sha256:1000$') and not hashing.needs_rehash(upgraded)
+
+    # A current hash is left alone
+    assert client.post('/api/login', json=login).status_code == 200
+    assert db.session.scalar(db.select(User.password).filter_by(email='s@example.com')) == upgraded
@@ -0,0 +1,60 @@
+from sqlalchemy import event
+from models import db
+
+
+def query_plans(client, url, headers=None):
+    """Call an endpoint and return the EXPLAIN QUERY PLAN of every SELECT it sent."""
+    statements = []
+    listener = lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters))
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        assert client.get(url, headers=headers).status_code == 200
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    connection = db.session.connection()
+    return [[row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+            for statement, parameters in statements if statement.startswith('SELECT')]
+
+
+def assert_uses_indexes(plans, *indexes):
+    steps = [step for plan in plans for step in plan]
+    assert any('USING' in step and 'INDEX' in step for step in steps), steps
+    for index in indexes:
+        assert any(index in step.split() for step in steps), (index, steps)
+    full_scans = [step for step in steps if step.startswith('SCAN') and 'INDEX' not in step]
+    assert not full_scans, steps
+
+
+def test_lesson_listings_use_indexes(client, make_user):
+    teacher, _ = make_user('t', 'teacher')
+    assert_uses_indexes(query_plans(client, f'/api/lessons?teacher_id={teacher.id}&status=approved'),
+                        'ix_lesson_teacher_id_status')
+    assert_uses_indexes(query_plans(client, '/api/lessons?grade=Grade 6&subject=Mathematics'),
+                        'ix_lesson_grade_subject')
+    assert_uses_indexes(query_plans(client, '/api/lessons'), 'ix_lesson_uploaded_date_id')
+
+
+def test_quiz_listings_use_indexes(client, make_user):
+    teacher, _ = make_user('t', 'teacher')
+    assert_uses_indexes(query_plans(client, f'/api/quizzes?teacher_id={teacher.id}&status=approved'),
+                        'ix_quiz_teacher_id_status')
+    assert_uses_indexes(query_plans(client, '/api/quizzes?grade=Grade 6&subject=Mathematics'),
+                        'ix_quiz_grade_subject')
+    assert_uses_indexes(query_plans(client, '/api/quizzes'), 'ix_quiz_uploaded_date_id')
+
+
+def test_teacher_reports_use_indexes(client, make_user):
+    _, headers = make_user('t', 'teacher')
+    assert_uses_indexes(query_plans(client, '/api/teacher/classes', headers),
+                        'ix_user_role_grade', 'ix_lesson_teacher_id_status')
+    assert_uses_indexes(query_plans(client, '/api/teacher/progress', headers),
+                        'ix_lesson_progress_lesson_id_user_id', 'ix_quiz_attempt_quiz_id_completed')
+    assert_uses_indexes(query_plans(client, '/api/teacher/grading', headers), 'ix_quiz_attempt_quiz_id_completed')
+
+
+def test_student_progress_and_results_use_indexes(client, make_user):
+    student, headers = make_user('s', 'student', grade='Grade 6')
+    # Served by the unique (user_id, lesson_id) constraint
+    assert_uses_indexes(query_plans(client, f'/api/progress?user_id={student.id}', headers))
+    assert_uses_indexes(query_plans(client, '/api/student/quizzes/attempts', headers),
+                        'ix_quiz_result_student_id_submitted_date')
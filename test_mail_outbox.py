@@ -0,0 +1,83 @@
+import socket
+import pytest
+from models import db, EmailOutbox
+import mail_outbox
+from mail_outbox import enqueue_email, deliver_pending
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.envelopes = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        return '250 OK'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(app):
+    # Only the delivery test needs a real SMTP server; the backoff test runs without aiosmtpd
+    aiosmtpd_controller = pytest.importorskip('aiosmtpd.controller')
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname='127.0.0.1', port=free_port())
+    controller.start()
+    mail = app.extensions['mail']
+    saved = (mail.server, mail.port, mail.use_tls, mail.use_ssl, mail.username, mail.suppress)
+    mail.server, mail.port = '127.0.0.1', controller.port
+    mail.use_tls = mail.use_ssl = mail.suppress = False
+    mail.username = None
+    yield handler
+    mail.server, mail.port, mail.use_tls, mail.use_ssl, mail.username, mail.suppress = saved
+    controller.stop()
+
+
+def test_pending_messages_are_delivered_in_one_batch(app, smtp_server):
+    for i in range(3):
+        enqueue_email(f'student{i}@example.com', 'Welcome', 'Hello')
+    db.session.commit()
+
+    assert deliver_pending() == 3
+    assert sorted(envelope.rcpt_tos[0] for envelope in smtp_server.envelopes) == [
+        'student0@example.com', 'student1@example.com', 'student2@example.com']
+    assert {message.status for message in EmailOutbox.query} == {'sent'}
+    assert deliver_pending() == 0
+
+
+def test_worker_is_woken_only_after_the_commit(app):
+    mail_outbox._wakeup.clear()
+    enqueue_email('student@example.com', 'Welcome', 'Hello')
+    assert not mail_outbox._wakeup.is_set()
+    db.session.commit()
+    assert mail_outbox._wakeup.is_set()
+
+    mail_outbox._wakeup.clear()
+    enqueue_email('student@example.com', 'Welcome', 'Hello')
+    db.session.rollback()
+    db.session.commit()
+    assert not mail_outbox._wakeup.is_set()
+
+
+def test_failed_delivery_is_retried_with_backoff(app):
+    mail = app.extensions['mail']
+    saved = (mail.server, mail.port, mail.suppress)
+    mail.server, mail.port, mail.suppress = '127.0.0.1', 1, False
+    try:
+        enqueue_email('student@example.com', 'Welcome', 'Hello')
+        db.session.commit()
+        assert deliver_pending() == 0
+    finally:
+        mail.server, mail.port, mail.suppress = saved
+
+    message = EmailOutbox.query.one()
+    assert message.status == 'pending'
+    assert message.attempts == 1
+    assert message.last_error
+    # Not due again until the backoff delay has passed
+    assert deliver_pending() == 0
+    assert EmailOutbox.query.one().attempts == 1
@@ -0,0 +1,64 @@
+import os
+import tracemalloc
+import pytest
+
+
+@pytest.fixture
+def media(app, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    (tmp_path / 'videos').mkdir()
+    yield tmp_path
+    app.config['UPLOAD_FOLDER'] = 'uploads'
+    app.config['MEDIA_OFFLOAD'] = None
+
+
+def test_range_requests(client, media):
+    body = os.urandom(10_000)
+    (media / 'videos' / 'clip.mp4').write_bytes(body)
+
+    full = client.get('/uploads/videos/clip.mp4')
+    assert full.status_code == 200 and full.data == body
+    assert full.headers['Accept-Ranges'] == 'bytes' and full.headers['Content-Type'] == 'video/mp4'
+
+    part = client.get('/uploads/videos/clip.mp4', headers={'Range': 'bytes=1000-1999'})
+    assert part.status_code == 206 and part.data == body[1000:2000]
+    assert part.headers['Content-Range'] == 'bytes 1000-1999/10000'
+    assert client.get('/uploads/videos/clip.mp4', headers={'Range': 'bytes=-500'}).data == body[-500:]
+
+    # If-Range with the current validator keeps the range, a stale one gets the whole file
+    etag = full.headers['ETag'].strip('"')
+    assert client.get('/uploads/videos/clip.mp4', headers={'Range': 'bytes=0-9', 'If-Range': f'"{etag}"'}).status_code == 206
+    stale = client.get('/uploads/videos/clip.mp4', headers={'Range': 'bytes=0-9', 'If-Range': '"old"'})
+    assert stale.status_code == 200 and stale.data == body
+
+    unsatisfiable = client.get('/uploads/videos/clip.mp4', headers={'Range': 'bytes=20000-'})
+    assert unsatisfiable.status_code == 416 and unsatisfiable.headers['Content-Range'] == 'bytes */10000'
+    assert client.get('/uploads/videos/clip.mp4', headers={'If-None-Match': full.headers['ETag']}).status_code == 304
+    assert client.get('/uploads/../conftest.py').status_code == 404
+
+
+def test_offload_to_proxy(app, client, media):
+    (media / 'videos' / 'clip.mp4').write_bytes(b'x' * 100)
+    app.config['MEDIA_OFFLOAD'] = 'x-accel-redirect'
+    response = client.get('/uploads/videos/clip.mp4')
+    assert response.headers['X-Accel-Redirect'] == '/protected-uploads/videos/clip.mp4' and response.data == b''
+
+    app.config['MEDIA_OFFLOAD'] = 'x-sendfile'
+    assert client.get('/uploads/videos/clip.mp4').headers['X-Sendfile'] == str(media / 'videos' / 'clip.mp4')
+
+
+def test_streaming_a_multi_gb_file_keeps_memory_flat(client, media):
+    size = 3 * 1024 ** 3
+    with open(media / 'videos' / 'lecture.mp4', 'wb') as f:
+        f.truncate(size)  # sparse, so the test costs no disk space
+
+    tracemalloc.start()
+    try:
+        response = client.get('/uploads/videos/lecture.mp4', headers={'Range': 'bytes=1024-'}, buffered=False)
+        sent = sum(len(chunk) for chunk in response.response)
+        response.close()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert response.status_code == 206 and sent == size - 1024
+    assert peak < 4 * 1024 * 1024
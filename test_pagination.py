@@ -0,0 +1,67 @@
+from datetime import datetime
+import pytest
+from werkzeug.datastructures import MultiDict
+from models import db, Lesson, Quiz
+from utils.pagination import (encode_cursor, decode_cursor, get_page_size, InvalidCursor,
+                              DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    uploaded_date = datetime(2025, 3, 1, 12, 30, 15, 250)
+    assert decode_cursor(encode_cursor(uploaded_date, 42)) == (uploaded_date, 42)
+    for cursor in ('not-base64!', encode_cursor(uploaded_date, 1)[:-4], 'bm8tc2VwYXJhdG9y'):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor)
+
+
+def test_page_size_is_clamped():
+    assert get_page_size(MultiDict()) == DEFAULT_PAGE_SIZE
+    assert get_page_size(MultiDict({'limit': '0'})) == 1
+    assert get_page_size(MultiDict({'limit': '100000'})) == MAX_PAGE_SIZE
+    assert get_page_size(MultiDict({'limit': 'many'})) == DEFAULT_PAGE_SIZE
+
+
+def test_listing_pages_through_ties_and_filters(client, make_user):
+    teacher, _ = make_user('t', 'teacher')
+    other, _ = make_user('o', 'teacher')
+    same_time = datetime(2025, 1, 1)
+    # Identical upload times are ordered by id, so paging neither skips nor repeats rows
+    db.session.add_all([Lesson(title=f'L{n}', subject='Math', grade='Grade 6' if n % 2 else 'Grade 7', content='x',
+                               teacher_id=teacher.id if n < 4 else other.id,
+                               status='pending' if n in (1, 4) else 'approved', uploaded_date=same_time)
+                        for n in range(5)])
+    db.session.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = client.get('/api/lessons', query_string={'limit': 2, **({'cursor': cursor} if cursor else {})}).json
+        assert len(page['lessons']) <= 2
+        seen += [lesson['title'] for lesson in page['lessons']]
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert seen == ['L4', 'L3', 'L2', 'L1', 'L0']
+
+    def titles(**filters):
+        return [lesson['title'] for lesson in client.get('/api/lessons', query_string=filters).json['lessons']]
+
+    assert titles(status='pending') == ['L4', 'L1']
+    assert titles(status='pending', teacher_id=teacher.id) == ['L1']
+    assert titles(grade='Grade 7') == ['L4', 'L2', 'L0']
+    assert client.get('/api/lessons?cursor=garbage').status_code == 400
+
+
+def test_admin_totals_come_from_rollups(client, make_user):
+    teacher, _ = make_user('t', 'teacher')
+    _, admin = make_user('a', 'admin')
+    db.session.add_all([Lesson(title=f'L{n}', subject='Math', grade='Grade 6', content='x', teacher_id=teacher.id,
+                               status='approved' if n < 3 else 'pending') for n in range(60)])
+    quiz = Quiz(title='Q', subject='Math', grade='Grade 7', teacher_id=teacher.id, status='pending')
+    quiz.set_questions([{'question': '1 + 1?', 'correct_answer': '2'}])
+    db.session.add(quiz)
+    db.session.commit()
+
+    stats = client.get('/api/content_stats', headers=admin).json
+    assert stats == {'users': 2, 'lessons': 60, 'approved_lessons': 3, 'quizzes': 1, 'approved_quizzes': 0}
+    _, student = make_user('s', 'student')
+    assert client.get('/api/content_stats', headers=student).status_code == 403
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import event
+from models import db, Lesson, Progress
+import progress_writer
+
+
+@pytest.fixture
+def student(make_user):
+    user, headers = make_user('s', 'student')
+    return user.id, headers
+
+
+@pytest.fixture
+def statements(app):
+    seen = []
+    listener = lambda conn, cursor, statement, *args: seen.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    yield seen
+    event.remove(db.engine, 'before_cursor_execute', listener)
+
+
+def test_update_progress_upserts_in_one_statement(client, student, statements):
+    user_id, headers = student
+    client.post('/api/progress', json={'lesson_id': 1, 'progress': 10}, headers=headers)
+    statements.clear()
+    client.post('/api/progress', json={'lesson_id': 1, 'progress': 40}, headers=headers)
+    client.post('/api/progress', json={'lesson_id': 1}, headers=headers)
+
+    writes = [s for s in statements if s.startswith('INSERT')]
+    assert len(writes) == 2 and all('ON CONFLICT' in s for s in writes)
+    assert not any(s.startswith('SELECT') and 'FROM progress' in s for s in statements)
+    assert [(p.lesson_id, p.progress) for p in Progress.query.filter_by(user_id=user_id)] == [(1, 40.0)]
+
+
+def test_stale_rows_do_not_overwrite_newer_progress(app, student):
+    user_id, _ = student
+    now = datetime.now(timezone.utc)
+    progress_writer.upsert_progress([{'user_id': user_id, 'lesson_id': 1, 'progress': 80.0, 'last_updated': now}])
+    progress_writer.upsert_progress([{'user_id': user_id, 'lesson_id': 1, 'progress': 20.0,
+                                      'last_updated': now - timedelta(seconds=5)}])
+    db.session.commit()
+    assert Progress.query.one().progress == 80.0
+
+
+def test_coalescing_buffer_keeps_latest_value_per_lesson(client, student, statements, monkeypatch):
+    user_id, headers = student
+    monkeypatch.setitem(client.application.config, 'PROGRESS_COALESCE', True)
+    monkeypatch.setattr(progress_writer, 'buffer', progress_writer.ProgressBuffer())
+    monkeypatch.setattr(progress_writer, '_worker', object())
+
+    for percent in range(0, 101, 5):
+        client.post('/api/progress', json={'lesson_id': 1, 'progress': percent}, headers=headers)
+    client.post('/api/progress', json={'lesson_id': 2, 'progress': 30}, headers=headers)
+    client.post('/api/progress', json={'lesson_id': 2}, headers=headers)
+
+    assert not [s for s in statements if s.startswith('INSERT')]
+    listed = client.get(f'/api/progress?user_id={user_id}', headers=headers).json
+    assert sorted((p['lesson_id'], p['progress']) for p in listed) == [(1, 100), (2, 30)]
+
+    assert progress_writer.flush_buffer() == 2
+    assert len([s for s in statements if s.startswith('INSERT')]) == 1
+    assert sorted((p.lesson_id, p.progress) for p in Progress.query) == [(1, 100.0), (2, 30.0)]
+
+
+def make_lessons(count):
+    lessons = [Lesson(title=f'Lesson {n}', content='...', subject='Math', grade='Grade 6', teacher_id=1) for n in range(count)]
+    db.session.add_all(lessons)
+    db.session.commit()
+    return [lesson.id for lesson in lessons]
+
+
+def test_batch_sync_applies_items_in_one_commit(client, student, statements):
+    user_id, headers = student
+    lesson_ids = make_lessons(50)
+    statements.clear()
+    commits = []
+    on_commit = commits.append
+    event.listen(db.engine, 'commit', on_commit)
+    try:
+        items = [{'lesson_id': lesson_id, 'progress': 100, 'time_spent': 12, 'completed': True} for lesson_id in lesson_ids]
+        response = client.post('/api/progress/batch', json={'items': items}, headers=headers)
+    finally:
+        event.remove(db.engine, 'commit', on_commit)
+
+    assert response.status_code == 200
+    assert response.json['applied'] == 50 and response.json['failed'] == 0
+    assert len(commits) == 1
+    assert len([s for s in statements if s.startswith('INSERT')]) == 1
+    assert Progress.query.filter_by(user_id=user_id, completed=True, time_spent=12).count() == 50
+
+
+def test_batch_sync_reports_per_item_errors(client, student):
+    user_id, headers = student
+    first, second = make_lessons(2)
+    client.post('/api/progress', json={'lesson_id': second, 'progress': 10, 'time_spent': 3}, headers=headers)
+
+    response = client.post('/api/progress/batch', json={'items': [
+        {'lesson_id': first, 'progress': 150},
+        {'lesson_id': 9999, 'progress': 10},
+        {'lesson_id': second, 'completed': 'yes'},
+        {'lesson_id': second, 'progress': 60},
+        {'lesson_id': second, 'completed': True},
+    ]}, headers=headers)
+
+    assert [(r['status'], r.get('error')) for r in response.json['results']] == [
+        ('error', 'progress must be a number between 0 and 100'),
+        ('error', 'Lesson not found'),
+        ('error', 'completed must be a boolean'),
+        ('ok', None),
+        ('ok', None),
+    ]
+    record = Progress.query.filter_by(user_id=user_id).one()
+    assert (record.lesson_id, record.progress, record.time_spent, record.completed) == (second, 60.0, 3, True)
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import event
+from werkzeug.datastructures import MultiDict
+from models import db, Lesson, Quiz
+from utils.projection import parse_fields, InvalidFields, SUMMARY
+
+
+def add_quizzes(teacher_id, numbers):
+    for n in numbers:
+        quiz = Quiz(title=f'Q{n}', subject='Math', grade='Grade 6', teacher_id=teacher_id, status='approved')
+        quiz.set_questions([{'question': f'{n} + 1?', 'correct_answer': str(n + 1)}])
+        db.session.add(quiz)
+    db.session.commit()
+
+
+def statements_for(client, url):
+    db.session.expunge_all()
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        assert client.get(url).status_code == 200
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return statements
+
+
+def test_parse_fields_resolves_views_and_rejects_bad_input():
+    assert parse_fields(MultiDict(), Lesson, default_view=SUMMARY) == list(Lesson.SUMMARY_FIELDS)
+    assert parse_fields(MultiDict(), Lesson) == list(Lesson.FIELDS)
+    assert parse_fields(MultiDict({'view': 'summary'}), Quiz) == list(Quiz.SUMMARY_FIELDS)
+    assert parse_fields(MultiDict({'fields': ' title, grade '}), Lesson) == ['title', 'grade']
+    for args in ({'fields': ','}, {'fields': 'title,secret'}, {'view': 'everything'}):
+        with pytest.raises(InvalidFields):
+            parse_fields(MultiDict(args), Lesson)
+
+
+def test_listings_default_to_the_summary_view(client, make_user):
+    add_quizzes(make_user('t', 'teacher')[0].id, [0])
+    assert set(client.get('/api/quizzes').json['quizzes'][0]) == set(Quiz.SUMMARY_FIELDS)
+    quiz_id = Quiz.query.first().id
+    assert set(client.get(f'/api/quizzes/{quiz_id}').json) == set(Quiz.FIELDS)
+    assert client.get('/api/quizzes?fields=title,secret').json['error'] == 'Unknown fields: secret'
+    assert client.get('/api/quizzes?fields=,').status_code == 400
+
+
+@pytest.mark.parametrize('query', ['', '?view=full', '?fields=title,questions'])
+def test_listing_queries_do_not_grow_with_the_page(client, make_user, query):
+    teacher_id = make_user('t', 'teacher')[0].id
+    add_quizzes(teacher_id, [0])
+    one = statements_for(client, f'/api/quizzes{query}')
+    add_quizzes(teacher_id, range(1, 5))
+    assert len(statements_for(client, f'/api/quizzes{query}')) == len(one)
@@ -0,0 +1,45 @@
+from models import db, Quiz, QuizQuestion
+
+
+def stored_questions(quiz_id):
+    return [(row.position, row.question) for row in
+            QuizQuestion.query.filter_by(quiz_id=quiz_id).order_by(QuizQuestion.position)]
+
+
+def test_set_questions_replaces_rows_and_keeps_the_count(make_user):
+    teacher, _ = make_user('t', 'teacher')
+    quiz = Quiz(title='Q', subject='Math', grade='Grade 6', teacher_id=teacher.id)
+    quiz.set_questions([{'question': 'a', 'options': ['1', '2'], 'correct_answer': '1', 'points': 2}, 'b'])
+    db.session.add(quiz)
+    db.session.commit()
+    assert stored_questions(quiz.id) == [(0, 'a'), (1, 'b')] and quiz.question_count == 2
+    assert quiz.to_dict(['questions'])['questions'] == [
+        {'question': 'a', 'options': ['1', '2'], 'correct_answer': '1', 'points': 2}, {'question': 'b'}]
+
+    quiz.set_questions(['c', 'd', 'e'])
+    db.session.commit()
+    assert stored_questions(quiz.id) == [(0, 'c'), (1, 'd'), (2, 'e')] and quiz.question_count == 3
+
+    # Rows past the new end are deleted rather than left behind
+    version = quiz.version
+    quiz.set_questions(['f'])
+    db.session.commit()
+    assert stored_questions(quiz.id) == [(0, 'f')] and quiz.question_count == 1
+    assert QuizQuestion.query.count() == 1 and quiz.version == version + 1
+
+    quiz.set_questions([])
+    db.session.commit()
+    assert stored_questions(quiz.id) == [] and quiz.question_count == 0
+
+
+def test_quiz_api_keeps_questions_and_count_in_sync(client, make_user):
+    _, headers = make_user('t', 'teacher')
+    created = client.post('/api/quizzes', headers=headers, json={
+        'title': 'Q', 'subject': 'Math', 'grade': 'Grade 6', 'questions': ['a', 'b']}).json
+    assert created['question_count'] == 2
+
+    updated = client.put(f"/api/quizzes/{created['id']}", headers=headers, json={'questions': ['c']}).json
+    assert updated['question_count'] == 1 and updated['questions'] == [{'question': 'c'}]
+    assert stored_questions(created['id']) == [(0, 'c')]
+    summary = client.get('/api/quizzes').json['quizzes'][0]
+    assert summary['question_count'] == 1
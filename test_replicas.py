@@ -0,0 +1,106 @@
+import sqlite3
+import pytest
+from flask import Flask
+from sqlalchemy import event
+from auth import auth_bp, user_cache
+from config import get_config
+from lessons import lessons_bp
+from models import db, User, Lesson
+import db_engine
+import replicas
+
+
+def make_app(tmp_path, replica_urls):
+    """An app on a primary SQLite file with the given replica binds."""
+    app = Flask(__name__)
+    app.config.from_object(get_config())
+    app.config.update(SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "primary.db"}',
+                      SQLALCHEMY_BINDS={f'replica_{n}': url for n, url in enumerate(replica_urls)})
+    db_engine.init_app(app, db)
+    replicas.init_app(app, db)
+    app.register_blueprint(auth_bp, url_prefix='/api')
+    app.register_blueprint(lessons_bp)
+    return app
+
+
+def replicate(tmp_path, name='replica.db'):
+    """Copy the primary into a replica file, standing in for replication."""
+    source = sqlite3.connect(tmp_path / 'primary.db')
+    target = sqlite3.connect(tmp_path / name)
+    source.backup(target)
+    source.close()
+    target.close()
+
+
+def served_by(app, bind):
+    statements = []
+    with app.app_context():
+        event.listen(db.engines[bind], 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+
+@pytest.fixture
+def cluster(tmp_path, auth_headers):
+    app = make_app(tmp_path, [f'sqlite:///{tmp_path / "replica.db"}'])
+    with app.app_context():
+        db.create_all()
+        teacher = User(username='t', email='t@example.com', password='x', role='teacher', is_confirmed=True)
+        db.session.add(teacher)
+        db.session.commit()
+        db.session.add(Lesson(title='Replicated', subject='Math', grade='Grade 6', content='x', teacher_id=teacher.id))
+        db.session.commit()
+        headers = auth_headers(teacher.id)
+    replicate(tmp_path)
+    with app.app_context():
+        # Written after the copy, so only the primary has it until the replica catches up
+        db.session.add(Lesson(title='Lagging', subject='Math', grade='Grade 6', content='x', teacher_id=teacher.id))
+        db.session.commit()
+    yield app, headers
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    user_cache.clear()
+
+
+def titles(response):
+    return sorted(lesson['title'] for lesson in response.json['lessons'])
+
+
+def test_reads_go_to_the_replica(cluster):
+    app, headers = cluster
+    replica_statements = served_by(app, 'replica_0')
+    client = app.test_client()
+    assert titles(client.get('/api/lessons')) == ['Replicated']
+    assert client.get('/api/users', headers=headers).json['total'] == 1
+    assert replica_statements
+
+
+def test_own_writes_are_read_from_the_primary(cluster):
+    app, headers = cluster
+    browser, api_client = app.test_client(), app.test_client()
+    created = browser.post('/api/lessons', headers=headers,
+                           json={'title': 'Mine', 'subject': 'Math', 'grade': 'Grade 6', 'content': 'x'})
+    assert created.status_code == 201 and replicas.STICKY_COOKIE in created.headers['Set-Cookie']
+    assert titles(browser.get('/api/lessons')) == ['Lagging', 'Mine', 'Replicated']
+
+    # Without the cookie the writer is still recognised by their token
+    replica_statements = served_by(app, 'replica_0')
+    api_client.get('/api/users', headers=headers)
+    assert replica_statements == []
+    assert titles(api_client.get('/api/lessons')) == ['Replicated']
+
+
+def test_unavailable_replica_falls_back_to_primary(tmp_path):
+    app = make_app(tmp_path, [f'sqlite:///{tmp_path / "missing" / "replica.db"}'])
+    with app.app_context():
+        db.create_all()
+        db.session.add(Lesson(title='Primary', subject='Math', grade='Grade 6', content='x', teacher_id=1))
+        db.session.commit()
+    client = app.test_client()
+    assert titles(client.get('/api/lessons')) == ['Primary']
+    assert app.extensions['replicas'].stats() == {'replica_0': {'healthy': False}}
+    # The failed replica is skipped until the retry interval passes
+    assert titles(client.get('/api/lessons')) == ['Primary']
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
@@ -0,0 +1,58 @@
+import pytest
+from models import db, Lesson
+import search
+
+
+@pytest.fixture
+def teacher(make_user):
+    user, headers = make_user('t', 'teacher')
+    return user.id, headers
+
+
+def create_lesson(client, headers, title, content, grade='Grade 8', subject='Biology'):
+    return client.post('/api/lessons', json={'title': title, 'content': content, 'grade': grade,
+                                             'subject': subject}, headers=headers).json['id']
+
+
+def test_search_ranks_highlights_and_facets(client, teacher):
+    _, headers = teacher
+    cells = create_lesson(client, headers, 'Photosynthesis', 'Plants turn <light> into sugar in the chloroplast.')
+    create_lesson(client, headers, 'Cell structure', 'The chloroplast is where photosynthesis happens.')
+    create_lesson(client, headers, 'Fractions', 'Adding fractions with unlike denominators.', 'Grade 6', 'Math')
+
+    found = client.get('/api/search?q=photosynth').json['lessons']
+    assert found['total'] == 2
+    # The title match outranks a body mention
+    assert found['results'][0]['id'] == cells
+    assert found['results'][0]['title_highlight'] == '<mark>Photosynthesis</mark>'
+    assert '&lt;light&gt;' in found['results'][0]['snippet']
+    assert found['facets'] == {'grade': {'Grade 8': 2}, 'subject': {'Biology': 2}}
+
+    filtered = client.get('/api/search?q=fractions&grade=Grade 8').json['lessons']
+    assert filtered['total'] == 0 and filtered['facets']['grade'] == {'Grade 6': 1}
+    assert client.get('/api/search?q=").(*').status_code == 400
+
+
+def test_index_follows_lesson_and_quiz_changes(client, teacher):
+    _, headers = teacher
+    lesson_id = create_lesson(client, headers, 'Volcanoes', 'Magma and lava.', subject='Geography')
+    client.put(f'/api/lessons/{lesson_id}', json={'title': 'Earthquakes', 'content': 'Tectonic plates.'},
+               headers=headers)
+    assert client.get('/api/search?q=volcanoes').json['lessons']['total'] == 0
+    assert client.get('/api/search?q=tectonic').json['lessons']['results'][0]['title'] == 'Earthquakes'
+
+    client.delete(f'/api/lessons/{lesson_id}', headers=headers)
+    assert client.get('/api/search?q=tectonic').json['lessons']['total'] == 0
+
+    client.post('/api/quizzes', json={'title': 'Plate tectonics check', 'subject': 'Geography', 'grade': 'Grade 8',
+                                      'questions': [{'question': '?', 'correct_answer': 'a'}]}, headers=headers)
+    assert client.get('/api/search?q=tectonics&type=quizzes').json['quizzes']['total'] == 1
+
+
+def test_rebuild_picks_up_bulk_writes(app, teacher):
+    db.session.execute(db.insert(Lesson), [{'title': f'Bulk {i}', 'subject': 'Math', 'grade': 'Grade 7',
+                                            'content': 'algebra', 'teacher_id': teacher[0]} for i in range(3)])
+    db.session.commit()
+    assert search.rebuild_index()['lessons'] == 3
+    with app.test_request_context('/api/search?q=algebra'):
+        assert search.search().json['lessons']['total'] == 3
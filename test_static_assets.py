@@ -0,0 +1,45 @@
+import gzip
+import re
+
+
+def test_pages_are_precompressed_and_reference_fingerprinted_assets(client):
+    page = client.get('/student_dashboard.html', headers={'Accept-Encoding': 'gzip'})
+    assert page.headers['Content-Encoding'] == 'gzip'
+    assert page.headers['Cache-Control'] == 'no-cache'
+    assert 'Accept-Encoding' in page.headers['Vary']
+
+    html = gzip.decompress(page.data).decode('utf-8')
+    css_url = re.search(r'href="(/css/main\.[0-9a-f]{10}\.css)"', html).group(1)
+    css = client.get(css_url, headers={'Accept-Encoding': 'gzip'})
+    assert css.status_code == 200
+    assert css.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert gzip.decompress(css.data) == client.get('/css/main.css', headers={'Accept-Encoding': 'identity'}).data
+
+
+def test_identity_clients_and_revalidation(client):
+    plain = client.get('/pages/user_login.html', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert b'</html>' in plain.data
+
+    again = client.get('/pages/user_login.html', headers={'Accept-Encoding': 'identity',
+                                                         'If-None-Match': plain.headers['ETag']})
+    assert again.status_code == 304 and again.data == b''
+    # A gzip response has its own validator
+    assert client.get('/pages/user_login.html', headers={'Accept-Encoding': 'gzip',
+                                                        'If-None-Match': plain.headers['ETag']}).status_code == 200
+
+
+def test_large_files_are_served_from_disk(app, tmp_path):
+    import static_assets
+    root = tmp_path / 'assets'
+    root.mkdir()
+    (root / 'big.js').write_text('console.log("x");\n' * 20000)
+    store = static_assets.AssetStore({'/public': str(root)}, memory_max_size=1024, cache_dir=str(tmp_path / 'cache'))
+    store.build()
+    asset = store.assets['/public/big.js']
+    assert asset.body is None and (tmp_path / 'cache' / f'{asset.etag}.gzip').exists()
+
+    with app.test_request_context('/public/big.js', headers={'Accept-Encoding': 'gzip'}):
+        response = store.serve('/public/big.js')
+        response.direct_passthrough = False
+        assert gzip.decompress(response.get_data()) == (root / 'big.js').read_bytes()
@@ -0,0 +1,163 @@
+import json
+import os
+import pytest
+from sqlalchemy.exc import OperationalError
+from models import db, Quiz, QuizQuestion, QuizAttempt, QuizResult, TeacherRollup
+import grading
+import submission_log
+from submission_log import SubmissionLog
+
+
+@pytest.fixture
+def write_behind(app, tmp_path, monkeypatch):
+    path = str(tmp_path / 'submissions.log')
+    monkeypatch.setitem(app.config, 'SUBMISSION_WRITE_BEHIND', True)
+    monkeypatch.setitem(app.config, 'SUBMISSION_LOG_PATH', path)
+    monkeypatch.setattr(submission_log, '_log', None)
+    # Flush by hand instead of from the background thread
+    monkeypatch.setattr(submission_log, '_worker', object())
+    grading.key_cache.clear()
+    yield path
+    if submission_log._log is not None:
+        submission_log._log.close()
+
+
+@pytest.fixture
+def quiz_and_student(make_user):
+    teacher, _ = make_user('t', 'teacher')
+    _, headers = make_user('s', 'student')
+    quiz = Quiz(title='Quiz', subject='Math', grade='Grade 6', teacher_id=teacher.id)
+    quiz.set_questions([{'question': '2 + 2?', 'correct_answer': '4'}, {'question': '3 + 3?', 'correct_answer': '6'}])
+    db.session.add(quiz)
+    db.session.commit()
+    return quiz, headers
+
+
+def test_log_checkpoints_and_truncates_once_drained(tmp_path):
+    log = SubmissionLog(str(tmp_path / 'log'))
+    for n in range(3):
+        log.append({'n': n})
+    records, end = log.read_pending(2)
+    assert [r['n'] for r in records] == [0, 1]
+    log.checkpoint(end)
+    records, end = log.read_pending(10)
+    assert [r['n'] for r in records] == [2]
+    log.checkpoint(end)
+    assert log.pending_bytes() == 0
+    assert (tmp_path / 'log').stat().st_size == 0
+    log.close()
+
+
+def test_log_drops_partial_tail_left_by_a_crash(tmp_path):
+    path = tmp_path / 'log'
+    path.write_bytes(b'{"n":0}\n{"n":1')
+    log = SubmissionLog(str(path))
+    log.append({'n': 2})
+    records, _ = log.read_pending(10)
+    assert [r['n'] for r in records] == [0, 2]
+    log.close()
+
+
+def test_processes_sharing_a_path_get_separate_logs(tmp_path):
+    path = str(tmp_path / 'log')
+    first = submission_log.open_log(path)
+    with pytest.raises(submission_log.LogInUse):
+        SubmissionLog(path)
+    second = submission_log.open_log(path)
+    assert second.path == path + '.1'
+
+    first.append({'n': 0})
+    second.append({'n': 1})
+    records, end = first.read_pending(10)
+    first.checkpoint(end)
+    # Draining and truncating the first log leaves the second one's submissions alone
+    assert [r['n'] for r in second.read_pending(10)[0]] == [1]
+    assert submission_log.log_paths(path) == [path, path + '.1']
+
+    first.close()
+    restarted = submission_log.open_log(path)
+    assert restarted.path == path
+    restarted.close()
+    second.close()
+
+
+def test_write_behind_submit_is_acknowledged_then_flushed(client, write_behind, quiz_and_student):
+    quiz, headers = quiz_and_student
+
+    responses = [client.post(f'/api/student/quizzes/{quiz.id}/submit', json={'answers': answers}, headers=headers)
+                 for answers in (['4', '6'], ['4', '5'], ['1', '2'])]
+
+    assert [r.status_code for r in responses] == [202, 202, 202]
+    assert [r.json['result']['score'] for r in responses] == [100.0, 50.0, 0.0]
+    assert QuizResult.query.count() == 0
+
+    assert submission_log.flush_pending() == 3
+    assert sorted(r.score for r in QuizResult.query) == [0.0, 0.5, 1.0]
+    assert QuizAttempt.query.count() == 3
+    rollup = TeacherRollup.query.one()
+    assert (rollup.attempt_count, rollup.score_sum) == (3, 1.5)
+
+
+def test_replaying_the_log_after_a_crash_does_not_duplicate(client, write_behind, quiz_and_student):
+    quiz, headers = quiz_and_student
+    client.post(f'/api/student/quizzes/{quiz.id}/submit', json={'answers': ['4', '6']}, headers=headers)
+    client.post(f'/api/student/quizzes/{quiz.id}/submit', json={'answers': ['4', '5']}, headers=headers)
+    log = submission_log.get_log()
+    records, end = log.read_pending(10)
+
+    # Simulate a crash after the database commit but before the checkpoint was written
+    submission_log._store(records)
+    db.session.commit()
+    assert submission_log.flush_pending() == 2
+
+    assert QuizResult.query.count() == 2
+    assert TeacherRollup.query.one().attempt_count == 2
+
+
+def test_bad_records_are_quarantined_without_blocking_the_log(client, write_behind, quiz_and_student, monkeypatch):
+    quiz, headers = quiz_and_student
+    for answers in (['4', '6'], ['4', '5'], ['1', '2']):
+        client.post(f'/api/student/quizzes/{quiz.id}/submit', json={'answers': answers}, headers=headers)
+    log = submission_log.get_log()
+    good = log.read_pending(10)[0][0]
+    log.append({**good, 'submission_id': 'no-score', 'score': None})
+    log.append({key: value for key, value in good.items() if key != 'student_id'} | {'submission_id': 'no-student'})
+
+    # A lost connection is retried as a whole later, not quarantined
+    def disconnected(records):
+        raise OperationalError('INSERT', {}, Exception('server closed the connection'))
+    with monkeypatch.context() as patch:
+        patch.setattr(submission_log, '_store', disconnected)
+        with pytest.raises(OperationalError):
+            submission_log.flush_pending()
+    assert not os.path.exists(log.quarantine_path)
+
+    assert submission_log.flush_pending() == 5
+    assert sorted(r.score for r in QuizResult.query) == [0.0, 0.5, 1.0]
+    assert TeacherRollup.query.one().attempt_count == 3
+    assert log.pending_bytes() == 0
+    with open(log.quarantine_path) as f:
+        quarantined = [json.loads(line) for line in f]
+    assert [entry['record']['submission_id'] for entry in quarantined] == ['no-score', 'no-student']
+    assert quarantined[0]['error'].startswith('IntegrityError') and quarantined[1]['error'].startswith('KeyError')
+
+
+def test_answer_key_cache_is_invalidated_when_questions_change(client, write_behind, quiz_and_student):
+    quiz, headers = quiz_and_student
+    assert grading.cached_answer_key(quiz.id).keys.tolist() == ['4', '6']
+
+    quiz.set_questions([{'question': '2 + 2?', 'correct_answer': '4'}, {'question': '3 + 3?', 'correct_answer': 'six'}])
+    db.session.commit()
+
+    response = client.post(f'/api/student/quizzes/{quiz.id}/submit', json={'answers': ['4', 'Six']}, headers=headers)
+    assert response.json['result']['score'] == 100.0
+
+    # An edit made by another worker fires no listeners here; the version bump alone retires the key
+    db.session.execute(db.update(QuizQuestion).where(QuizQuestion.quiz_id == quiz.id, QuizQuestion.position == 1)
+                       .values(correct_answer='"seven"'))
+    db.session.execute(db.update(Quiz).where(Quiz.id == quiz.id).values(version=Quiz.version + 1))
+    db.session.commit()
+    db.session.expire_all()
+    response = client.post(f'/api/student/quizzes/{quiz.id}/submit', json={'answers': ['4', 'seven']}, headers=headers)
+    assert response.json['result']['score'] == 100.0
+    assert client.post('/api/student/quizzes/999/submit', json={'answers': ['4']}, headers=headers).status_code == 404
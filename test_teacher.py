@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import event
+from models import db, Lesson, Quiz, QuizAttempt, LessonProgress
+
+
+@pytest.fixture
+def school(make_user):
+    teacher, headers = make_user('t', 'teacher')
+    other, _ = make_user('o', 'teacher')
+    students = [make_user(f's{n}', 'student', grade=grade)[0].id
+                for n, grade in enumerate(['Grade 6', 'Grade 6', 'Grade 7'])]
+    lessons = [Lesson(title=f'L{n}', subject=subject, grade=grade, content='x', teacher_id=owner, status=status)
+               for n, (subject, grade, owner, status) in enumerate([
+                   ('Math', 'Grade 6', teacher.id, 'approved'), ('Math', 'Grade 6', teacher.id, 'approved'),
+                   ('Science', 'Grade 7', teacher.id, 'approved'), ('Math', 'Grade 7', teacher.id, 'pending'),
+                   ('Math', 'Grade 6', other.id, 'approved')])]
+    quizzes = [Quiz(title=f'Q{n}', subject='Math', grade='Grade 6', teacher_id=owner, status='approved')
+               for n, owner in enumerate([teacher.id, teacher.id, other.id])]
+    quizzes[0].set_questions([{'question': '1 + 1?', 'correct_answer': '2'}, {'question': '2 + 2?', 'correct_answer': '4'}])
+    db.session.add_all(lessons + quizzes)
+    db.session.commit()
+    db.session.add_all([
+        LessonProgress(lesson_id=lessons[0].id, user_id=students[0], progress_percentage=100.0, completed=True),
+        LessonProgress(lesson_id=lessons[1].id, user_id=students[0], progress_percentage=50.0),
+        LessonProgress(lesson_id=lessons[0].id, user_id=students[1], progress_percentage=0.0),
+        LessonProgress(lesson_id=lessons[4].id, user_id=students[2], progress_percentage=100.0, completed=True),
+        QuizAttempt(quiz_id=quizzes[0].id, user_id=students[0], score=1.0, total_questions=2, completed=True),
+        QuizAttempt(quiz_id=quizzes[0].id, user_id=students[1], score=0.5, total_questions=2, completed=True),
+        QuizAttempt(quiz_id=quizzes[1].id, user_id=students[1], score=0.0, total_questions=0, completed=False),
+        QuizAttempt(quiz_id=quizzes[2].id, user_id=students[2], score=1.0, total_questions=0, completed=True),
+    ])
+    db.session.commit()
+    return headers, quizzes
+
+
+def test_dashboard(client, school):
+    headers, _ = school
+    assert client.get('/api/teacher/dashboard', headers=headers).json == {
+        'total_students': 3, 'active_lessons': 3, 'pending_grades': 2, 'avg_performance': 50.0, 'name': 't'}
+
+
+def test_classes_count_approved_lessons_and_grade_students(client, school):
+    headers, _ = school
+    classes = client.get('/api/teacher/classes', headers=headers).json
+    assert sorted(classes, key=lambda row: (row['grade'], row['subject'])) == [
+        {'grade': 'Grade 6', 'subject': 'Math', 'lesson_count': 2, 'student_count': 2},
+        {'grade': 'Grade 7', 'subject': 'Science', 'lesson_count': 1, 'student_count': 1},
+    ]
+
+
+def test_progress_covers_only_the_teachers_lessons_and_quizzes(client, school):
+    headers, _ = school
+    assert client.get('/api/teacher/progress', headers=headers).json == {
+        'total_students': 2, 'avg_progress': 50.0, 'completion_rate': 33.3, 'avg_score': 50.0}
+
+
+def test_grading_lists_quizzes_with_completed_attempts_in_one_query(client, school):
+    headers, quizzes = school
+    client.get('/api/teacher/grading', headers=headers)
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        queue = client.get('/api/teacher/grading', headers=headers).json
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert queue == [{'quiz_id': quizzes[0].id, 'title': 'Q0', 'grade': 'Grade 6', 'subject': 'Math',
+                      'pending_count': 2, 'total_questions': 2}]
+    # The user is cached after the first request, so only the grading query runs, and it
+    # reads the listed columns rather than whole quiz rows
+    assert len(statements) == 1 and 'quiz.instructions' not in statements[0]
+
+
+def test_teacher_endpoints_require_a_teacher(client, school, make_user):
+    _, student = make_user('x', 'student', grade='Grade 6')
+    for endpoint in ('dashboard', 'classes', 'progress', 'grading', 'lessons'):
+        assert client.get(f'/api/teacher/{endpoint}', headers=student).status_code == 403
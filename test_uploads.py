@@ -0,0 +1,118 @@
+import hashlib
+import io
+import os
+import threading
+import pytest
+from models import db, Lesson, UploadSession
+
+
+@pytest.fixture
+def teacher(app, make_user, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    user, headers = make_user('t', 'teacher')
+    yield user.id, headers
+    app.config['UPLOAD_FOLDER'] = 'uploads'
+
+
+def put_chunk(client, headers, upload_id, offset, data, **extra):
+    return client.put(f'/api/uploads/{upload_id}', data=data,
+                      headers={**headers, 'Upload-Offset': str(offset), **extra})
+
+
+def test_chunked_upload_resumes_and_attaches_to_lesson(client, teacher, tmp_path):
+    teacher_id, headers = teacher
+    lesson = Lesson(title='Cells', subject='Biology', grade='Grade 8', content='x', teacher_id=teacher_id)
+    db.session.add(lesson)
+    db.session.commit()
+    video = os.urandom(300_000)
+
+    created = client.post('/api/uploads', json={'filename': 'lecture 1.mp4', 'size': len(video),
+                                                'lesson_id': lesson.id}, headers=headers)
+    assert created.status_code == 201 and created.json['offset'] == 0
+    upload_id = created.json['id']
+
+    assert put_chunk(client, headers, upload_id, 0, video[:100_000]).json['offset'] == 100_000
+    # A retried chunk the server already has is refused with the real offset
+    stale = put_chunk(client, headers, upload_id, 0, video[:100_000])
+    assert stale.status_code == 409 and stale.headers['Upload-Offset'] == '100000'
+
+    # After a dropped connection the client asks where to resume
+    offset = client.get(f'/api/uploads/{upload_id}', headers=headers).json['offset']
+    checksum = hashlib.sha256(video[offset:]).hexdigest()
+    assert put_chunk(client, headers, upload_id, offset, video[offset:], **{'Upload-Checksum': checksum}).status_code == 200
+
+    done = client.post(f'/api/uploads/{upload_id}/finalize', json={'sha256': hashlib.sha256(video).hexdigest()},
+                       headers=headers)
+    assert done.status_code == 200 and done.json['status'] == 'complete'
+    stored = done.json['url'].removeprefix('/uploads/')
+    assert (tmp_path / stored).read_bytes() == video
+    assert not (tmp_path / '.partial' / f'{upload_id}.part').exists()
+    assert db.session.get(Lesson, lesson.id).video_file == stored
+
+
+def test_rejected_chunks_leave_the_partial_file_untouched(client, teacher, tmp_path):
+    _, headers = teacher
+    upload_id = client.post('/api/uploads', json={'filename': 'notes.pdf', 'size': 10}, headers=headers).json['id']
+    partial = tmp_path / '.partial' / f'{upload_id}.part'
+
+    assert put_chunk(client, headers, upload_id, 0, b'0123456789abc').status_code == 413
+    assert put_chunk(client, headers, upload_id, 0, b'01234', **{'Upload-Checksum': '0' * 64}).status_code == 422
+    assert partial.read_bytes() == b''
+    assert client.get(f'/uploads/.partial/{upload_id}.part').status_code == 404
+
+    put_chunk(client, headers, upload_id, 0, b'0123456789')
+    bad = client.post(f'/api/uploads/{upload_id}/finalize', json={'sha256': '0' * 64}, headers=headers)
+    assert bad.status_code == 422 and bad.json['offset'] == 0
+    assert db.session.get(UploadSession, upload_id).status == 'uploading'
+
+
+class StalledBody(io.BytesIO):
+    """A request body that stops after its first half until released."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.half = len(data) // 2
+        self.stalled = threading.Event()
+        self.release = threading.Event()
+
+    def read(self, size=-1):
+        position = self.tell()
+        if position < self.half:
+            return super().read(self.half - position if size < 0 else min(size, self.half - position))
+        self.stalled.set()
+        self.release.wait(5)
+        return super().read(size)
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def test_retry_during_a_streaming_put_cannot_overwrite_it(app, client, teacher, tmp_path):
+    _, headers = teacher
+    upload_id = client.post('/api/uploads', json={'filename': 'notes.pdf', 'size': 10}, headers=headers).json['id']
+    body = StalledBody(b'0123456789')
+    first = {}
+
+    def slow_put():
+        first['response'] = app.test_client().put(
+            f'/api/uploads/{upload_id}', input_stream=body,
+            headers={**headers, 'Upload-Offset': '0', 'Content-Length': '10'})
+
+    thread = threading.Thread(target=slow_put)
+    thread.start()
+    assert body.stalled.wait(5)
+    retry = put_chunk(client, headers, upload_id, 0, b'XXXXXXXXXX')
+    body.release.set()
+    thread.join()
+
+    assert retry.status_code == 409
+    assert first['response'].status_code == 200 and first['response'].json['offset'] == 10
+    assert (tmp_path / '.partial' / f'{upload_id}.part').read_bytes() == b'0123456789'
+
+
+def test_upload_validation(client, teacher):
+    _, headers = teacher
+    assert client.post('/api/uploads', json={'filename': 'run.exe', 'size': 10}, headers=headers).status_code == 400
+    assert client.post('/api/uploads', json={'filename': 'a.mp4', 'size': 10 ** 12}, headers=headers).status_code == 413
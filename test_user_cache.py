@@ -0,0 +1,78 @@
+from sqlalchemy import event
+from auth import CachedUser, load_auth_user, user_cache
+from models import db, User
+from utils import cache
+from utils.cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recent_and_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    lru = TTLCache(maxsize=2, ttl=10)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    assert lru.get('a') == 1
+    lru.set('c', 3)
+    assert lru.get('b') is None and lru.get('a') == 1
+    now[0] += 11
+    assert lru.get('a') is None
+    assert lru.stats() == {'size': 1, 'maxsize': 2, 'ttl': 10, 'hits': 2, 'misses': 2, 'evictions': 1,
+                           'hit_rate': 0.5}
+
+
+def test_repeat_lookups_are_served_from_the_cache(make_user):
+    user, _ = make_user('t', 'teacher', grade=None)
+    db.session.expunge_all()
+    assert isinstance(load_auth_user(user.id), User)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        cached = load_auth_user(user.id)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert isinstance(cached, CachedUser) and (cached.id, cached.role) == (user.id, 'teacher')
+    assert statements == []
+    # Fields outside the cached set load the row on first use
+    assert cached.username == 't'
+
+
+def test_role_status_and_deletion_take_effect_immediately(client, make_user):
+    user, headers = make_user('t', 'teacher')
+    assert client.get('/api/teacher/dashboard', headers=headers).status_code == 200
+
+    user.role = 'student'
+    db.session.commit()
+    assert client.get('/api/teacher/dashboard', headers=headers).status_code == 403
+
+    user.role = 'teacher'
+    user.is_confirmed = False
+    db.session.commit()
+    assert client.get('/api/teacher/dashboard', headers=headers).json['error'] == 'Email not confirmed'
+
+    db.session.delete(user)
+    db.session.commit()
+    assert client.get('/api/teacher/dashboard', headers=headers).json['error'] == 'User not found'
+
+
+def test_entries_expire_after_the_ttl(make_user, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    user, _ = make_user('t', 'teacher')
+    load_auth_user(user.id)
+    # A change the listeners cannot see, such as an edit from another process
+    db.session.execute(db.update(User).where(User.id == user.id).values(role='admin'))
+    db.session.commit()
+    assert load_auth_user(user.id).role == 'teacher'
+    now[0] += user_cache.ttl + 1
+    assert load_auth_user(user.id).role == 'admin'
+
+
+def test_cache_stats_are_admin_only(client, make_user):
+    _, admin = make_user('a', 'admin')
+    _, teacher = make_user('t', 'teacher')
+    client.get('/api/cache_stats', headers=admin)
+    stats = client.get('/api/cache_stats', headers=admin).json['user_cache']
+    assert stats['hits'] >= 1 and stats['maxsize'] == user_cache.maxsize
+    assert client.get('/api/cache_stats', headers=teacher).status_code == 403
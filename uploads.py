@@ -0,0 +1,285 @@
+import hashlib
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, current_app, jsonify, request
+from werkzeug.exceptions import ClientDisconnected
+from werkzeug.utils import secure_filename
+from models import db, Lesson, UploadSession
+from auth import token_required, get_current_user
+from utils.validation import validate_required_fields, role_required
+from utils.filelock import try_lock
+
+# Resumable uploads for lesson PDFs and videos:
+#   POST /api/uploads                 {filename, size, lesson_id?} -> upload id
+#   PUT  /api/uploads/<id>            raw bytes, Upload-Offset header = bytes already received
+#   GET  /api/uploads/<id>            current offset, to resume after a dropped connection
+#   POST /api/uploads/<id>/finalize   {sha256?} -> verified and moved into place
+# Chunks are streamed to UPLOAD_FOLDER/.partial/<id>.part and fsynced before the offset is
+# recorded, so a recorded offset always points at bytes that survived a crash. A PUT holds
+# an exclusive lock on the part file for the whole write, so a client retrying while its
+# first PUT is still streaming gets a 409 instead of writing over the same range. A chunk may
+# carry an Upload-Checksum header (sha256 hex of the chunk); the whole-file sha256 is always
+# computed at finalize and checked against the client's when one is sent.
+
+uploads_bp = Blueprint('uploads_bp', __name__, url_prefix='/api/uploads')
+
+PARTIAL_DIR = '.partial'
+KIND_FOLDERS = {'pdf': 'pdfs', 'video': 'videos'}
+
+
+class ChecksumMismatch(Exception):
+    pass
+
+
+def upload_root():
+    return os.path.join(current_app.root_path, current_app.config['UPLOAD_FOLDER'])
+
+
+def partial_path(upload_id):
+    return os.path.join(upload_root(), PARTIAL_DIR, f'{upload_id}.part')
+
+
+def kind_for(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension not in current_app.config['ALLOWED_EXTENSIONS']:
+        return None
+    return 'pdf' if extension == 'pdf' else 'video'
+
+
+def write_chunk(f, offset, stream, limit, buffer_size):
+    """Copy the request body to the open file f at offset; returns (bytes written, sha256 hexdigest)."""
+    digest = hashlib.sha256()
+    written = 0
+    f.seek(offset)
+    try:
+        while True:
+            data = stream.read(buffer_size)
+            if not data:
+                break
+            if written + len(data) > limit:
+                raise OverflowError
+            f.write(data)
+            digest.update(data)
+            written += len(data)
+    finally:
+        f.flush()
+        os.fsync(f.fileno())
+    return written, digest.hexdigest()
+
+
+def file_sha256(path, buffer_size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(buffer_size)
+            if not data:
+                break
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def advance(upload, offset, new_offset):
+    # Conditional on the old offset so two concurrent PUTs cannot both claim the same range
+    result = db.session.execute(
+        db.update(UploadSession)
+        .where(UploadSession.id == upload.id, UploadSession.received == offset,
+               UploadSession.status == 'uploading')
+        .values(received=new_offset, updated_date=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False))
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def get_own_upload(upload_id):
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None or upload.teacher_id != get_current_user().id:
+        return None
+    return upload
+
+
+def offset_response(upload, code=200, error=None):
+    body = upload.to_dict()
+    if error:
+        body['error'] = error
+    response = jsonify(body)
+    response.headers['Upload-Offset'] = str(upload.received)
+    return response, code
+
+
+@uploads_bp.route('', methods=['POST'])
+@token_required
+@role_required('teacher')
+@validate_required_fields(['filename', 'size'])
+def create_upload():
+    user = get_current_user()
+    data = request.get_json()
+    filename = secure_filename(str(data['filename']))
+    kind = kind_for(filename)
+    if not filename or kind is None:
+        return jsonify({'error': 'Unsupported file type'}), 400
+    size = data['size']
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        return jsonify({'error': 'size must be a positive integer'}), 400
+    if size > current_app.config['UPLOAD_MAX_FILE_SIZE']:
+        return jsonify({'error': 'File is too large'}), 413
+    lesson_id = data.get('lesson_id')
+    if lesson_id is not None:
+        lesson = db.session.get(Lesson, lesson_id)
+        if lesson is None:
+            return jsonify({'error': 'Lesson not found'}), 404
+        if lesson.teacher_id != user.id:
+            return jsonify({'error': 'Unauthorized'}), 403
+
+    upload = UploadSession(id=uuid.uuid4().hex, teacher_id=user.id, lesson_id=lesson_id,
+                           filename=filename, kind=kind, size=size, received=0)
+    path = partial_path(upload.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    db.session.add(upload)
+    db.session.commit()
+    body = upload.to_dict()
+    body['chunk_size'] = min(current_app.config['UPLOAD_CHUNK_SIZE'], current_app.config['MAX_CONTENT_LENGTH'])
+    response = jsonify(body)
+    response.headers['Location'] = f'/api/uploads/{upload.id}'
+    response.headers['Upload-Offset'] = '0'
+    return response, 201
+
+
+@uploads_bp.route('/<upload_id>', methods=['GET'])
+@token_required
+@role_required('teacher')
+def get_upload(upload_id):
+    upload = get_own_upload(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return offset_response(upload)
+
+
+@uploads_bp.route('/<upload_id>', methods=['PUT', 'PATCH'])
+@token_required
+@role_required('teacher')
+def put_chunk(upload_id):
+    upload = get_own_upload(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    if upload.status != 'uploading':
+        return jsonify({'error': 'Upload is already complete'}), 409
+    try:
+        offset = int(request.headers.get('Upload-Offset', request.args.get('offset', '')))
+    except ValueError:
+        return jsonify({'error': 'Upload-Offset header is required'}), 400
+    if offset != upload.received:
+        return offset_response(upload, 409, 'Offset does not match the bytes received')
+    expected_checksum = request.headers.get('Upload-Checksum', '').lower()
+
+    with open(partial_path(upload.id), 'r+b') as f:
+        if not try_lock(f):
+            return offset_response(upload, 409, 'Another chunk for this upload is still being written')
+        # The previous holder may have moved the offset since it was checked above
+        db.session.refresh(upload)
+        if upload.status != 'uploading' or offset != upload.received:
+            return offset_response(upload, 409, 'Offset does not match the bytes received')
+        # Drop anything past the recorded offset that an interrupted write left behind
+        f.truncate(offset)
+        try:
+            written, checksum = write_chunk(f, offset, request.stream, upload.size - offset,
+                                            current_app.config['UPLOAD_WRITE_BUFFER'])
+            if expected_checksum and checksum != expected_checksum:
+                raise ChecksumMismatch
+        except OverflowError:
+            f.truncate(offset)
+            return offset_response(upload, 413, 'Chunk runs past the declared file size')
+        except ChecksumMismatch:
+            f.truncate(offset)
+            return offset_response(upload, 422, 'Chunk checksum mismatch')
+        except ClientDisconnected:
+            # Keep whatever arrived so the client resumes from there, unless the chunk carried
+            # a checksum: a partial chunk cannot be verified, so it is sent again in full
+            if expected_checksum:
+                f.truncate(offset)
+            else:
+                advance(upload, offset, f.tell())
+            raise
+
+        if not advance(upload, offset, offset + written):
+            db.session.refresh(upload)
+            return offset_response(upload, 409, 'Offset does not match the bytes received')
+    db.session.refresh(upload)
+    return offset_response(upload)
+
+
+@uploads_bp.route('/<upload_id>/finalize', methods=['POST'])
+@token_required
+@role_required('teacher')
+def finalize_upload(upload_id):
+    upload = get_own_upload(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    if upload.status == 'complete':
+        return jsonify(upload.to_dict())
+    if upload.received != upload.size:
+        return offset_response(upload, 409, 'Upload is incomplete')
+    data = request.get_json(silent=True) or {}
+    expected_checksum = str(data.get('sha256') or '').lower()
+
+    path = partial_path(upload.id)
+    checksum = file_sha256(path, current_app.config['UPLOAD_WRITE_BUFFER'])
+    if expected_checksum and checksum != expected_checksum:
+        # Nothing tells us which range is bad, so the upload starts over
+        os.truncate(path, 0)
+        upload.received = 0
+        upload.updated_date = datetime.now(timezone.utc)
+        db.session.commit()
+        return offset_response(upload, 422, 'Checksum mismatch; upload restarted')
+
+    stored_path = f'{KIND_FOLDERS[upload.kind]}/{upload.id}-{upload.filename}'
+    target = os.path.join(upload_root(), stored_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(path, target)
+    upload.sha256 = checksum
+    upload.stored_path = stored_path
+    upload.status = 'complete'
+    upload.updated_date = datetime.now(timezone.utc)
+    if upload.lesson_id is not None:
+        lesson = db.session.get(Lesson, upload.lesson_id)
+        if lesson is not None:
+            if upload.kind == 'pdf':
+                lesson.pdf_file = stored_path
+            else:
+                lesson.video_file = stored_path
+            lesson.attachment_type = upload.kind
+    db.session.commit()
+    return jsonify(upload.to_dict())
+
+
+@uploads_bp.route('/<upload_id>', methods=['DELETE'])
+@token_required
+@role_required('teacher')
+def abort_upload(upload_id):
+    upload = get_own_upload(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    if upload.status != 'uploading':
+        return jsonify({'error': 'Upload is already complete'}), 409
+    remove_partial(upload)
+    return jsonify({'message': 'Upload cancelled'})
+
+
+def remove_partial(upload):
+    try:
+        os.remove(partial_path(upload.id))
+    except FileNotFoundError:
+        pass
+    db.session.delete(upload)
+    db.session.commit()
+
+
+def prune_stale_uploads():
+    """Delete unfinished uploads that have been idle longer than UPLOAD_SESSION_TTL hours."""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=current_app.config['UPLOAD_SESSION_TTL'])
+    stale = UploadSession.query.filter(UploadSession.status == 'uploading',
+                                       UploadSession.updated_date < cutoff).all()
+    for upload in stale:
+        remove_partial(upload)
+    return len(stale)
@@ -0,0 +1,39 @@
+import hashlib
+from datetime import timezone
+from flask import request, make_response
+
+
+def make_etag(*parts):
+    """Strong ETag over the given version parts and the request's query string."""
+    raw = '|'.join(str(part) for part in parts) + '?' + request.query_string.decode('latin-1')
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _as_utc(value):
+    # HTTP dates have one second resolution
+    value = value.replace(microsecond=0)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def with_validators(response, etag, last_modified=None):
+    response = make_response(response)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    # Clients may keep the body but must revalidate before reusing it
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    """Return a 304 response when the request's validators still match, otherwise None.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted without it.
+    """
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        matched = _as_utc(last_modified) <= request.if_modified_since
+    else:
+        matched = False
+    return with_validators(('', 304), etag, last_modified) if matched else None
@@ -0,0 +1,44 @@
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def try_lock(f):
+    """Take an exclusive lock on the open file f without waiting; False if someone else holds it.
+
+    The lock belongs to this open file, so it also excludes other threads that open the same
+    path, and it is released when f is closed.
+    """
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def lock_exclusive(f):
+    """Take an exclusive lock on the open file f, waiting for other holders; released when f is closed."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def lock_shared(f):
+    """Take a shared lock on the open file f, waiting while someone holds it exclusively.
+
+    Released when f is closed.
+    """
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+    else:
+        # msvcrt has no shared locks; an exclusive one is still correct, just less concurrent
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
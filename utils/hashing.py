@@ -0,0 +1,75 @@
+import threading
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+from config import get_config
+
+# Password hashing is CPU bound, so it runs in a dedicated process pool. At most
+# HASH_POOL_WORKERS + HASH_QUEUE_LIMIT hashes may be in flight; beyond that callers
+# get HashingOverloaded immediately (surfaced as 503) instead of queueing without bound.
+
+config = get_config()
+PASSWORD_HASH_METHOD = config.PASSWORD_HASH_METHOD
+HASH_POOL_WORKERS = config.HASH_POOL_WORKERS
+HASH_QUEUE_LIMIT = config.HASH_QUEUE_LIMIT
+HASH_TIMEOUT = config.HASH_TIMEOUT
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(HASH_POOL_WORKERS + HASH_QUEUE_LIMIT)
+
+
+class HashingOverloaded(Exception):
+    pass
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=HASH_POOL_WORKERS)
+        return _executor
+
+
+def _run(func, *args):
+    if HASH_POOL_WORKERS <= 0:
+        return func(*args)
+    if not _slots.acquire(blocking=False):
+        raise HashingOverloaded('Password hashing queue is full')
+    try:
+        future = _get_executor().submit(func, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=HASH_TIMEOUT)
+    except TimeoutError:
+        raise HashingOverloaded('Password hashing timed out')
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+
+def verify_password(pwhash, password):
+    return _run(check_password_hash, pwhash, password)
+
+
+@lru_cache(maxsize=None)
+def _method_prefix(method):
+    # Werkzeug expands shorthands ('scrypt' -> 'scrypt:32768:8:1'), so ask it for the full form
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+def needs_rehash(pwhash):
+    """True when the stored hash was produced with different parameters than PASSWORD_HASH_METHOD."""
+    return pwhash.split('$', 1)[0] != _method_prefix(PASSWORD_HASH_METHOD)
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
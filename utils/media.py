@@ -0,0 +1,94 @@
+import mimetypes
+import os
+from datetime import datetime, timezone
+from flask import current_app, request, abort, Response
+from werkzeug.security import safe_join
+from utils.conditional import not_modified, with_validators, _as_utc
+
+# Byte-range serving for uploaded lesson media. Bodies go out through the server's
+# wsgi.file_wrapper when it has one (gunicorn turns it into sendfile; PEP 3333 stops the
+# server at Content-Length, so a seeked file serves a range) and otherwise through a bounded
+# read loop, so memory stays flat whatever the file size. With MEDIA_OFFLOAD set the proxy
+# in front (nginx X-Accel-Redirect, Apache/lighttpd X-Sendfile) sends the bytes instead.
+
+OFFLOAD_MODES = ('x-accel-redirect', 'x-sendfile')
+
+
+def _read_range(f, length, block_size):
+    try:
+        while length > 0:
+            data = f.read(min(block_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        f.close()
+
+
+def _requested_range(size, etag, last_modified):
+    """(start, stop) of a single satisfiable range, None for the whole file, or 416."""
+    if request.range is None or request.range.units != 'bytes' or len(request.range.ranges) != 1:
+        return None
+    if_range = request.if_range
+    if if_range.etag is not None and if_range.etag != etag:
+        return None
+    if if_range.date is not None and if_range.date != _as_utc(last_modified):
+        return None
+    span = request.range.range_for_length(size)
+    if span is None:
+        response = Response(status=416)
+        response.headers['Content-Range'] = f'bytes */{size}'
+        abort(response)
+    return span
+
+
+def _offload(response, path, relative_path):
+    config = current_app.config
+    if config['MEDIA_OFFLOAD'] == 'x-accel-redirect':
+        response.headers['X-Accel-Redirect'] = config['MEDIA_OFFLOAD_PREFIX'].rstrip('/') + '/' + relative_path
+    else:
+        response.headers['X-Sendfile'] = path
+    return response
+
+
+def send_media(directory, filename, mimetype=None):
+    # Hidden segments (unfinished uploads under .partial) are never served
+    if any(part.startswith('.') for part in filename.split('/')):
+        abort(404)
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    stat = os.stat(path)
+    size = stat.st_size
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), timezone.utc)
+    etag = f'{stat.st_mtime_ns:x}-{size:x}'
+    mimetype = mimetype or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    cached = not_modified(etag, last_modified)
+    if cached:
+        return cached
+
+    if current_app.config['MEDIA_OFFLOAD'] in OFFLOAD_MODES:
+        # The proxy handles Range itself from the file it is pointed at
+        response = Response(mimetype=mimetype)
+        return with_validators(_offload(response, path, filename), etag, last_modified)
+
+    span = _requested_range(size, etag, last_modified)
+    start, stop = span or (0, size)
+    length = stop - start
+    f = open(path, 'rb')
+    f.seek(start)
+    block_size = current_app.config['MEDIA_BLOCK_SIZE']
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if file_wrapper is not None and current_app.config['MEDIA_USE_FILE_WRAPPER']:
+        body = file_wrapper(f, block_size)
+    else:
+        body = _read_range(f, length, block_size)
+    response = Response(body, status=206 if span else 200, mimetype=mimetype, direct_passthrough=True)
+    response.call_on_close(f.close)
+    response.content_length = length
+    response.headers['Accept-Ranges'] = 'bytes'
+    if span:
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+    return with_validators(response, etag, last_modified)
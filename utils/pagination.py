@@ -0,0 +1,60 @@
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+LISTING_FILTERS = ('grade', 'subject', 'status', 'teacher_id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(uploaded_date, row_id):
+    raw = f"{uploaded_date.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        uploaded_date, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(uploaded_date), int(row_id)
+    except (ValueError, UnicodeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def get_page_size(args):
+    limit = args.get('limit', default=DEFAULT_PAGE_SIZE, type=int)
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def apply_listing_filters(query, model, args):
+    for field in LISTING_FILTERS:
+        value = args.get(field)
+        if value:
+            query = query.filter(getattr(model, field) == value)
+    return query
+
+
+def keyset_paginate(query, model, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return one page of rows ordered newest first on (uploaded_date, id) plus the next cursor."""
+    if cursor:
+        uploaded_date, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.uploaded_date < uploaded_date,
+            and_(model.uploaded_date == uploaded_date, model.id < row_id)
+        ))
+    rows = query.order_by(model.uploaded_date.desc(), model.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].uploaded_date, rows[-1].id)
+    return rows, next_cursor
+
+
+def paginate_listing(query, model, args):
+    query = apply_listing_filters(query, model, args)
+    return keyset_paginate(query, model, args.get('cursor'), get_page_size(args))
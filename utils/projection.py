@@ -0,0 +1,39 @@
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, selectinload
+
+SUMMARY = 'summary'
+FULL = 'full'
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(args, model, default_view=FULL):
+    """Resolve ?fields=a,b or ?view=summary|full into the list of fields to serialize."""
+    requested = args.get('fields')
+    if requested:
+        fields = [field.strip() for field in requested.split(',') if field.strip()]
+        if not fields:
+            # An empty list would load only the keys and then serialize every field lazily
+            raise InvalidFields('No fields requested')
+        unknown = [field for field in fields if field not in model.FIELDS]
+        if unknown:
+            raise InvalidFields(f"Unknown fields: {', '.join(unknown)}")
+        return fields
+    view = args.get('view', default_view)
+    if view == SUMMARY:
+        return list(model.SUMMARY_FIELDS)
+    if view == FULL:
+        return list(model.FIELDS)
+    raise InvalidFields(f"Unknown view: {view}")
+
+
+def apply_projection(query, model, fields):
+    # id and uploaded_date are always loaded because keyset pagination depends on them
+    mapper = inspect(model)
+    columns = ({'id', 'uploaded_date'} | set(fields)) & set(mapper.column_attrs.keys())
+    relationships = set(fields) & set(mapper.relationships.keys())
+    options = [load_only(*[getattr(model, column) for column in columns])]
+    options += [selectinload(getattr(model, relationship)) for relationship in relationships]
+    return query.options(*options)
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+from utils.filelock import lock_exclusive
+
+
+class TokenBucket:
+    """Blocking token bucket: refills `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SharedTokenBucket:
+    """Blocking token bucket kept in a file, so every process on the host draws from one budget.
+
+    The bucket state is read and updated under an exclusive lock on the file; wall-clock time
+    is used for refills because monotonic clocks are not comparable across processes.
+    """
+
+    def __init__(self, path, rate, capacity):
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _take(self, tokens):
+        """Take tokens if they are available and return 0, otherwise return the seconds to wait."""
+        with open(self.path, 'a+') as f:
+            lock_exclusive(f)
+            now = time.time()
+            f.seek(0)
+            try:
+                stored, updated = (float(value) for value in f.read().split())
+            except ValueError:
+                stored, updated = self.capacity, now
+            available = min(self.capacity, stored + max(0.0, now - updated) * self.rate)
+            wait = 0
+            if available >= tokens:
+                available -= tokens
+            else:
+                wait = (tokens - available) / self.rate
+            f.truncate(0)
+            f.write(f'{available} {now}')
+        return wait
+
+    def try_acquire(self, tokens=1):
+        return self._take(tokens) == 0
+
+    def acquire(self, tokens=1):
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
@@ -0,0 +1,11 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def upsert(connection, table, values, updates):
+    """INSERT values as a new row, or ON CONFLICT on the primary key apply updates(table columns,
+    excluded row) to the existing one, in one statement so concurrent first writers cannot collide."""
+    stmt = _INSERTS[connection.dialect.name](table).values(values)
+    connection.execute(stmt.on_conflict_do_update(index_elements=list(table.primary_key.columns),
+                                                  set_=updates(table.c, stmt.excluded)))